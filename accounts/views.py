@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
@@ -103,7 +104,20 @@ def get_user_role(user):
 
 
 def patient_required(view_func):
-    """Decorator to ensure user is a patient."""
+    """Decorator to ensure user is a patient. Works for sync and async views."""
+    if iscoroutinefunction(view_func):
+
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return redirect("accounts:login")
+            role = await sync_to_async(get_user_role)(user)
+            if role != "patient":
+                messages.error(request, "Access denied. This page is for patients only.")
+                return redirect("home:index")
+            return await view_func(request, *args, **kwargs)
+
+        return async_wrapper
 
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
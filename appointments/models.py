@@ -59,6 +59,19 @@ class Appointment(models.Model):
         ordering = ["-appointment_date", "-appointment_time"]
         verbose_name = "Appointment"
         verbose_name_plural = "Appointments"
+        indexes = [
+            # Each side's appointment list, in date order
+            models.Index(
+                fields=["doctor", "appointment_date", "appointment_time"],
+                name="appt_doctor_date_idx",
+            ),
+            models.Index(
+                fields=["patient", "appointment_date", "appointment_time"],
+                name="appt_patient_date_idx",
+            ),
+            models.Index(fields=["status"], name="appt_status_idx"),
+            models.Index(fields=["created_at"], name="appt_created_at_idx"),
+        ]
 
     def __str__(self):
         return (
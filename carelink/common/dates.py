@@ -0,0 +1,18 @@
+"""Date helpers for database filters."""
+
+from datetime import date, datetime, time, timedelta
+from typing import Tuple
+
+from django.utils import timezone
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """
+    ``[start, end)`` of ``day`` in the current time zone.
+
+    Filtering ``created_at__gte=start, created_at__lt=end`` matches the same
+    rows as ``created_at__date=day`` but, unlike a function of the column,
+    can use an index on it.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
@@ -0,0 +1,237 @@
+"""
+Server-side state for multi-turn triage chats.
+
+Each (user, session_id) pair keeps its first complaint, the last few patient
+messages verbatim, a condensed digest of older ones and the latest
+assessment. A turn therefore sends Gemini that bounded context plus the new
+message instead of the whole transcript, and the browser only posts the new
+message. State lives in Django's cache so any worker can pick up the next
+turn.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+DEFAULT_RECENT_TURNS = 4
+DEFAULT_DIGEST_CHARS = 1200
+# Longest slice of one older message kept in the digest
+DIGEST_ITEM_CHARS = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _condense(text: str, limit: int) -> str:
+    text = _WHITESPACE.sub(" ", (text or "").strip())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+class Conversation:
+    """Rolling state of one chat session."""
+
+    def __init__(
+        self,
+        user_id: int,
+        session_id: str,
+        first: str = "",
+        digest: str = "",
+        recent: Optional[List[str]] = None,
+        assessment: Optional[Dict[str, Any]] = None,
+        turns: int = 0,
+        recent_turns: int = DEFAULT_RECENT_TURNS,
+        digest_chars: int = DEFAULT_DIGEST_CHARS,
+    ) -> None:
+        self.user_id = user_id
+        self.session_id = session_id
+        self.first = first
+        self.digest = digest
+        self.recent = list(recent or [])
+        self.assessment = assessment
+        self.turns = turns
+        self.recent_turns = recent_turns
+        self.digest_chars = digest_chars
+
+    def prompt_text(self, message: str, max_chars: Optional[int] = None) -> str:
+        """
+        Symptom text for the next Gemini call: bounded context plus ``message``.
+        With ``max_chars`` the digest and then the oldest recent messages are
+        dropped until it fits; the first complaint and new message always stay.
+        """
+        if not self.turns:
+            return message
+
+        digest, recent = self.digest, list(self.recent)
+        text = self._render(message, digest, recent)
+        while max_chars is not None and len(text) > max_chars and (digest or recent):
+            if digest:
+                digest = ""
+            else:
+                recent.pop(0)
+            text = self._render(message, digest, recent)
+        return text
+
+    def patient_text(self, message: str) -> str:
+        """Everything the patient has said that is still kept, plus ``message``."""
+        parts = [self.first, self.digest, *self.recent] if self.turns else []
+        return "\n".join(part for part in (*parts, message) if part)
+
+    def _render(self, message: str, digest: str, recent: List[str]) -> str:
+        lines = [f"INITIAL_COMPLAINT: {self.first}"]
+        if digest:
+            lines.append(f"EARLIER_DETAILS (condensed): {digest}")
+        if self.assessment:
+            lines.append(
+                "PREVIOUS_ASSESSMENT: "
+                f"{self.assessment.get('severity', 'Unknown')} - "
+                f"{self.assessment.get('summary', '')}"
+            )
+        if recent:
+            lines.append("RECENT_MESSAGES:")
+            lines.extend(f"- {text}" for text in recent)
+        lines.append(f"NEW_MESSAGE: {message}")
+        return "\n".join(lines)
+
+    def add_turn(self, message: str, result: Optional[Dict[str, Any]] = None) -> None:
+        """Record a patient message and the assessment it produced."""
+        if not self.turns:
+            self.first = message
+        else:
+            self.recent.append(message)
+            while len(self.recent) > self.recent_turns:
+                self._fold(self.recent.pop(0))
+        if result:
+            self.set_assessment(result)
+        self.turns += 1
+
+    def set_assessment(self, result: Dict[str, Any]) -> None:
+        self.assessment = {
+            "severity": result.get("severity"),
+            "summary": _condense(result.get("summary", ""), DIGEST_ITEM_CHARS),
+        }
+
+    def _fold(self, message: str) -> None:
+        item = _condense(message, DIGEST_ITEM_CHARS)
+        digest = f"{self.digest}; {item}" if self.digest else item
+        if len(digest) > self.digest_chars:
+            # Drop the oldest details first; the first complaint is kept separately
+            digest = digest[-self.digest_chars :]
+            digest = digest.split("; ", 1)[-1]
+        self.digest = digest
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "first": self.first,
+            "digest": self.digest,
+            "recent": self.recent,
+            "assessment": self.assessment,
+            "turns": self.turns,
+        }
+
+
+class ConversationStore:
+    key_prefix = "triage:conversation:"
+
+    def __init__(
+        self,
+        alias: str = "default",
+        ttl: int = DEFAULT_TTL_SECONDS,
+        recent_turns: int = DEFAULT_RECENT_TURNS,
+        digest_chars: int = DEFAULT_DIGEST_CHARS,
+    ) -> None:
+        self.alias = alias
+        self.ttl = ttl
+        self.recent_turns = recent_turns
+        self.digest_chars = digest_chars
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _key(self, user_id: int, session_id: str) -> str:
+        # The user id is part of the key so a guessed session id is useless
+        return f"{self.key_prefix}{user_id}:{session_id}"
+
+    def _build(self, user_id: int, session_id: str, data: Optional[Dict[str, Any]]):
+        return Conversation(
+            user_id,
+            session_id,
+            recent_turns=self.recent_turns,
+            digest_chars=self.digest_chars,
+            **(data or {}),
+        )
+
+    def load(
+        self, user_id: int, session_id: str, seed_history: Optional[List[Dict[str, Any]]] = None
+    ) -> Conversation:
+        data = self._cache.get(self._key(user_id, session_id))
+        return self._seed(self._build(user_id, session_id, data), seed_history)
+
+    async def aload(
+        self, user_id: int, session_id: str, seed_history: Optional[List[Dict[str, Any]]] = None
+    ) -> Conversation:
+        data = await self._cache.aget(self._key(user_id, session_id))
+        return self._seed(self._build(user_id, session_id, data), seed_history)
+
+    def save(self, conversation: Conversation) -> None:
+        key = self._key(conversation.user_id, conversation.session_id)
+        self._cache.set(key, conversation.to_dict(), timeout=self.ttl)
+
+    async def asave(self, conversation: Conversation) -> None:
+        key = self._key(conversation.user_id, conversation.session_id)
+        await self._cache.aset(key, conversation.to_dict(), timeout=self.ttl)
+
+    def _seed(self, conversation: Conversation, history) -> Conversation:
+        # Older clients post the full history; it is only used to rebuild
+        # state the server has lost (expired entry, cold per-process cache).
+        if conversation.turns or not history:
+            return conversation
+        for item in history:
+            if not isinstance(item, dict):
+                continue
+            content = item.get("content")
+            if item.get("role") == "user" and content:
+                conversation.add_turn(str(content))
+            elif item.get("role") == "assistant" and isinstance(content, dict):
+                conversation.set_assessment(content)
+        return conversation
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the store configured by ``settings.TRIAGE_CONVERSATIONS``."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = getattr(settings, "TRIAGE_CONVERSATIONS", None) or {}
+                _store = ConversationStore(
+                    alias=config.get("ALIAS", "default"),
+                    ttl=int(config.get("TTL", DEFAULT_TTL_SECONDS)),
+                    recent_turns=int(config.get("RECENT_TURNS", DEFAULT_RECENT_TURNS)),
+                    digest_chars=int(config.get("DIGEST_CHARS", DEFAULT_DIGEST_CHARS)),
+                )
+    return _store
+
+
+def reset_conversation_store() -> None:
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def _reset_on_config_change(setting, **kwargs):
+    if setting == "TRIAGE_CONVERSATIONS":
+        reset_conversation_store()
+
+
+setting_changed.connect(_reset_on_config_change)
@@ -0,0 +1,251 @@
+"""
+Platform metrics for the staff admin dashboard (``/admin/dashboard/``).
+
+All-time totals and distributions come from two conditional aggregates,
+over triage interactions and appointments, and users from one aggregate
+joined to their patient and doctor profiles. Date ranges (today, the last
+7 and 30 days, the trend charts) are read from the ``DailyMetrics`` rollup
+that ``manage.py rollup_metrics`` keeps up to date, so a year-long trend
+costs the same single query as a week.
+
+The result is cached as a snapshot for ``ADMIN_DASHBOARD["TTL"]`` seconds.
+When it expires one caller recomputes it: requests in the same process wait
+for that caller, and other workers keep serving the expired snapshot for up
+to ``STALE_SECONDS`` while the refresh lock in the cache is held.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from appointments.models import Appointment
+from carelink.common.dates import day_bounds
+from carelink.common.services.singleflight import SingleFlight
+from doctors.models import DoctorAvailability
+from triage.models import SEVERITY_RANKS, TriageInteraction
+from triage.rollups import APPOINTMENTS, NEW_USERS, TRIAGES, read_days
+
+SNAPSHOT_KEY = "admin_dashboard:snapshot"
+REFRESH_LOCK_KEY = "admin_dashboard:refreshing"
+# Trend chart ranges in days; the first is the default
+TREND_RANGES = (7, 30, 90, 365)
+
+SEVERITIES = list(SEVERITY_RANKS)
+APPOINTMENT_STATUSES = [value for value, _label in Appointment.STATUS_CHOICES]
+TRIAGE_COUNTS = {
+    "reviewed": Q(review_status="finished_review"),
+    "pending_review": Q(review_status="pending_review"),
+    "under_review": Q(review_status="under_review"),
+    "verified": Q(data_integrity_status="verified"),
+    "discrepancy": Q(data_integrity_status="discrepancy"),
+    **{f"severity_{s.lower()}": Q(severity=s) for s in SEVERITIES},
+}
+APPOINTMENT_COUNTS = {f"status_{s}": Q(status=s) for s in APPOINTMENT_STATUSES}
+
+# Refreshes within one process share a single computation
+_flight = SingleFlight()
+
+
+def dashboard_config() -> Dict[str, Any]:
+    """``settings.ADMIN_DASHBOARD`` with defaults filled in."""
+    config = getattr(settings, "ADMIN_DASHBOARD", None) or {}
+    return {
+        "TTL": int(config.get("TTL", 60)),
+        "STALE_SECONDS": int(config.get("STALE_SECONDS", 600)),
+        "REFRESH_LOCK_SECONDS": int(config.get("REFRESH_LOCK_SECONDS", 30)),
+        "CACHE_ALIAS": config.get("CACHE_ALIAS", "default"),
+    }
+
+
+def trend_range(value: Any) -> int:
+    """A requested trend range in days, or the default one."""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return TREND_RANGES[0]
+    return days if days in TREND_RANGES else TREND_RANGES[0]
+
+
+def _totals(queryset, counts: Dict[str, Q]) -> Dict[str, int]:
+    return queryset.aggregate(
+        total=Count("pk"), **{name: Count("pk", filter=q) for name, q in counts.items()}
+    )
+
+
+def _sum(days: Dict[date, Dict[str, int]], metric: str, since: date) -> int:
+    return sum(row.get(metric, 0) for day, row in days.items() if day >= since)
+
+
+def _rate(part: int, whole: int) -> float:
+    return part / whole * 100 if whole else 0
+
+
+def _trend(
+    days: Dict[date, Dict[str, int]], metric: str, today: date, length: int
+) -> List[Dict[str, Any]]:
+    trend = []
+    for offset in range(length - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        trend.append(
+            {
+                "date": day.strftime("%Y-%m-%d"),
+                "label": day.strftime("%b %d"),
+                "count": days.get(day, {}).get(metric, 0),
+            }
+        )
+    return trend
+
+
+def _user_counts(month_start) -> Dict[str, int]:
+    profile = "patient_profile"
+    recent_triage = TriageInteraction.objects.filter(
+        user=OuterRef("pk"), created_at__gte=month_start
+    )
+    recent_appointment = Appointment.objects.filter(
+        patient=OuterRef("pk"), created_at__gte=month_start
+    )
+    available = DoctorAvailability.objects.filter(
+        doctor=OuterRef("doctor_profile"), is_available=True
+    )
+    # Both profiles are one-to-one, so the joins do not repeat users
+    return User.objects.aggregate(
+        total_users=Count(profile),
+        total_patients=Count(profile, filter=Q(patient_profile__role="patient")),
+        total_doctors=Count(profile, filter=Q(patient_profile__role="doctor")),
+        onboarding_completed=Count(profile, filter=Q(patient_profile__onboarding_completed=True)),
+        active_users=Count(
+            "pk",
+            filter=Q(last_login__gte=month_start)
+            | Q(Exists(recent_triage))
+            | Q(Exists(recent_appointment)),
+        ),
+        total_doctors_with_profiles=Count("doctor_profile"),
+        doctors_with_availability=Count("doctor_profile", filter=Q(Exists(available))),
+    )
+
+
+def compute_metrics(trend_days: int = TREND_RANGES[0]) -> Dict[str, Any]:
+    """The dashboard context, computed from the database in four queries."""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    week_ago, month_ago = today - timedelta(days=7), today - timedelta(days=30)
+    first = min(month_ago, today - timedelta(days=trend_days - 1))
+
+    users = _user_counts(day_bounds(month_ago)[0])
+    triages = _totals(TriageInteraction.objects.all(), TRIAGE_COUNTS)
+    appointments = _totals(Appointment.objects.all(), APPOINTMENT_COUNTS)
+    daily = read_days(first, today, [NEW_USERS, TRIAGES, APPOINTMENTS])
+
+    total_triages = triages["total"]
+    by_severity = {s: triages[f"severity_{s.lower()}"] for s in SEVERITIES}
+    # Unset or unexpected severities are shown as "Unknown"
+    by_severity[None] = total_triages - sum(by_severity.values())
+    severity_dist = sorted(
+        ({"severity": s, "count": n} for s, n in by_severity.items() if n),
+        key=lambda item: -item["count"],
+    )
+
+    total_appointments = appointments["total"]
+    by_status = {s: appointments[f"status_{s}"] for s in APPOINTMENT_STATUSES}
+    appointment_status_dist = sorted(
+        ({"status": s, "count": n} for s, n in by_status.items() if n),
+        key=lambda item: -item["count"],
+    )
+
+    onboarding_rate = _rate(users["onboarding_completed"], users["total_users"])
+    triage_review_rate = _rate(triages["reviewed"], total_triages)
+    verification_rate = _rate(triages["verified"], total_triages)
+    appointment_completion_rate = _rate(by_status["completed"], total_appointments)
+    doctors = users["total_doctors_with_profiles"]
+    satisfaction_score = (
+        onboarding_rate * 0.2
+        + triage_review_rate * 0.3
+        + verification_rate * 0.2
+        + appointment_completion_rate * 0.3
+    )
+
+    return {
+        **users,
+        "onboarding_rate": round(onboarding_rate, 1),
+        "new_users_month": _sum(daily, NEW_USERS, since=month_ago),
+        "new_users_week": _sum(daily, NEW_USERS, since=week_ago),
+        # Triage
+        "total_triages": total_triages,
+        "triages_this_month": _sum(daily, TRIAGES, since=month_ago),
+        "triages_this_week": _sum(daily, TRIAGES, since=week_ago),
+        "triages_today": _sum(daily, TRIAGES, since=today),
+        "severity_dist": severity_dist,
+        "triages_reviewed": triages["reviewed"],
+        "triage_review_rate": round(triage_review_rate, 1),
+        "triages_pending_review": triages["pending_review"],
+        "triages_under_review": triages["under_review"],
+        "triages_verified": triages["verified"],
+        "triages_with_discrepancy": triages["discrepancy"],
+        "verification_rate": round(verification_rate, 1),
+        # Appointments
+        "total_appointments": total_appointments,
+        "appointments_this_month": _sum(daily, APPOINTMENTS, since=month_ago),
+        "appointments_this_week": _sum(daily, APPOINTMENTS, since=week_ago),
+        "appointments_today": _sum(daily, APPOINTMENTS, since=today),
+        "appointment_status_dist": appointment_status_dist,
+        "completed_appointments": by_status["completed"],
+        "appointment_completion_rate": round(appointment_completion_rate, 1),
+        "cancelled_appointments": by_status["cancelled"],
+        "cancellation_rate": round(_rate(by_status["cancelled"], total_appointments), 1),
+        # Doctors
+        "avg_appointments_per_doctor": round(total_appointments / doctors if doctors else 0, 1),
+        # Trends
+        "trend_days": trend_days,
+        "trend_ranges": TREND_RANGES,
+        "triage_trends": _trend(daily, TRIAGES, today, trend_days),
+        "appointment_trends": _trend(daily, APPOINTMENTS, today, trend_days),
+        # Ranges read zero until manage.py rollup_metrics has run today
+        "rollup_missing": today not in daily,
+        "satisfaction_score": round(satisfaction_score, 1),
+        "last_updated": now,
+    }
+
+
+def dashboard_metrics(trend_days: int = TREND_RANGES[0]) -> Dict[str, Any]:
+    """The cached dashboard snapshot, recomputed by one caller when it expires."""
+    config = dashboard_config()
+    if config["TTL"] <= 0:
+        return compute_metrics(trend_days)
+    cache = caches[config["CACHE_ALIAS"]]
+    key = f"{SNAPSHOT_KEY}:{trend_days}"
+    entry = cache.get(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["metrics"]
+    return _flight.do(key, lambda: _refresh(cache, config, key, trend_days, entry))
+
+
+def _refresh(
+    cache, config: Dict[str, Any], key: str, trend_days: int, stale: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    lock_key = f"{REFRESH_LOCK_KEY}:{trend_days}"
+    entry = cache.get(key)
+    if entry is not None and entry["fresh_until"] > time.time():
+        return entry["metrics"]  # refreshed while this caller waited
+    locked = cache.add(lock_key, True, timeout=config["REFRESH_LOCK_SECONDS"])
+    if not locked and stale is not None:
+        # Another worker is recomputing; the expired snapshot will do until then
+        return stale["metrics"]
+    try:
+        metrics = compute_metrics(trend_days)
+        cache.set(
+            key,
+            {"metrics": metrics, "fresh_until": time.time() + config["TTL"]},
+            timeout=config["TTL"] + config["STALE_SECONDS"],
+        )
+        return metrics
+    finally:
+        if locked:
+            cache.delete(lock_key)
@@ -0,0 +1,217 @@
+"""
+A local stand-in for the Gemini API, for load tests and benchmarks.
+
+``FakeGemini`` decides how each call goes: it waits for a latency drawn
+from a configurable distribution, fails with a 429/500/503 at
+``error_rate``, and at ``malformed_rate`` answers with one of the broken
+outputs real models produce. Otherwise it answers with valid JSON built by
+the offline triage rules, so severities are plausible for the symptoms.
+Repair requests are answered like any other prompt.
+
+``make_server`` serves it over HTTP for ``HTTPTransport``:
+
+    POST /v1/models/<model>:generateContent        {"prompt"} -> {"text"}
+    POST /v1/models/<model>:streamGenerateContent  {"prompt"} -> {"text"} per line
+    GET  /stats                                    counters
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, NamedTuple, Optional, Sequence
+from urllib.parse import unquote
+
+from carelink.common.services.triage_rules import assess
+
+TRIAGE_KEYS = ("severity", "summary", "advice", "red_flags", "differential", "rationale")
+ERROR_STATUSES = (
+    (429, "RESOURCE_EXHAUSTED: quota exceeded"),
+    (500, "INTERNAL: internal error"),
+    (503, "UNAVAILABLE: the model is overloaded"),
+)
+# How each kind of broken answer is handled by GeminiClient: extracted from
+# prose, fixed by local repair, sent back for network repair, or unusable
+MALFORMED_KINDS = ("prose_wrapped", "trailing_comma", "truncated", "no_json")
+STREAM_CHUNK_CHARS = 24
+
+_SYMPTOMS = re.compile(r"PATIENT_SYMPTOM_DESCRIPTION:\n(.*?)(?:\n\n|$)", re.DOTALL)
+_ROUTE = re.compile(r"^/v1/models/([^/:]+):(generateContent|streamGenerateContent)$")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    A latency sampler (seconds) from ``kind:params``: ``fixed:0.5``,
+    ``uniform:0.2,1.5``, ``normal:0.8,0.2``, ``lognormal:0.8,0.5`` (median,
+    sigma) or ``exponential:0.8`` (mean).
+    """
+    kind, _, params = (spec or "fixed:0").partition(":")
+    try:
+        args = [float(p) for p in params.split(",") if p.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid latency spec {spec!r}") from None
+    samplers = {
+        ("fixed", 1): lambda rng: args[0],
+        ("uniform", 2): lambda rng: rng.uniform(args[0], args[1]),
+        ("normal", 2): lambda rng: rng.gauss(args[0], args[1]),
+        ("lognormal", 2): lambda rng: args[0] * rng.lognormvariate(0, args[1]),
+        ("exponential", 1): lambda rng: rng.expovariate(1 / args[0]) if args[0] else 0.0,
+    }
+    sampler = samplers.get((kind.strip().lower(), len(args)))
+    if sampler is None:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    return lambda rng: max(0.0, sampler(rng))
+
+
+class Reply(NamedTuple):
+    status: int
+    text: str  # the answer, or the error message
+    delay: float
+    kind: str  # "ok", "error" or one of MALFORMED_KINDS
+
+
+def valid_answer(prompt: str) -> str:
+    match = _SYMPTOMS.search(prompt)
+    result = assess(match.group(1) if match else prompt)
+    return json.dumps({key: result[key] for key in TRIAGE_KEYS})
+
+
+def malformed_answer(kind: str, answer: str) -> str:
+    if kind == "prose_wrapped":
+        return f"Sure! Here is the assessment:\n{answer}\nLet me know if you need more."
+    if kind == "trailing_comma":
+        return answer[:-1] + ",}"
+    if kind == "truncated":
+        # Cut before the first value, which local repair cannot recover
+        return answer[: answer.index(":") + 2]
+    return "I'm sorry, I can't provide a structured assessment for this request."
+
+
+class FakeGemini:
+    """Decides latency and outcome of each fake call; thread-safe."""
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        malformed_kinds: Sequence[str] = MALFORMED_KINDS,
+        seed: Optional[int] = None,
+    ) -> None:
+        unknown = set(malformed_kinds) - set(MALFORMED_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown malformed kinds: {sorted(unknown)}")
+        if not 0 <= error_rate + malformed_rate <= 1:
+            raise ValueError("error_rate + malformed_rate must be between 0 and 1")
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.malformed_kinds = tuple(malformed_kinds)
+        self.counts: Counter[str] = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def reply(self, model: str, prompt: str) -> Reply:
+        with self._lock:
+            delay = self.latency(self._rng)
+            roll = self._rng.random()
+            status, text = self._rng.choice(ERROR_STATUSES)
+            kind = self._rng.choice(self.malformed_kinds)
+        if roll < self.error_rate:
+            reply = Reply(status, text, delay, "error")
+        elif roll < self.error_rate + self.malformed_rate:
+            reply = Reply(200, malformed_answer(kind, valid_answer(prompt)), delay, kind)
+        else:
+            reply = Reply(200, valid_answer(prompt), delay, "ok")
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts[reply.kind] += 1
+        return reply
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeGeminiServer"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.server.fake.stats())
+        else:
+            self._send_json(404, {"error": "NOT_FOUND"})
+
+    def do_POST(self):
+        match = _ROUTE.match(self.path)
+        if not match:
+            self._send_json(404, {"error": f"NOT_FOUND: no route for {self.path}"})
+            return
+        model, method = unquote(match.group(1)), match.group(2)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            prompt = json.loads(self.rfile.read(length) or b"{}")["prompt"]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": 'INVALID_ARGUMENT: expected {"prompt": ...}'})
+            return
+
+        reply = self.server.fake.reply(model, prompt)
+        if reply.status != 200 or method == "generateContent":
+            time.sleep(reply.delay)
+            if reply.status != 200:
+                self._send_json(reply.status, {"error": reply.text})
+            else:
+                self._send_json(200, {"text": reply.text})
+            return
+
+        # Streaming: the delay is spread over the chunks, so the first text
+        # arrives before the whole answer is ready
+        pieces = [
+            reply.text[i : i + STREAM_CHUNK_CHARS]
+            for i in range(0, len(reply.text), STREAM_CHUNK_CHARS)
+        ] or [""]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for piece in pieces:
+            time.sleep(reply.delay / len(pieces))
+            self.wfile.write(json.dumps({"text": piece}).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fake: FakeGemini, verbose: bool = False) -> None:
+        super().__init__(address, _Handler)
+        self.fake = fake
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def make_server(
+    fake: FakeGemini, host: str = "127.0.0.1", port: int = 8765, verbose: bool = False
+) -> FakeGeminiServer:
+    """Bind the server (``port=0`` picks a free port); call ``serve_forever`` to run it."""
+    return FakeGeminiServer((host, port), fake, verbose=verbose)
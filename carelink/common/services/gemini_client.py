@@ -1,9 +1,48 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
+import threading
 import time
-from typing import Any, Dict, Optional
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import wait as wait_futures
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+from carelink.common.services.gemini_transport import (
+    CassetteTransport,
+    HTTPTransport,
+    transport_config,
+)
+from carelink.common.services.hedging import (
+    get_hedge_stats,
+    hedge_executor,
+    hedging_config,
+)
+from carelink.common.services.json_extract import JSONObjectExtractor, extract_first_object
+from carelink.common.services.json_repair import get_repair_stats, repair_json
+from carelink.common.services.llm_metrics import get_llm_metrics
+from carelink.common.services.model_health import get_model_health
+from carelink.common.services.prompt_budget import (
+    CHARS_PER_TOKEN,
+    DEFAULT_MAX_PROMPT_TOKENS,
+    measure_sections,
+    truncate_middle,
+)
+from carelink.common.services.retry_policy import (
+    FATAL,
+    MODEL,
+    Deadline,
+    DeadlineExceeded,
+    RetryPolicy,
+    classify_error,
+)
+from carelink.common.services.singleflight import get_singleflight
+from carelink.common.services.triage_cache import TriageCache, get_triage_cache, make_cache_key
+from carelink.common.types.triage import PreliminaryTriage, canonical_severity
 
 try:
     # New SDK style: from google import genai
@@ -17,7 +56,6 @@ try:
 except Exception:  # pragma: no cover
     genai_legacy = None
 
-
 DEFAULT_MODEL = "gemini-2.0-flash"
 FALLBACK_MODELS = [
     "gemini-2.5-flash",
@@ -42,8 +80,45 @@ SYSTEM_INSTRUCTIONS = (
     "STYLE: Be concise, plain language, no markdown, no extra keys.\n"
 )
 
-JSON_OPEN = re.compile(r"\{", re.MULTILINE)
-JSON_CLOSE = re.compile(r"\}", re.MULTILINE)
+RESPONSE_FORMAT = (
+    "RESPONSE_FORMAT:\n"
+    "{\n"
+    '  "severity": "Mild|Moderate|Severe|Critical",\n'
+    '  "summary": "short summary",\n'
+    '  "advice": "next steps for patient",\n'
+    '  "red_flags": ["..."],\n'
+    '  "differential": ["..."],\n'
+    '  "rationale": "plain-language reasoning"\n'
+    "}\n"
+)
+
+# The legacy SDK takes the instructions natively, once per model object,
+# so they are not repeated in every request
+LEGACY_SYSTEM_INSTRUCTION = f"{SYSTEM_INSTRUCTIONS}\n{RESPONSE_FORMAT}"
+
+# Context fields shortened, in order, when a prompt is over budget
+CONTEXT_TRIM_STEPS = (("medical_history", 120), ("allergies", 60))
+# Most of a malformed reply sent back for repair
+REPAIR_MAX_CHARS = 4000
+
+# Bump whenever SYSTEM_INSTRUCTIONS or the prompt layout changes so cached
+# results produced by the old prompt are no longer served.
+PROMPT_VERSION = "2"
+
+PARSE_FALLBACK_RESULT = {
+    "severity": "Moderate",
+    "summary": "Unable to parse model response.",
+    "advice": ("Consider contacting a healthcare professional " "for guidance."),
+    "red_flags": [],
+    "differential": [],
+    "rationale": "Fallback response.",
+}
+
+# Free-text fields forwarded to the browser while a response streams in
+STREAMED_FIELDS = ("summary", "advice")
+
+# A network repair is skipped when less budget than this is left
+MIN_REPAIR_SECONDS = 2.0
 
 
 def _strip_code_fences(s: str) -> str:
@@ -54,39 +129,171 @@ def _strip_code_fences(s: str) -> str:
 
 
 def _extract_json_block(s: str) -> str | None:
-    start_iter = [m.start() for m in JSON_OPEN.finditer(s)]
-    for start in start_iter:
-        depth = 0
-        for i in range(start, len(s)):
-            if s[i] == "{":
-                depth += 1
-            elif s[i] == "}":
-                depth -= 1
-                if depth == 0:
-                    chunk = s[start : i + 1]
-                    return chunk
-    return None
+    return extract_first_object(s)
 
 
-class GeminiClient:
+def _parse_with_path(cleaned: str) -> Tuple[dict | None, str]:
+    """Parse model text as JSON, falling back to the first embedded object."""
+    try:
+        return json.loads(cleaned), "direct"
+    except Exception:
+        pass
+
+    chunk = _extract_json_block(cleaned)
+    if chunk:
+        try:
+            return json.loads(chunk), "extracted"
+        except Exception:
+            pass
+    return None, "fallback"
+
+
+def _parse_json_text(cleaned: str) -> dict | None:
+    return _parse_with_path(cleaned)[0]
+
+
+def _is_valid_triage(raw_text: str) -> bool:
+    """True when ``raw_text`` parses (or locally repairs) into a dict with a known severity."""
+    cleaned = _strip_code_fences(raw_text or "")
+    data = _parse_json_text(cleaned) or repair_json(cleaned, record=False)
+    return isinstance(data, dict) and canonical_severity(data.get("severity")) is not None
+
+
+def _bounded(timeout: Optional[float], deadline: Deadline) -> Optional[float]:
+    """``timeout`` capped by what is left of ``deadline`` (None means no limit)."""
+    remaining = deadline.remaining()
+    if remaining is None:
+        return timeout
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _response_text(resp: Any) -> str:
+    text = getattr(resp, "text", "") or ""
+    if not text:
+        try:
+            parts = getattr(resp, "candidates", [])[0].content.parts  # type: ignore
+            text = "".join(getattr(p, "text", "") for p in parts if hasattr(p, "text"))
+        except Exception:
+            text = ""
+    return text
+
+
+def _repair_prompt(malformed: str, include_system: bool = True) -> str:
+    """Ask the model to fix its own output rather than answer the request again."""
+    return (
+        (f"{SYSTEM_INSTRUCTIONS}\n" if include_system else "")
+        + "Return STRICT JSON only. No prose, no markdown fences. "
+        "Rewrite the malformed output below as valid JSON with exactly the keys "
+        "severity, summary, advice, red_flags, differential, rationale.\n\n"
+        "MALFORMED_OUTPUT:\n"
+        f"{truncate_middle(malformed.strip(), REPAIR_MAX_CHARS)}\n"
+    )
+
+
+def _unparsed_result(cleaned: str) -> dict:
+    return {
+        "severity": "Moderate",
+        "summary": cleaned.strip() or "Unable to parse model response.",
+        "advice": "Consider contacting a healthcare professional for guidance.",
+        "red_flags": [],
+        "differential": [],
+        "rationale": ("Fallback response; JSON parsing failed after repair."),
+        # Never cache a result the model did not actually produce
+        "_fallback": True,
+    }
+
+
+def _shape_result(data: dict) -> Dict[str, Any]:
+    return PreliminaryTriage.from_raw(data).to_dict()
+
+
+class _StreamingFieldReader:
     """
-    Minimal Gemini wrapper for preliminary triage generation.
-    Returns a parsed dict with keys:
-      - severity: "Mild"|"Moderate"|"Severe"|"Critical"
-      - summary: str
-      - advice: str
-      - red_flags: list[str]
-      - differential: list[str]
-      - rationale: str
+    Pulls the values of selected top-level string fields out of a JSON
+    document while it is still arriving, so their text can be shown before
+    the object is complete. Only newly decoded characters are returned.
+    """
+
+    _ESCAPES = {
+        '"': '"',
+        "\\": "\\",
+        "/": "/",
+        "b": "\b",
+        "f": "\f",
+        "n": "\n",
+        "r": "\r",
+        "t": "\t",
+    }
+
+    def __init__(self, fields: Tuple[str, ...]) -> None:
+        self._buffer = ""
+        self._openers = {f: re.compile(r'"%s"\s*:\s*"' % re.escape(f)) for f in fields}
+        # field -> index of the next undecoded character of its value
+        self._cursor: Dict[str, int] = {}
+        self._done: set[str] = set()
+
+    def feed(self, text: str) -> list[Tuple[str, str]]:
+        self._buffer += text
+        out = []
+        for field, opener in self._openers.items():
+            if field in self._done:
+                continue
+            if field not in self._cursor:
+                match = opener.search(self._buffer)
+                if match is None:
+                    continue
+                self._cursor[field] = match.end()
+            delta = self._decode(field)
+            if delta:
+                out.append((field, delta))
+        return out
+
+    def _decode(self, field: str) -> str:
+        buf = self._buffer
+        i = self._cursor[field]
+        out = []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done.add(field)
+                i += 1
+                break
+            if ch == "\\":
+                if i + 1 >= len(buf):
+                    break  # escape split across chunks; wait for more text
+                code = buf[i + 1]
+                if code == "u":
+                    if i + 6 > len(buf):
+                        break
+                    try:
+                        out.append(chr(int(buf[i + 2 : i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(self._ESCAPES.get(code, code))
+                i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._cursor[field] = i
+        return "".join(out)
+
+
+class SDKTransport:
+    """
+    Sends prompts through the installed Gemini SDK: ``google-genai`` when
+    available, else the legacy ``google-generativeai`` package.
     """
 
     def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL) -> None:
-        self.api_key = api_key
-        self.model = model
         self.enabled = bool(api_key) and (genai_new is not None or genai_legacy is not None)
         self._api_variant = None  # "new" | "legacy" | None
         self._client = None
         self._model_obj = None
+        # Legacy GenerativeModel objects, built once per model name
+        self._legacy_models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
 
         if not self.enabled:
             return
@@ -105,214 +312,662 @@ class GeminiClient:
             try:
                 genai_legacy.configure(api_key=api_key)
                 self._model_obj = genai_legacy.GenerativeModel(
-                    model,
-                    system_instruction=(
-                        "You are a careful, conservative medical "
-                        "triage assistant.\n"
-                        "Respond ONLY in compact JSON with keys: severity, "
-                        "summary, advice, red_flags, differential, "
-                        "rationale.\n"
-                        "severity must be one of: Mild, Moderate, "
-                        "Severe, Critical.\n"
-                        "Keep advice general and instruct patients to seek "
-                        "professional care for concerning symptoms.\n"
-                        "This is NOT medical advice or diagnosis. "
-                        "Be concise."
-                    ),
+                    model, system_instruction=LEGACY_SYSTEM_INSTRUCTION
                 )
+                self._legacy_models[model] = self._model_obj
                 self._api_variant = "legacy"
             except Exception:
                 self._model_obj = None
                 self._api_variant = None
 
+    @property
+    def ready(self) -> bool:
+        if self._api_variant == "new":
+            return self._client is not None
+        return self._api_variant == "legacy" and self._model_obj is not None
+
+    @property
+    def native_system_instruction(self) -> bool:
+        return self._api_variant == "legacy"
+
+    def _legacy_model(self, model_name: str):
+        model_obj = self._legacy_models.get(model_name)
+        if model_obj is None:
+            with self._lock:
+                model_obj = self._legacy_models.get(model_name)
+                if model_obj is None:
+                    model_obj = genai_legacy.GenerativeModel(
+                        model_name, system_instruction=LEGACY_SYSTEM_INSTRUCTION
+                    )
+                    self._legacy_models[model_name] = model_obj
+        return model_obj
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        if self._api_variant == "new":
+            contents = [{"role": "user", "parts": [{"text": prompt}]}]
+            resp = self._client.models.generate_content(model=model_name, contents=contents)
+        else:
+            resp = self._legacy_model(model_name).generate_content(prompt)
+        return _response_text(resp)
+
+    def stream(self, model_name: str, prompt: str) -> Iterator[str]:
+        if self._api_variant == "new":
+            contents = [{"role": "user", "parts": [{"text": prompt}]}]
+            stream = self._client.models.generate_content_stream(
+                model=model_name, contents=contents
+            )
+        else:
+            stream = self._legacy_model(model_name).generate_content(prompt, stream=True)
+        for chunk in stream:
+            text = _response_text(chunk)
+            if text:
+                yield text
+
+    async def agenerate(self, model_name: str, prompt: str) -> str:
+        if self._api_variant == "new":
+            contents = [{"role": "user", "parts": [{"text": prompt}]}]
+            resp = await self._client.aio.models.generate_content(
+                model=model_name, contents=contents
+            )
+        else:
+            resp = await self._legacy_model(model_name).generate_content_async(prompt)
+        return _response_text(resp)
+
+
+def build_transport(api_key: Optional[str] = None, model: str = DEFAULT_MODEL):
+    """The transport selected by ``settings.GEMINI_TRANSPORT["BACKEND"]``."""
+    config = transport_config()
+    backend = config["BACKEND"]
+    if backend == "http":
+        return HTTPTransport(config["HTTP_URL"], timeout=config["HTTP_TIMEOUT"])
+    if backend == "cassette":
+        inner = SDKTransport(api_key, model) if config["CASSETTE_MODE"] == "record" else None
+        return CassetteTransport(config["CASSETTE_PATH"], config["CASSETTE_MODE"], inner=inner)
+    return SDKTransport(api_key, model)
+
+
+class GeminiClient:
+    """
+    Minimal Gemini wrapper for preliminary triage generation.
+    Returns a parsed dict with keys:
+      - severity: "Mild"|"Moderate"|"Severe"|"Critical"
+      - summary: str
+      - advice: str
+      - red_flags: list[str]
+      - differential: list[str]
+      - rationale: str
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = DEFAULT_MODEL,
+        cache: Optional[TriageCache] = None,
+        transport: Optional[Any] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.model = model
+        # None means the process-wide cache configured by settings.TRIAGE_CACHE
+        self.cache = cache
+        # How prompts reach a model: the SDK, a cassette or the fake server
+        # (see gemini_transport and settings.GEMINI_TRANSPORT)
+        self.transport = transport if transport is not None else build_transport(api_key, model)
+        self.enabled = self.transport.enabled
+
     def generate_triage(
-        self, symptoms_text: str, patient_context: Optional[Dict[str, Any]] = None
+        self,
+        symptoms_text: str,
+        patient_context: Optional[Dict[str, Any]] = None,
+        hedge: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
     ) -> Dict[str, Any]:
         """
         Returns a dict; if API missing/unavailable, raises RuntimeError.
+        Results for a previously seen prompt come from the triage cache and
+        carry ``cached: True``; identical prompts already in flight share one
+        Gemini call (see ``singleflight``). ``hedge`` overrides
+        ``GEMINI_HEDGING["ENABLED"]``. ``deadline`` bounds the whole call
+        including retries and repair (default: ``TRIAGE_DEADLINES["default"]``);
+        ``DeadlineExceeded`` is raised once it runs out.
         """
-        if not self.enabled:
-            raise RuntimeError(
-                "Gemini not configured. Set GEMINI_API_KEY and install "
-                "google-genai / google-generativeai."
+        self._ensure_enabled()
+        deadline = deadline or Deadline.for_endpoint("default")
+        prompt = self._build_prompt(symptoms_text, patient_context=patient_context)
+        cache = self._result_cache()
+        key = self.cache_key(prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        def call() -> Dict[str, Any]:
+            raw = self._request_with_retry(
+                prompt, hedge=self._should_hedge(hedge), deadline=deadline
             )
+            return self._finish(raw, prompt, cache, key, deadline)
+
+        return get_singleflight().do(key, call, deadline, lookup=lambda: cache.peek(key))
 
+    def stream_triage(
+        self,
+        symptoms_text: str,
+        patient_context: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Streaming variant of ``generate_triage``. Yields ``("token", {"field",
+        "text"})`` events as summary/advice text arrives, then exactly one
+        ``("result", dict)`` event holding the parsed, validated result.
+        """
+        self._ensure_enabled()
+        deadline = deadline or Deadline.for_endpoint("default")
         prompt = self._build_prompt(symptoms_text, patient_context=patient_context)
-        raw = self._request_with_retry(prompt)
+        cache = self._result_cache()
+        key = self.cache_key(prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            yield ("result", cached)
+            return
+
+        self._ensure_variant()
+        chunks: list[str] = []
+        reader = _StreamingFieldReader(STREAMED_FIELDS)
+        extractor = JSONObjectExtractor()
+        model_name = self._candidate_models()[0]
+        started = time.monotonic()
+        stream = self._stream_once(model_name, prompt)
         try:
-            data = self._parse_or_repair(raw, prompt)
-            return {
-                "severity": data.get("severity", "Moderate"),
-                "summary": data.get("summary", "No summary provided."),
-                "advice": data.get(
-                    "advice", "Consider contacting a healthcare professional " "for guidance."
-                ),
-                "red_flags": data.get("red_flags", []) or [],
-                "differential": data.get("differential", []) or [],
-                "rationale": data.get("rationale", "No rationale provided."),
-            }
+            for text in stream:
+                chunks.append(text)
+                for field, delta in reader.feed(text):
+                    yield ("token", {"field": field, "text": delta})
+                if extractor.feed(text):
+                    # The answer object is complete; skip any trailing prose
+                    chunks = extractor.objects[:1]
+                    break
+                if deadline.expired():
+                    # Out of time: finish with what has arrived so far
+                    break
+            self._observe(model_name, started, prompt, 1, "".join(chunks), purpose="stream")
+        except Exception as exc:
+            self._observe(model_name, started, prompt, 1, error=exc, purpose="stream")
+            if not chunks:
+                if classify_error(exc) == FATAL:
+                    raise RuntimeError(f"Gemini error: {exc}") from exc
+                # Nothing reached the client yet: use the regular path with
+                # retries and model fallbacks instead.
+                chunks = [self._request_with_retry(prompt, deadline=deadline)]
+        finally:
+            stream.close()
+
+        yield ("result", self._finish("".join(chunks), prompt, cache, key, deadline))
+
+    def _finish(
+        self, raw: str, prompt: str, cache: TriageCache, key: str, deadline: Deadline
+    ) -> Dict[str, Any]:
+        try:
+            data = self._parse_or_repair(raw, prompt, deadline)
         except Exception:
-            return {
-                "severity": "Moderate",
-                "summary": "Unable to parse model response.",
-                "advice": ("Consider contacting a healthcare professional " "for guidance."),
-                "red_flags": [],
-                "differential": [],
-                "rationale": "Fallback response.",
-            }
-
-    def _request_with_retry(self, prompt: str) -> str:
+            return dict(PARSE_FALLBACK_RESULT)
+        result = _shape_result(data)
+        if not data.get("_fallback"):
+            cache.set(key, result)
+        return result
+
+    async def agenerate_triage(
+        self,
+        symptoms_text: str,
+        patient_context: Optional[Dict[str, Any]] = None,
+        hedge: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Dict[str, Any]:
+        """
+        Async twin of ``generate_triage`` for ASGI views. Retries and model
+        fallbacks await instead of blocking the worker thread, and each call
+        is cancelled when the deadline passes.
+        """
+        self._ensure_enabled()
+        deadline = deadline or Deadline.for_endpoint("default")
+        prompt = self._build_prompt(symptoms_text, patient_context=patient_context)
+        cache = self._result_cache()
+        key = self.cache_key(prompt)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return cached
+
+        async def call() -> Dict[str, Any]:
+            raw = await self._arequest_with_retry(
+                prompt, hedge=self._should_hedge(hedge), deadline=deadline
+            )
+            try:
+                data = await self._aparse_or_repair(raw, prompt, deadline)
+            except Exception:
+                return dict(PARSE_FALLBACK_RESULT)
+            result = _shape_result(data)
+            if not data.get("_fallback"):
+                await cache.aset(key, result)
+            return result
+
+        return await get_singleflight().ado(key, call, deadline, lookup=lambda: cache.apeek(key))
+
+    def cache_key(self, prompt: str) -> str:
+        """Content address of ``prompt`` for this client's model and prompt version."""
+        return make_cache_key(prompt, self.model, PROMPT_VERSION)
+
+    def _result_cache(self) -> TriageCache:
+        return self.cache if self.cache is not None else get_triage_cache()
+
+    def _ensure_enabled(self) -> None:
         if not self.enabled:
             raise RuntimeError(
                 "Gemini not configured. Set GEMINI_API_KEY and install "
                 "google-genai / google-generativeai."
             )
 
+    def _ensure_variant(self) -> None:
+        if not self.transport.ready:
+            raise RuntimeError(
+                "Gemini not configured. Set GEMINI_API_KEY and install google-generativeai."
+            )
+
+    def _generate_once(self, model_name: str, prompt: str) -> str:
+        return self.transport.generate(model_name, prompt)
+
+    def _stream_once(self, model_name: str, prompt: str) -> Iterator[str]:
+        return self.transport.stream(model_name, prompt)
+
+    async def _agenerate_once(self, model_name: str, prompt: str) -> str:
+        return await self.transport.agenerate(model_name, prompt)
+
+    def _candidate_models(self) -> list[str]:
+        """Models for this request, healthiest first, with open breakers skipped."""
+        return get_model_health().route([self.model] + FALLBACK_MODELS)
+
+    def _should_hedge(self, hedge: Optional[bool]) -> bool:
+        return hedging_config()["ENABLED"] if hedge is None else bool(hedge)
+
+    def _observe(
+        self,
+        model_name: str,
+        started: float,
+        prompt: str,
+        attempt: int,
+        text: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        purpose: str = "triage",
+    ) -> float:
+        """Record a finished call with the model breakers and the LLM metrics."""
+        elapsed = time.monotonic() - started
+        if error is None:
+            get_model_health().record_success(model_name, elapsed)
+        else:
+            get_model_health().record_failure(model_name, elapsed)
+        get_llm_metrics().record_call(
+            model_name, attempt, elapsed, prompt, text, error=error, purpose=purpose
+        )
+        return elapsed
+
+    def _timed_generate(
+        self, model_name: str, prompt: str, attempt: int = 1
+    ) -> Tuple[Optional[str], float]:
+        """One call to ``model_name``; returns (text or None on error, latency)."""
+        started = time.monotonic()
+        try:
+            text = self._generate_once(model_name, prompt)
+        except Exception as exc:
+            return None, self._observe(model_name, started, prompt, attempt, error=exc)
+        return text, self._observe(model_name, started, prompt, attempt, text)
+
+    def _hedged_request(self, prompt: str, deadline: Deadline) -> Optional[str]:
+        """
+        Call the first routed model and, if it has not answered within the
+        hedge delay (or answered badly), the second one too. Returns the first
+        answer that parses into a valid triage dict, else any text received,
+        else None so the caller falls back to the regular retry sweeps.
+        """
+        models = self._candidate_models()[:2]
+        delay = hedging_config()["DELAY_SECONDS"]
+        executor = hedge_executor()
+        pending = {executor.submit(self._timed_generate, models[0], prompt, 1): models[0]}
+        backups = models[1:]
+        hedged = False
+        fallback_text: Optional[str] = None
+        try:
+            while pending:
+                timeout = _bounded(delay if backups and not hedged else None, deadline)
+                done, _ = wait_futures(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    deadline.check()
+                    # Primary is slow: race it against the next model
+                    hedged = True
+                    model = backups.pop(0)
+                    pending[executor.submit(self._timed_generate, model, prompt, 2)] = model
+                    continue
+                for future in done:
+                    model = pending.pop(future)
+                    text, _elapsed = future.result()
+                    if text is not None and _is_valid_triage(text):
+                        for loser in pending:
+                            # Running calls cannot be interrupted; their result is dropped
+                            loser.cancel()
+                        get_hedge_stats().record_outcome(model, list(pending.values()))
+                        return text
+                    if text:
+                        fallback_text = fallback_text or text
+                if not pending and backups:
+                    # Primary answered badly before the delay: go straight to the backup
+                    model = backups.pop(0)
+                    pending[executor.submit(self._timed_generate, model, prompt, 2)] = model
+            get_hedge_stats().record_outcome(None, [])
+            return fallback_text
+        finally:
+            for future in pending:
+                future.cancel()
+            get_hedge_stats().record_request(hedged)
+
+    async def _atimed_generate(
+        self, model_name: str, prompt: str, deadline: Deadline, attempt: int = 1
+    ) -> Optional[str]:
+        started = time.monotonic()
+        try:
+            text = await asyncio.wait_for(
+                self._agenerate_once(model_name, prompt), timeout=deadline.remaining()
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self._observe(model_name, started, prompt, attempt, error=exc)
+            return None
+        self._observe(model_name, started, prompt, attempt, text)
+        return text
+
+    async def _ahedged_request(self, prompt: str, deadline: Deadline) -> Optional[str]:
+        """Async ``_hedged_request``; the losing call is cancelled outright."""
+        models = self._candidate_models()[:2]
+        delay = hedging_config()["DELAY_SECONDS"]
+        pending = {
+            asyncio.ensure_future(self._atimed_generate(models[0], prompt, deadline)): models[0]
+        }
+        backups = models[1:]
+        hedged = False
+        fallback_text: Optional[str] = None
+        try:
+            while pending:
+                timeout = _bounded(delay if backups and not hedged else None, deadline)
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    deadline.check()
+                    hedged = True
+                    model = backups.pop(0)
+                    pending[
+                        asyncio.ensure_future(self._atimed_generate(model, prompt, deadline, 2))
+                    ] = model
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    text = task.result()
+                    if text is not None and _is_valid_triage(text):
+                        get_hedge_stats().record_outcome(model, list(pending.values()))
+                        return text
+                    if text:
+                        fallback_text = fallback_text or text
+                if not pending and backups:
+                    model = backups.pop(0)
+                    pending[
+                        asyncio.ensure_future(self._atimed_generate(model, prompt, deadline, 2))
+                    ] = model
+            get_hedge_stats().record_outcome(None, [])
+            return fallback_text
+        finally:
+            for task in pending:
+                task.cancel()
+            get_hedge_stats().record_request(hedged)
+
+    def _request_with_retry(
+        self,
+        prompt: str,
+        hedge: bool = False,
+        deadline: Optional[Deadline] = None,
+        purpose: str = "triage",
+    ) -> str:
+        self._ensure_enabled()
+        self._ensure_variant()
+        deadline = deadline or Deadline(None)
+
+        if hedge:
+            text = self._hedged_request(prompt, deadline)
+            if text is not None:
+                return text
+
+        policy = RetryPolicy.from_settings()
+        skipped: set[str] = set()
         last_err: Exception | None = None
-        for attempt in range(2):
-            try:
-                # New client path with model fallbacks
-                if self._api_variant == "new" and self._client is not None:
-                    last_err = None
-                    for model_name in [self.model] + FALLBACK_MODELS:
-                        try:
-                            contents = [{"role": "user", "parts": [{"text": prompt}]}]
-                            resp = self._client.models.generate_content(
-                                model=model_name, contents=contents
-                            )
-                            text = getattr(resp, "text", "") or ""
-                            if not text:
-                                try:
-                                    parts = getattr(resp, "candidates", [])[
-                                        0
-                                    ].content.parts  # type: ignore
-                                    text = "".join(
-                                        getattr(p, "text", "") for p in parts if hasattr(p, "text")
-                                    )
-                                except Exception:
-                                    text = ""
-                            return text
-                        except Exception as e:
-                            last_err = e
-                            # Continue to next model
-                            continue
-                    # If we exhausted all models, check if we should retry
-                    if attempt == 0 and last_err is not None:
-                        # Retry if it's a transient error
-                        if "Transient" in str(last_err):
-                            time.sleep(0.6)
-                            continue
-                    # If we can't retry, raise the error
-                    if last_err is not None:
-                        raise RuntimeError(f"Gemini error: {last_err}")
-                    raise RuntimeError("No models available")
-
-                # Legacy path with model fallbacks
-                elif self._api_variant == "legacy" and self._model_obj is not None:
-                    last_err = None
-                    model_obj = self._model_obj
-                    for model_name in [self.model] + FALLBACK_MODELS:
-                        try:
-                            if (
-                                model_obj is None
-                                or getattr(model_obj, "model_name", None) != model_name
-                            ):
-                                model_obj = genai_legacy.GenerativeModel(
-                                    model_name, system_instruction=SYSTEM_INSTRUCTIONS
-                                )
-                            resp = model_obj.generate_content(prompt)
-                            text = getattr(resp, "text", "") or ""
-                            if not text:
-                                try:
-                                    parts = getattr(resp, "candidates", [])[
-                                        0
-                                    ].content.parts  # type: ignore
-                                    text = "".join(
-                                        getattr(p, "text", "") for p in parts if hasattr(p, "text")
-                                    )
-                                except Exception:
-                                    text = ""
-                            return text
-                        except Exception as e:
-                            last_err = e
-                            # Continue to next model
-                            continue
-                    # If we exhausted all models, check if we should retry
-                    if attempt == 0 and last_err is not None:
-                        # Retry if it's a transient error
-                        if "Transient" in str(last_err):
-                            time.sleep(0.6)
-                            continue
-                    # If we can't retry, raise the error
-                    if last_err is not None:
-                        raise RuntimeError(f"Gemini error: {last_err}")
-                    raise RuntimeError("No models available")
-
-                else:
-                    raise RuntimeError(
-                        "Gemini not configured. Set GEMINI_API_KEY and "
-                        "install google-generativeai."
+        calls = 0
+        for attempt in range(policy.sweeps):
+            # Re-route each sweep so models that just failed are skipped
+            for model_name in self._candidate_models():
+                if model_name in skipped:
+                    continue
+                deadline.check()
+                calls += 1
+                started = time.monotonic()
+                try:
+                    text = self._generate_once(model_name, prompt)
+                except Exception as e:
+                    self._observe(model_name, started, prompt, calls, error=e, purpose=purpose)
+                    last_err = e
+                    kind = classify_error(e)
+                    if kind == FATAL:
+                        raise RuntimeError(f"Gemini error: {e}") from e
+                    if kind == MODEL:
+                        skipped.add(model_name)
+                    continue
+                self._observe(model_name, started, prompt, calls, text, purpose=purpose)
+                return text
+            if attempt + 1 < policy.sweeps:
+                delay = policy.backoff(attempt)
+                if not deadline.allows(delay):
+                    # Sleeping would use up the budget; fail now instead
+                    break
+                time.sleep(delay)
+        raise RuntimeError(f"Gemini error: {last_err}")
+
+    async def _arequest_with_retry(
+        self,
+        prompt: str,
+        hedge: bool = False,
+        deadline: Optional[Deadline] = None,
+        purpose: str = "triage",
+    ) -> str:
+        self._ensure_enabled()
+        self._ensure_variant()
+        deadline = deadline or Deadline(None)
+
+        if hedge:
+            text = await self._ahedged_request(prompt, deadline)
+            if text is not None:
+                return text
+
+        policy = RetryPolicy.from_settings()
+        skipped: set[str] = set()
+        last_err: Exception | None = None
+        calls = 0
+        for attempt in range(policy.sweeps):
+            for model_name in self._candidate_models():
+                if model_name in skipped:
+                    continue
+                deadline.check()
+                calls += 1
+                started = time.monotonic()
+                try:
+                    text = await asyncio.wait_for(
+                        self._agenerate_once(model_name, prompt), timeout=deadline.remaining()
                     )
-            except Exception as e:
-                last_err = e
-                # Retry on first attempt for transient errors
-                if attempt == 0:
-                    if "Transient" in str(e) or "transient" in str(e).lower():
-                        time.sleep(0.6)
-                        continue
-                    # For other errors, also retry once
-                    time.sleep(0.6)
+                except asyncio.TimeoutError as e:
+                    self._observe(model_name, started, prompt, calls, error=e, purpose=purpose)
+                    raise DeadlineExceeded(
+                        f"Gemini request exceeded its {deadline.seconds:g}s time budget"
+                    ) from e
+                except Exception as e:
+                    self._observe(model_name, started, prompt, calls, error=e, purpose=purpose)
+                    last_err = e
+                    kind = classify_error(e)
+                    if kind == FATAL:
+                        raise RuntimeError(f"Gemini error: {e}") from e
+                    if kind == MODEL:
+                        skipped.add(model_name)
                     continue
-                # On second attempt, raise the error
-                raise
+                self._observe(model_name, started, prompt, calls, text, purpose=purpose)
+                return text
+            if attempt + 1 < policy.sweeps:
+                delay = policy.backoff(attempt)
+                if not deadline.allows(delay):
+                    break
+                await asyncio.sleep(delay)
+        raise RuntimeError(f"Gemini error: {last_err}")
 
-    def _parse_or_repair(self, raw_text: str, original_prompt: str) -> dict:
+    def _parse_or_repair(
+        self, raw_text: str, original_prompt: str, deadline: Optional[Deadline] = None
+    ) -> dict:
+        metrics = get_llm_metrics()
         cleaned = _strip_code_fences(raw_text)
+        data, path = _parse_with_path(cleaned)
+        if data is None:
+            # Cheap deterministic fixes before paying for another round trip
+            data, path = repair_json(cleaned), "local_repair"
+        if data is not None:
+            metrics.record_parse(path)
+            return data
+
+        if deadline is not None and not deadline.allows(MIN_REPAIR_SECONDS):
+            metrics.record_parse("fallback")
+            return _unparsed_result(cleaned)
+
         try:
-            return json.loads(cleaned)
+            get_repair_stats().record_network()
+            repaired = self._request_with_retry(
+                self._repair_request(cleaned, original_prompt),
+                deadline=deadline,
+                purpose="repair",
+            )
+            repaired = _strip_code_fences(repaired)
+            data = _parse_json_text(repaired) or repair_json(repaired, record=False)
+            if data is not None:
+                metrics.record_parse("network_repair")
+                return data
         except Exception:
             pass
 
-        chunk = _extract_json_block(cleaned)
-        if chunk:
-            try:
-                return json.loads(chunk)
-            except Exception:
-                pass
-
-        repair_prompt = (
-            f"{SYSTEM_INSTRUCTIONS}\n\n"
-            "Return STRICT JSON only. No prose, no markdown fences. "
-            "If prior output was malformed, rewrite it as valid JSON "
-            "with the exact required keys.\n\n"
-            "PRIOR_REQUEST:\n"
-            f"{original_prompt}\n"
-        )
+        metrics.record_parse("fallback")
+        return _unparsed_result(cleaned)
+
+    async def _aparse_or_repair(
+        self, raw_text: str, original_prompt: str, deadline: Optional[Deadline] = None
+    ) -> dict:
+        metrics = get_llm_metrics()
+        cleaned = _strip_code_fences(raw_text)
+        data, path = _parse_with_path(cleaned)
+        if data is None:
+            # Cheap deterministic fixes before paying for another round trip
+            data, path = repair_json(cleaned), "local_repair"
+        if data is not None:
+            metrics.record_parse(path)
+            return data
+
+        if deadline is not None and not deadline.allows(MIN_REPAIR_SECONDS):
+            metrics.record_parse("fallback")
+            return _unparsed_result(cleaned)
+
         try:
-            repaired = self._request_with_retry(repair_prompt)
-            repaired_clean = _strip_code_fences(repaired)
-            try:
-                return json.loads(repaired_clean)
-            except Exception:
-                chunk2 = _extract_json_block(repaired_clean)
-                if chunk2:
-                    return json.loads(chunk2)
+            get_repair_stats().record_network()
+            repaired = await self._arequest_with_retry(
+                self._repair_request(cleaned, original_prompt),
+                deadline=deadline,
+                purpose="repair",
+            )
+            repaired = _strip_code_fences(repaired)
+            data = _parse_json_text(repaired) or repair_json(repaired, record=False)
+            if data is not None:
+                metrics.record_parse("network_repair")
+                return data
         except Exception:
             pass
 
-        return {
-            "severity": "Moderate",
-            "summary": cleaned.strip() or "Unable to parse model response.",
-            "advice": "Consider contacting a healthcare professional for guidance.",
-            "red_flags": [],
-            "differential": [],
-            "rationale": ("Fallback response; JSON parsing failed after repair."),
-        }
+        metrics.record_parse("fallback")
+        return _unparsed_result(cleaned)
+
+    def _repair_request(self, malformed: str, original_prompt: str) -> str:
+        if not malformed.strip():
+            # Nothing to repair: the only option is asking again
+            return original_prompt
+        return _repair_prompt(malformed, include_system=not self._native_system_instruction)
+
+    @property
+    def _native_system_instruction(self) -> bool:
+        return self.transport.native_system_instruction
+
+    def max_prompt_tokens(self) -> int:
+        return int(getattr(settings, "GEMINI_PROMPT_MAX_TOKENS", DEFAULT_MAX_PROMPT_TOKENS))
+
+    def symptoms_budget(self, patient_context: Optional[Dict[str, Any]] = None) -> int:
+        """Characters left for symptom text once the fixed sections are counted."""
+        sections = self._prompt_sections("", patient_context)
+        fixed = measure_sections(sections)["chars"]
+        return max(0, self.max_prompt_tokens() * CHARS_PER_TOKEN - fixed)
+
+    def prompt_report(
+        self, symptoms_text: str, patient_context: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Per-section size of the prompt that would be sent, after compaction."""
+        return self._compose_prompt(symptoms_text, patient_context)[1]
 
     # Explicit prompt builder for testability
     def _build_prompt(
         self, symptoms_text: str, patient_context: Optional[Dict[str, Any]] = None
     ) -> str:
+        return self._compose_prompt(symptoms_text, patient_context)[0]
+
+    def _compose_prompt(
+        self, symptoms_text: str, patient_context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the prompt and keep it within ``GEMINI_PROMPT_MAX_TOKENS``.
+        Older conversation turns are trimmed by the caller (see
+        ``symptoms_budget``); here context fields are shortened first and the
+        symptom text is cut in the middle only as a last resort.
+        """
+        budget = self.max_prompt_tokens()
+        ctx = dict(patient_context or {})
+        symptoms = (symptoms_text or "").strip()
+        compacted = []
+
+        sections = self._prompt_sections(symptoms, ctx)
+        report = measure_sections(sections)
+        for field, limit in CONTEXT_TRIM_STEPS:
+            if report["tokens"] <= budget:
+                break
+            value = ctx.get(field)
+            if isinstance(value, str) and len(value) > limit:
+                ctx[field] = truncate_middle(value, limit)
+                compacted.append(field)
+                sections = self._prompt_sections(symptoms, ctx)
+                report = measure_sections(sections)
+
+        if report["tokens"] > budget:
+            over_chars = (report["tokens"] - budget) * CHARS_PER_TOKEN
+            symptoms = truncate_middle(symptoms, max(0, len(symptoms) - over_chars))
+            compacted.append("symptoms")
+            sections = self._prompt_sections(symptoms, ctx)
+            report = measure_sections(sections)
+
+        report["budget_tokens"] = budget
+        report["compacted"] = compacted
+        return "".join(text for _name, text in sections), report
+
+    def _prompt_sections(
+        self, symptoms_text: str, patient_context: Optional[Dict[str, Any]]
+    ) -> list[Tuple[str, str]]:
         def safe(val: Any) -> str:
             if val is None:
                 return "Unknown"
@@ -336,19 +991,55 @@ class GeminiClient:
             "}"
         )
 
-        prompt = (
-            f"{SYSTEM_INSTRUCTIONS}\n\n"
-            f"PATIENT_CONTEXT:\n{patient_context_block}\n\n"
-            "PATIENT_SYMPTOM_DESCRIPTION:\n"
-            f"{(symptoms_text or '').strip()}\n\n"
-            "RESPONSE_FORMAT:\n"
-            "{\n"
-            '  "severity": "Mild|Moderate|Severe|Critical",\n'
-            '  "summary": "short summary",\n'
-            '  "advice": "next steps for patient",\n'
-            '  "red_flags": ["..."],\n'
-            '  "differential": ["..."],\n'
-            '  "rationale": "plain-language reasoning"\n'
-            "}\n"
+        sections = []
+        if not self._native_system_instruction:
+            sections.append(("system", f"{SYSTEM_INSTRUCTIONS}\n\n"))
+        sections.append(("patient_context", f"PATIENT_CONTEXT:\n{patient_context_block}\n\n"))
+        sections.append(
+            ("symptoms", f"PATIENT_SYMPTOM_DESCRIPTION:\n{(symptoms_text or '').strip()}\n\n")
         )
-        return prompt
+        if not self._native_system_instruction:
+            sections.append(("response_format", RESPONSE_FORMAT))
+        return sections
+
+
+# Process-wide pool of clients keyed by (api_key, model). Building a client
+# creates SDK objects and HTTP connections, so each worker does it once and
+# shares the result across requests and threads.
+_client_pool: Dict[Tuple[Optional[str], str], GeminiClient] = {}
+_client_pool_lock = threading.Lock()
+
+
+def get_gemini_client(api_key: Optional[str] = None, model: str = DEFAULT_MODEL) -> GeminiClient:
+    """Return the shared client for ``api_key``/``model``, creating it on first use."""
+    key = (api_key, model)
+    client = _client_pool.get(key)
+    if client is None:
+        with _client_pool_lock:
+            client = _client_pool.get(key)
+            if client is None:
+                client = GeminiClient(api_key=api_key, model=model)
+                _client_pool[key] = client
+    return client
+
+
+def reset_gemini_clients(api_key: Optional[str] = None) -> int:
+    """
+    Drop pooled clients (all of them, or only those for ``api_key``) so the next
+    request builds fresh ones. Call after rotating the Gemini key.
+    """
+    with _client_pool_lock:
+        keys = [k for k in _client_pool if api_key is None or k[0] == api_key]
+        for k in keys:
+            # In-flight requests keep their reference; the SDK client and its
+            # connections are released once they finish.
+            del _client_pool[k]
+    return len(keys)
+
+
+def _reset_on_key_change(setting, **kwargs):
+    if setting in ("GEMINI_API_KEY", "GEMINI_TRANSPORT"):
+        reset_gemini_clients()
+
+
+setting_changed.connect(_reset_on_key_change)
@@ -0,0 +1,272 @@
+"""
+Transports that carry a prompt to a model and bring its text back.
+
+``GeminiClient`` does retries, model fallback, hedging and parsing; the
+transport only sends one prompt to one model. Besides the SDK transport
+(``gemini_client.SDKTransport``) there are two for offline work:
+
+* ``CassetteTransport`` records what another transport answered and
+  replays it. Entries are keyed by a hash of the prompt, so cassettes hold
+  no prompt text, and each prompt's answers (errors included) are replayed
+  in the order they were recorded, which reproduces retries and fallbacks.
+* ``HTTPTransport`` talks to ``manage.py fake_gemini_server``, which
+  answers with configurable latency, error and malformed-output rates.
+
+``settings.GEMINI_TRANSPORT["BACKEND"]`` picks one of ``sdk``,
+``cassette`` and ``http``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from django.conf import settings
+
+BACKENDS = ("sdk", "cassette", "http")
+CASSETTE_MODES = ("replay", "record")
+DEFAULT_FAKE_URL = "http://127.0.0.1:8765"
+DEFAULT_HTTP_TIMEOUT = 30.0
+# Size of the pieces a replayed answer is streamed in
+STREAM_CHUNK_CHARS = 40
+
+
+def transport_config() -> Dict[str, Any]:
+    """``settings.GEMINI_TRANSPORT`` with defaults filled in."""
+    config = getattr(settings, "GEMINI_TRANSPORT", None) or {}
+    backend = config.get("BACKEND", "sdk")
+    mode = config.get("CASSETTE_MODE", "replay")
+    if backend not in BACKENDS:
+        raise ValueError(f"GEMINI_TRANSPORT BACKEND must be one of {BACKENDS}, not {backend!r}")
+    if mode not in CASSETTE_MODES:
+        raise ValueError(f"GEMINI_TRANSPORT CASSETTE_MODE must be one of {CASSETTE_MODES}")
+    return {
+        "BACKEND": backend,
+        "CASSETTE_PATH": str(config.get("CASSETTE_PATH") or "gemini_cassette.json"),
+        "CASSETTE_MODE": mode,
+        "CASSETTE_REALTIME": bool(config.get("CASSETTE_REALTIME", False)),
+        "HTTP_URL": config.get("HTTP_URL") or DEFAULT_FAKE_URL,
+        "HTTP_TIMEOUT": float(config.get("HTTP_TIMEOUT", DEFAULT_HTTP_TIMEOUT)),
+    }
+
+
+class TransportError(RuntimeError):
+    """A model call that failed with an HTTP status (``code``), like the SDK errors."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class CassetteMiss(LookupError):
+    """The prompt was never recorded."""
+
+    # No model can answer it either, so retries are pointless: treat it
+    # like an invalid request
+    code = 400
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _chunks(text: str) -> Iterator[str]:
+    for start in range(0, len(text), STREAM_CHUNK_CHARS):
+        yield text[start : start + STREAM_CHUNK_CHARS]
+
+
+class CassetteTransport:
+    """Replays answers recorded from ``inner`` (record mode calls ``inner`` and saves them)."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        mode: str = "replay",
+        inner: Optional[Any] = None,
+        realtime: Optional[bool] = None,
+    ) -> None:
+        if mode == "record" and inner is None:
+            raise ValueError("A cassette needs a transport to record from")
+        self.path = Path(path)
+        self.mode = mode
+        self.inner = inner
+        # Sleep for the recorded latency when replaying
+        self.realtime = transport_config()["CASSETTE_REALTIME"] if realtime is None else realtime
+        self.entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text())["interactions"]
+        elif mode == "replay":
+            raise FileNotFoundError(f"Cassette {self.path} does not exist; record it first")
+
+    @property
+    def enabled(self) -> bool:
+        return self.inner.enabled if self.mode == "record" else True
+
+    @property
+    def ready(self) -> bool:
+        return self.inner.ready if self.mode == "record" else True
+
+    @property
+    def native_system_instruction(self) -> bool:
+        # Prompts must match the recorded ones, so they are built the same way
+        return bool(getattr(self.inner, "native_system_instruction", False))
+
+    # Replay
+
+    def _next(self, prompt: str) -> Dict[str, Any]:
+        key = prompt_key(prompt)
+        with self._lock:
+            answers = self.entries.get(key)
+            if not answers:
+                raise CassetteMiss(f"No recorded answer for prompt {key[:12]} in {self.path}")
+            # Wrap around so a load test can replay a short cassette many times
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+            return answers[position % len(answers)]
+
+    @staticmethod
+    def _answer(entry: Dict[str, Any]) -> str:
+        if "error" in entry:
+            raise TransportError(entry.get("code") or 500, entry["error"])
+        return entry["text"]
+
+    # Record
+
+    def _record(self, model: str, prompt: str, started: float, text=None, error=None) -> None:
+        entry: Dict[str, Any] = {
+            "model": model,
+            "latency": round(time.monotonic() - started, 4),
+            "prompt_chars": len(prompt),
+        }
+        if error is not None:
+            entry["error"] = str(error)
+            entry["code"] = getattr(error, "code", None)
+        else:
+            entry["text"] = text
+        with self._lock:
+            self.entries.setdefault(prompt_key(prompt), []).append(entry)
+            self._save()
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as fh:
+            json.dump({"version": 1, "interactions": self.entries}, fh, indent=1)
+        os.replace(tmp, self.path)
+
+    # Transport interface
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        if self.mode == "replay":
+            entry = self._next(prompt)
+            if self.realtime:
+                time.sleep(entry.get("latency", 0))
+            return self._answer(entry)
+        started = time.monotonic()
+        try:
+            text = self.inner.generate(model_name, prompt)
+        except Exception as exc:
+            self._record(model_name, prompt, started, error=exc)
+            raise
+        self._record(model_name, prompt, started, text=text)
+        return text
+
+    def stream(self, model_name: str, prompt: str) -> Iterator[str]:
+        if self.mode == "replay":
+            entry = self._next(prompt)
+            if self.realtime:
+                time.sleep(entry.get("latency", 0))
+            yield from _chunks(self._answer(entry))
+            return
+        started = time.monotonic()
+        received = []
+        try:
+            for text in self.inner.stream(model_name, prompt):
+                received.append(text)
+                yield text
+        except GeneratorExit:
+            # The client stops reading once the answer object is complete
+            self._record(model_name, prompt, started, text="".join(received))
+            raise
+        except Exception as exc:
+            self._record(model_name, prompt, started, error=exc)
+            raise
+        self._record(model_name, prompt, started, text="".join(received))
+
+    async def agenerate(self, model_name: str, prompt: str) -> str:
+        if self.mode == "replay":
+            entry = self._next(prompt)
+            if self.realtime:
+                await asyncio.sleep(entry.get("latency", 0))
+            return self._answer(entry)
+        started = time.monotonic()
+        try:
+            text = await self.inner.agenerate(model_name, prompt)
+        except Exception as exc:
+            self._record(model_name, prompt, started, error=exc)
+            raise
+        self._record(model_name, prompt, started, text=text)
+        return text
+
+
+class HTTPTransport:
+    """
+    Client for ``manage.py fake_gemini_server``. Uses only the standard
+    library; each call opens its own connection.
+    """
+
+    enabled = True
+    ready = True
+    native_system_instruction = False
+
+    def __init__(self, base_url: str = DEFAULT_FAKE_URL, timeout: float = DEFAULT_HTTP_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, model_name: str, method: str, prompt: str):
+        url = f"{self.base_url}/v1/models/{quote(model_name)}:{method}"
+        request = urllib.request.Request(
+            url,
+            data=json.dumps({"prompt": prompt}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as exc:
+            body = exc.read().decode("utf-8", "replace")
+            try:
+                message = json.loads(body)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = body or exc.reason
+            raise TransportError(exc.code, message) from None
+        except urllib.error.URLError as exc:
+            raise ConnectionError(f"Fake Gemini server unreachable: {exc.reason}") from exc
+
+    def generate(self, model_name: str, prompt: str) -> str:
+        with self._open(model_name, "generateContent", prompt) as resp:
+            return json.loads(resp.read())["text"]
+
+    def stream(self, model_name: str, prompt: str) -> Iterator[str]:
+        # One JSON object per line, each holding the next piece of text
+        with self._open(model_name, "streamGenerateContent", prompt) as resp:
+            for line in resp:
+                if line.strip():
+                    text = json.loads(line)["text"]
+                    if text:
+                        yield text
+
+    async def agenerate(self, model_name: str, prompt: str) -> str:
+        return await asyncio.to_thread(self.generate, model_name, prompt)
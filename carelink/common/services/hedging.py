@@ -0,0 +1,90 @@
+"""
+Counters and worker pool for hedged Gemini requests.
+
+A hedged request sends the prompt to the primary model and, if it has not
+answered within the hedge delay, to the next routed model as well; the
+first valid answer wins. The counters here show how often the hedge fires
+and which model wins, which is what the delay is tuned against.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+DEFAULT_HEDGE_DELAY_SECONDS = 1.5
+HEDGE_WORKERS = 8
+
+
+class HedgeStats:
+    """Thread-safe per-process counters for hedged requests."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hedged = 0
+        self.wins: Counter[str] = Counter()
+        self.losses: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record_request(self, hedged: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if hedged:
+                self.hedged += 1
+
+    def record_outcome(self, winner: Optional[str], losers: list[str]) -> None:
+        with self._lock:
+            if winner:
+                self.wins[winner] += 1
+            for model in losers:
+                self.losses[model] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+                "wins": dict(self.wins),
+                "losses": dict(self.losses),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.hedged = 0
+            self.wins.clear()
+            self.losses.clear()
+
+
+_stats = HedgeStats()
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_stats() -> HedgeStats:
+    return _stats
+
+
+def hedge_executor() -> ThreadPoolExecutor:
+    """Shared pool that runs the sync legs of hedged requests."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_WORKERS, thread_name_prefix="gemini-hedge"
+                )
+    return _executor
+
+
+def hedging_config() -> Dict[str, Any]:
+    """``settings.GEMINI_HEDGING`` with defaults filled in."""
+    config = getattr(settings, "GEMINI_HEDGING", None) or {}
+    return {
+        "ENABLED": bool(config.get("ENABLED", False)),
+        "DELAY_SECONDS": float(config.get("DELAY_SECONDS", DEFAULT_HEDGE_DELAY_SECONDS)),
+    }
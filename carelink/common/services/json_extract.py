@@ -0,0 +1,105 @@
+"""
+Single-pass extraction of JSON objects embedded in model output.
+
+The extractor tracks brace depth, string literals and escapes in one scan,
+so braces inside strings are ignored and no character is examined twice.
+Text can be fed in chunks as a response streams in; each top-level object
+is returned as soon as its closing brace arrives.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, Optional
+
+# Only these characters can change the scanner's state
+_SIGNIFICANT = re.compile(r'[{}"\\]')
+
+
+class JSONObjectExtractor:
+    """Incremental scanner returning balanced top-level ``{...}`` blocks."""
+
+    def __init__(self) -> None:
+        self.objects: List[str] = []
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def in_object(self) -> bool:
+        return self._depth > 0
+
+    def feed(self, chunk: str) -> List[str]:
+        """Scan ``chunk`` and return the objects it completed."""
+        found: List[str] = []
+        depth, in_string, escaped = self._depth, self._in_string, self._escaped
+        start = 0 if depth else None
+        pos = 0
+
+        if escaped and chunk:
+            # The previous chunk ended in a backslash inside a string
+            escaped = False
+            pos = 1
+
+        while True:
+            match = _SIGNIFICANT.search(chunk, pos)
+            if match is None:
+                break
+            i = match.start()
+            ch = chunk[i]
+            pos = i + 1
+
+            if not depth:
+                # Outside objects only an opening brace matters; quotes in
+                # surrounding prose are not JSON strings.
+                if ch == "{":
+                    depth, start = 1, i
+                continue
+            if in_string:
+                if ch == "\\":
+                    if i + 1 < len(chunk):
+                        pos = i + 2
+                    else:
+                        escaped = True
+                elif ch == '"':
+                    in_string = False
+                continue
+            if ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if not depth:
+                    self._parts.append(chunk[start : i + 1])
+                    found.append("".join(self._parts))
+                    self._parts = []
+                    start = None
+
+        if depth and start is not None:
+            self._parts.append(chunk[start:])
+        self._depth, self._in_string, self._escaped = depth, in_string, escaped
+        self.objects.extend(found)
+        return found
+
+
+def extract_objects(text: str) -> List[str]:
+    """Every balanced top-level object in ``text``, in order."""
+    return JSONObjectExtractor().feed(text or "")
+
+
+def extract_first_object(text: str) -> Optional[str]:
+    """The first balanced top-level object in ``text``, or None."""
+    text = text or ""
+    start = text.find("{")
+    if start < 0:
+        return None
+    extractor = JSONObjectExtractor()
+    # Feed in slices so a huge tail after the first object is never scanned
+    step = 4096
+    for offset in range(start, len(text), step):
+        found = extractor.feed(text[offset : offset + step])
+        if found:
+            return found[0]
+    return None
@@ -0,0 +1,220 @@
+"""
+Deterministic clean-up of almost-JSON model output.
+
+Gemini occasionally returns JSON with trailing commas, single or smart
+quotes, bare keys, or an answer cut off before its closing brackets. These
+rules fix those cases locally so the client only pays for a network repair
+when the text really is not JSON. Each rule is a plain ``str -> str``
+function; counters record which ones fired.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_decoder = json.JSONDecoder()
+
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "„": '"', "‟": '"', "‘": "'", "’": "'"})
+_BARE_KEY = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_\-]*)(\s*:)")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+# Inside an object a trailing "key" (with or without its colon) has no value
+_DANGLING_OBJECT_TAIL = re.compile(r'(?:,\s*(?:"[^"]*")?\s*:?\s*|:\s*)$')
+_DANGLING_ARRAY_TAIL = re.compile(r",\s*$")
+
+
+def _map_outside_strings(text: str, fn: Callable[[str], str]) -> str:
+    """Apply ``fn`` to the parts of ``text`` that are not inside "..." strings."""
+    out, start, i, n = [], 0, 0, len(text)
+    while i < n:
+        if text[i] == '"':
+            out.append(fn(text[start:i]))
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i : j + 1])
+            start = i = j + 1
+        else:
+            i += 1
+    out.append(fn(text[start:]))
+    return "".join(out)
+
+
+def fix_smart_quotes(text: str) -> str:
+    return text.translate(_SMART_QUOTES)
+
+
+def fix_single_quotes(text: str) -> str:
+    """Turn 'single quoted' strings outside double-quoted ones into JSON strings."""
+    out, i, n = [], 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            out.append(text[i : j + 1])
+            i = j + 1
+        elif ch == "'":
+            j = i + 1
+            while j < n and text[j] != "'":
+                j += 2 if text[j] == "\\" else 1
+            body = text[i + 1 : j].replace("\\'", "'").replace('"', '\\"')
+            out.append(f'"{body}"' if j < n else f'"{body}')
+            i = j + 1
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def fix_unquoted_keys(text: str) -> str:
+    return _map_outside_strings(text, lambda part: _BARE_KEY.sub(r'\1"\2"\3', part))
+
+
+def fix_trailing_commas(text: str) -> str:
+    return _map_outside_strings(text, lambda part: _TRAILING_COMMA.sub(r"\1", part))
+
+
+def _scan(text: str) -> Tuple[List[str], bool]:
+    """Open brackets still pending at the end of ``text`` and whether a string is open."""
+    stack: List[str] = []
+    in_string = escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    return stack, in_string
+
+
+def close_unterminated_string(text: str) -> str:
+    stack, in_string = _scan(text)
+    if not in_string:
+        return text
+    return text[:-1] + '"' if text.endswith("\\") else text + '"'
+
+
+def drop_dangling_tail(text: str) -> str:
+    """Remove a trailing comma, colon or key left without a value by truncation."""
+    stack, in_string = _scan(text)
+    if not stack or in_string:
+        return text
+    pattern = _DANGLING_OBJECT_TAIL if stack[-1] == "}" else _DANGLING_ARRAY_TAIL
+    return pattern.sub("", text.rstrip())
+
+
+def close_open_brackets(text: str) -> str:
+    stack, in_string = _scan(text)
+    if not stack or in_string:
+        return text
+    return text.rstrip() + "".join(reversed(stack))
+
+
+# Applied in order; the text is re-parsed after each rule that changes it
+RULES: Tuple[Tuple[str, Callable[[str], str]], ...] = (
+    ("smart_quotes", fix_smart_quotes),
+    ("single_quotes", fix_single_quotes),
+    ("unquoted_keys", fix_unquoted_keys),
+    ("trailing_commas", fix_trailing_commas),
+    ("unterminated_string", close_unterminated_string),
+    ("dangling_tail", drop_dangling_tail),
+    ("missing_closers", close_open_brackets),
+)
+
+
+class RepairStats:
+    """Per-process counters for local and network JSON repairs."""
+
+    def __init__(self) -> None:
+        self.rules: Counter[str] = Counter()
+        self.local_repairs = 0
+        self.local_failures = 0
+        self.network_repairs = 0
+        self._lock = threading.Lock()
+
+    def record_local(self, fired: List[str], repaired: bool) -> None:
+        with self._lock:
+            self.rules.update(fired)
+            if repaired:
+                self.local_repairs += 1
+            else:
+                self.local_failures += 1
+
+    def record_network(self) -> None:
+        with self._lock:
+            self.network_repairs += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rules": dict(self.rules),
+                "local_repairs": self.local_repairs,
+                "local_failures": self.local_failures,
+                "network_repairs": self.network_repairs,
+                # Every local success is a second Gemini call not made
+                "network_repairs_avoided": self.local_repairs,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.rules.clear()
+            self.local_repairs = self.local_failures = self.network_repairs = 0
+
+
+_stats = RepairStats()
+
+
+def get_repair_stats() -> RepairStats:
+    return _stats
+
+
+def _decode_object(text: str) -> Optional[dict]:
+    try:
+        # raw_decode ignores any prose after the object
+        data, _end = _decoder.raw_decode(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def repair_json(text: str, record: bool = True) -> Optional[dict]:
+    """
+    Try to turn almost-JSON into a dict using only local rules. Returns None
+    when the text cannot be repaired. ``record=False`` skips the counters
+    (for callers that only want to know whether text is usable).
+    """
+    start = (text or "").find("{")
+    if start < 0:
+        if record:
+            _stats.record_local([], False)
+        return None
+
+    candidate = text[start:].strip()
+    fired: List[str] = []
+    data = _decode_object(candidate)
+    for name, rule in RULES:
+        if data is not None:
+            break
+        fixed = rule(candidate)
+        if fixed == candidate:
+            continue
+        fired.append(name)
+        candidate = fixed
+        data = _decode_object(candidate)
+
+    if record:
+        _stats.record_local(fired, data is not None)
+    return data
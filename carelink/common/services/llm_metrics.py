@@ -0,0 +1,231 @@
+"""
+Per-process instrumentation of Gemini calls.
+
+Every model call (retries, hedge legs, streams and repair requests alike)
+is recorded with its model, attempt number, latency, prompt and response
+size and, if it failed, the error class. Calls are aggregated into
+fixed-bucket histograms per model, so a snapshot is cheap and its size does
+not grow with traffic; the parse path of each answer (direct, extracted,
+local repair, network repair, fallback) is counted separately.
+
+Each call is also logged as one JSON line on the ``carelink.llm`` logger.
+Calls slower than ``SLOW_SECONDS`` are sampled onto ``carelink.llm.slow``
+with a redacted prompt excerpt. Redaction removes the patient context
+values and identifier-like strings (emails, phone and record numbers,
+dates); names in free text cannot be detected, so the excerpt is short and
+the sample rate low.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import random
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Sequence
+
+from django.conf import settings
+
+from carelink.common.services.prompt_budget import estimate_tokens, truncate_middle
+from carelink.common.services.retry_policy import classify_error
+
+logger = logging.getLogger("carelink.llm")
+slow_logger = logging.getLogger("carelink.llm.slow")
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0)
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1200, 1600, 2400, 3200)
+PARSE_PATHS = ("direct", "extracted", "local_repair", "network_repair", "fallback")
+
+DEFAULT_SLOW_SECONDS = 5.0
+DEFAULT_SLOW_SAMPLE_RATE = 0.1
+DEFAULT_SLOW_PROMPT_CHARS = 400
+
+REDACTED = "[REDACTED]"
+_CONTEXT_FIELD = re.compile(r'("(?:age|weight|allergies|medical_history)":\s*")[^"]*(")')
+_IDENTIFIERS = (
+    re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"),
+    re.compile(r"\b\d{1,4}[/.-]\d{1,2}[/.-]\d{2,4}\b"),
+    # Phone, record and card numbers: long runs of digits with separators
+    re.compile(r"\+?\d[\d ().-]{6,}\d"),
+)
+
+
+def redact_phi(prompt: str, max_chars: int = DEFAULT_SLOW_PROMPT_CHARS) -> str:
+    """``prompt`` from the patient context on, with identifying values replaced."""
+    start = prompt.find("PATIENT_CONTEXT:")
+    text = prompt[start:] if start >= 0 else prompt
+    # The response format trailer is the same in every prompt
+    text = text.split("RESPONSE_FORMAT:", 1)[0].strip()
+    text = _CONTEXT_FIELD.sub(rf"\1{REDACTED}\2", text)
+    for pattern in _IDENTIFIERS:
+        text = pattern.sub(REDACTED, text)
+    return truncate_middle(text, max_chars)
+
+
+def metrics_config() -> Dict[str, Any]:
+    """``settings.LLM_METRICS`` with defaults filled in."""
+    config = getattr(settings, "LLM_METRICS", None) or {}
+    return {
+        "ENABLED": bool(config.get("ENABLED", True)),
+        "LOG_CALLS": bool(config.get("LOG_CALLS", True)),
+        "SLOW_SECONDS": float(config.get("SLOW_SECONDS", DEFAULT_SLOW_SECONDS)),
+        "SLOW_SAMPLE_RATE": float(config.get("SLOW_SAMPLE_RATE", DEFAULT_SLOW_SAMPLE_RATE)),
+        "SLOW_PROMPT_CHARS": int(config.get("SLOW_PROMPT_CHARS", DEFAULT_SLOW_PROMPT_CHARS)),
+    }
+
+
+class Histogram:
+    """Counts per upper bound, plus an overflow bucket; not thread-safe on its own."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile (None past the last bound)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        buckets = {str(bound): n for bound, n in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "mean": round(self.total / self.count, 4) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class _ModelMetrics:
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.response_tokens = Histogram(TOKEN_BUCKETS)
+        self.outcomes: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.attempts: Counter[int] = Counter()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.latency.count,
+            "outcomes": dict(self.outcomes),
+            "errors": dict(self.errors),
+            "attempts": {str(n): c for n, c in sorted(self.attempts.items())},
+            "latency_seconds": self.latency.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "response_tokens": self.response_tokens.snapshot(),
+        }
+
+
+class LLMMetrics:
+    """Thread-safe per-process aggregates of Gemini calls."""
+
+    def __init__(self) -> None:
+        self._models: Dict[str, _ModelMetrics] = {}
+        self.parse_paths: Counter[str] = Counter()
+        self.slow_calls = 0
+        self._lock = threading.Lock()
+
+    def record_call(
+        self,
+        model: str,
+        attempt: int,
+        latency: float,
+        prompt: str,
+        response: Optional[str] = None,
+        error: Optional[BaseException] = None,
+        purpose: str = "triage",
+    ) -> None:
+        """One model call; ``error`` is set when it raised instead of answering."""
+        config = metrics_config()
+        if not config["ENABLED"]:
+            return
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(response or "")
+        error_class = type(error).__name__ if error is not None else None
+        slow = latency >= config["SLOW_SECONDS"]
+        with self._lock:
+            stats = self._models.get(model)
+            if stats is None:
+                stats = self._models[model] = _ModelMetrics()
+            stats.latency.observe(latency)
+            stats.prompt_tokens.observe(prompt_tokens)
+            stats.attempts[attempt] += 1
+            if error_class:
+                stats.outcomes["error"] += 1
+                stats.errors[error_class] += 1
+            else:
+                stats.outcomes["ok"] += 1
+                stats.response_tokens.observe(response_tokens)
+            if slow:
+                self.slow_calls += 1
+
+        fields = {
+            "model": model,
+            "purpose": purpose,
+            "attempt": attempt,
+            "latency_ms": round(latency * 1000),
+            "prompt_chars": len(prompt),
+            "prompt_tokens_est": prompt_tokens,
+            "response_chars": len(response or ""),
+            "response_tokens_est": response_tokens,
+            "error_class": error_class,
+            "error_kind": classify_error(error) if error is not None else None,
+        }
+        if config["LOG_CALLS"]:
+            logger.info("llm_call %s", json.dumps(fields))
+        if slow and random.random() < config["SLOW_SAMPLE_RATE"]:
+            fields["prompt_excerpt"] = redact_phi(prompt, config["SLOW_PROMPT_CHARS"])
+            slow_logger.warning("llm_slow_call %s", json.dumps(fields))
+
+    def record_parse(self, path: str) -> None:
+        """How an answer was turned into a dict; one of ``PARSE_PATHS``."""
+        config = metrics_config()
+        if not config["ENABLED"]:
+            return
+        with self._lock:
+            self.parse_paths[path] += 1
+        if config["LOG_CALLS"]:
+            logger.info("llm_parse %s", json.dumps({"parse_path": path}))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": {name: m.snapshot() for name, m in sorted(self._models.items())},
+                "parse_paths": {path: self.parse_paths.get(path, 0) for path in PARSE_PATHS},
+                "slow_calls": self.slow_calls,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self.parse_paths.clear()
+            self.slow_calls = 0
+
+
+_metrics = LLMMetrics()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    return _metrics
@@ -0,0 +1,214 @@
+"""
+Per-model circuit breakers and health-aware routing for Gemini calls.
+
+Each model keeps a rolling window of recent call outcomes (success flag and
+latency) in Django's cache, so every worker sharing that cache sees the same
+health. A model whose error rate crosses the threshold is opened and skipped;
+after a cool-down a single half-open probe is let through, and its outcome
+closes or re-opens the breaker. Healthy models are tried lowest error rate
+first, then lowest p95 latency.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _p95(latencies: List[float]) -> Optional[float]:
+    if not latencies:
+        return None
+    ordered = sorted(latencies)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class ModelHealthRegistry:
+    key_prefix = "gemini:health:"
+
+    def __init__(
+        self,
+        cache_alias: str = "default",
+        window_seconds: int = 120,
+        max_samples: int = 50,
+        min_samples: int = 5,
+        error_threshold: float = 0.5,
+        open_seconds: int = 30,
+    ) -> None:
+        self.cache_alias = cache_alias
+        self.window_seconds = window_seconds
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.open_seconds = open_seconds
+
+    @property
+    def _cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, model: str) -> str:
+        return self.key_prefix + model
+
+    def _probe_key(self, model: str) -> str:
+        return self.key_prefix + "probe:" + model
+
+    def _empty(self) -> Dict[str, Any]:
+        return {"state": CLOSED, "opened_at": None, "samples": []}
+
+    def _trim(self, record: Dict[str, Any], now: float) -> None:
+        horizon = now - self.window_seconds
+        samples = [s for s in record["samples"] if s[0] >= horizon]
+        record["samples"] = samples[-self.max_samples :]
+
+    # -- recording -------------------------------------------------------
+
+    def record_success(self, model: str, latency: float) -> None:
+        self._record(model, True, latency)
+
+    def record_failure(self, model: str, latency: float) -> None:
+        self._record(model, False, latency)
+
+    def _record(self, model: str, ok: bool, latency: float) -> None:
+        now = time.time()
+        record = self._cache.get(self._key(model)) or self._empty()
+        record["samples"].append((now, ok, round(latency, 4)))
+        self._trim(record, now)
+
+        if record["state"] == HALF_OPEN:
+            # The probe decides: close on success, re-open on failure
+            if ok:
+                record = {"state": CLOSED, "opened_at": None, "samples": [(now, ok, latency)]}
+            else:
+                record["state"], record["opened_at"] = OPEN, now
+            self._cache.delete(self._probe_key(model))
+        elif record["state"] == CLOSED and not ok:
+            stats = self._stats(record)
+            if stats["samples"] >= self.min_samples and stats["error_rate"] >= self.error_threshold:
+                record["state"], record["opened_at"] = OPEN, now
+
+        # Keep the record a little longer than the window so an open breaker
+        # outlives its cool-down.
+        timeout = max(self.window_seconds, self.open_seconds) * 2
+        self._cache.set(self._key(model), record, timeout=timeout)
+
+    # -- routing ---------------------------------------------------------
+
+    def _stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        samples = record["samples"]
+        failures = sum(1 for _ts, ok, _lat in samples if not ok)
+        return {
+            "state": record["state"],
+            "samples": len(samples),
+            "error_rate": (failures / len(samples)) if samples else 0.0,
+            "p95": _p95([lat for _ts, _ok, lat in samples]),
+            "opened_at": record["opened_at"],
+        }
+
+    def _allow(self, model: str, record: Dict[str, Any], now: float) -> bool:
+        if record["state"] == CLOSED:
+            return True
+        if record["state"] == OPEN and now - record["opened_at"] < self.open_seconds:
+            return False
+        # Cool-down elapsed: let exactly one caller across all workers probe
+        if self._cache.add(self._probe_key(model), 1, timeout=self.open_seconds):
+            record["state"] = HALF_OPEN
+            self._cache.set(self._key(model), record, timeout=self.open_seconds * 4)
+            return True
+        return False
+
+    def route(self, models: List[str]) -> List[str]:
+        """
+        Order ``models`` for a request: breaker-open models are dropped, a
+        half-open probe goes first, and the rest are sorted by error rate and
+        then p95 latency. Models without enough samples are scored as average
+        so they keep their configured position.
+        """
+        now = time.time()
+        records = self._cache.get_many([self._key(m) for m in models])
+        probes, candidates, blocked = [], [], []
+        for position, model in enumerate(models):
+            record = records.get(self._key(model)) or self._empty()
+            self._trim(record, now)
+            was_closed = record["state"] == CLOSED
+            if not self._allow(model, record, now):
+                blocked.append((record["opened_at"] or 0, model))
+            elif not was_closed:
+                probes.append(model)
+            else:
+                candidates.append((position, model, self._stats(record)))
+
+        if not probes and not candidates:
+            # Every breaker is open: try the one that opened longest ago
+            # rather than failing without making a call.
+            return [min(blocked)[1]]
+
+        known = [st["p95"] for _pos, _m, st in candidates if st["samples"] >= self.min_samples]
+        neutral_p95 = sum(known) / len(known) if known else 0.0
+
+        def score(entry):
+            position, _model, stats = entry
+            if stats["samples"] < self.min_samples:
+                return (0.0, round(neutral_p95 * 2) / 2, position)
+            # Half-second latency buckets so noise does not reshuffle models
+            return (round(stats["error_rate"], 1), round(stats["p95"] * 2) / 2, position)
+
+        return probes + [model for _pos, model, _st in sorted(candidates, key=score)]
+
+    def snapshot(self, models: List[str]) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        records = self._cache.get_many([self._key(m) for m in models])
+        out = {}
+        for model in models:
+            record = records.get(self._key(model)) or self._empty()
+            self._trim(record, now)
+            out[model] = self._stats(record)
+        return out
+
+    def reset(self, models: List[str]) -> None:
+        self._cache.delete_many(
+            [self._key(m) for m in models] + [self._probe_key(m) for m in models]
+        )
+
+
+_registry: Optional[ModelHealthRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_health() -> ModelHealthRegistry:
+    """Return the registry configured by ``settings.GEMINI_ROUTING``."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                config = getattr(settings, "GEMINI_ROUTING", None) or {}
+                _registry = ModelHealthRegistry(
+                    cache_alias=config.get("CACHE_ALIAS", "default"),
+                    window_seconds=int(config.get("WINDOW_SECONDS", 120)),
+                    max_samples=int(config.get("MAX_SAMPLES", 50)),
+                    min_samples=int(config.get("MIN_SAMPLES", 5)),
+                    error_threshold=float(config.get("ERROR_THRESHOLD", 0.5)),
+                    open_seconds=int(config.get("OPEN_SECONDS", 30)),
+                )
+    return _registry
+
+
+def reset_model_health() -> None:
+    global _registry
+    with _registry_lock:
+        _registry = None
+
+
+def _reset_on_config_change(setting, **kwargs):
+    if setting == "GEMINI_ROUTING":
+        reset_model_health()
+
+
+setting_changed.connect(_reset_on_config_change)
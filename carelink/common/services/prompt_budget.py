@@ -0,0 +1,41 @@
+"""
+Prompt size accounting for Gemini requests.
+
+Token counts are estimates (about four characters per token for English
+text), which is close enough to keep prompts under a budget without calling
+the tokenizer endpoint on every request.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Tuple
+
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_PROMPT_TOKENS = 1500
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def measure_sections(sections: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Character and estimated token counts per named section and in total."""
+    report: Dict[str, Any] = {"sections": {}, "chars": 0, "tokens": 0}
+    for name, text in sections:
+        chars, tokens = len(text), estimate_tokens(text)
+        report["sections"][name] = {"chars": chars, "tokens": tokens}
+        report["chars"] += chars
+        report["tokens"] += tokens
+    return report
+
+
+def truncate_middle(text: str, max_chars: int, marker: str = " […] ") -> str:
+    """Shorten ``text`` to ``max_chars`` keeping its start and end."""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= len(marker):
+        return text[:max_chars]
+    keep = max_chars - len(marker)
+    head = keep // 2
+    return text[:head] + marker + text[len(text) - (keep - head) :]
@@ -0,0 +1,244 @@
+"""
+Token-bucket rate limiting backed by Django's cache.
+
+Each scope (e.g. ``chat_api``) has up to three buckets: per user, per client
+IP and global. A bucket holds ``CAPACITY`` tokens and refills at
+``REFILL_PER_MINUTE``; a request takes one token from every bucket of its
+scope and is rejected if any of them is empty. Buckets are stored in GCRA
+form (the time at which the bucket will be full again), so one float per
+bucket is enough and all buckets of a request are read with a single
+``get_many``. Tokens are only written back when the request is admitted.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, NamedTuple, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.http import JsonResponse
+
+GLOBAL = "global"
+
+
+class Bucket(NamedTuple):
+    capacity: int
+    refill_per_second: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds for one token to refill."""
+        return 1.0 / self.refill_per_second
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    retry_after: float = 0.0
+    bucket: Optional[str] = None  # the bucket that rejected the request
+
+
+class RateLimiter:
+    """The buckets configured for one scope."""
+
+    key_prefix = "ratelimit:"
+
+    def __init__(
+        self,
+        scope: str,
+        buckets: Dict[str, Bucket],
+        cache_alias: str = "default",
+        enabled: bool = True,
+    ) -> None:
+        self.scope = scope
+        self.buckets = buckets
+        self.cache_alias = cache_alias
+        self.enabled = enabled
+        self.rejections: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def _cache(self):
+        return caches[self.cache_alias]
+
+    def _keys(self, identities: Dict[str, Any]) -> Dict[str, str]:
+        """Cache key per bucket; buckets without an identity (e.g. no IP) are skipped."""
+        keys = {}
+        for name in self.buckets:
+            ident = "*" if name == GLOBAL else identities.get(name)
+            if ident not in (None, ""):
+                keys[name] = f"{self.key_prefix}{self.scope}:{name}:{ident}"
+        return keys
+
+    def _decide(self, keys: Dict[str, str], stored: Dict[str, Any], now: float):
+        updates, worst = {}, Decision(True)
+        for name, key in keys.items():
+            bucket = self.buckets[name]
+            full_at = max(float(stored.get(key) or now), now)
+            new_full_at = full_at + bucket.interval
+            # The token is available once the bucket has room for one more
+            allow_at = new_full_at - bucket.capacity * bucket.interval
+            if allow_at > now:
+                if allow_at - now > worst.retry_after:
+                    worst = Decision(False, allow_at - now, name)
+            else:
+                updates[key] = new_full_at
+        if not worst.allowed:
+            with self._lock:
+                self.rejections[worst.bucket] += 1
+            return worst, {}
+        return worst, updates
+
+    def _timeout(self, updates: Dict[str, float], now: float) -> int:
+        # An entry can expire once its bucket would be full again anyway
+        return max(1, math.ceil(max(updates.values()) - now))
+
+    def hit(self, **identities: Any) -> Decision:
+        """Take one token from each bucket, e.g. ``hit(user=42, ip="10.0.0.1")``."""
+        keys = self._keys(identities)
+        if not self.enabled or not keys:
+            return Decision(True)
+        now = time.time()
+        decision, updates = self._decide(keys, self._cache.get_many(list(keys.values())), now)
+        if updates:
+            self._cache.set_many(updates, timeout=self._timeout(updates, now))
+        return decision
+
+    async def ahit(self, **identities: Any) -> Decision:
+        keys = self._keys(identities)
+        if not self.enabled or not keys:
+            return Decision(True)
+        now = time.time()
+        stored = await self._cache.aget_many(list(keys.values()))
+        decision, updates = self._decide(keys, stored, now)
+        if updates:
+            await self._cache.aset_many(updates, timeout=self._timeout(updates, now))
+        return decision
+
+    def wait(self, timeout: float, **identities: Any) -> bool:
+        """
+        Block until a token is available (for background callers such as
+        geocoding). Returns False if that would take longer than ``timeout``.
+        """
+        give_up_at = time.monotonic() + timeout
+        while True:
+            decision = self.hit(**identities)
+            if decision.allowed:
+                return True
+            if time.monotonic() + decision.retry_after > give_up_at:
+                return False
+            time.sleep(decision.retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"scope": self.scope, "rejections": dict(self.rejections)}
+
+
+def client_ip(request) -> Optional[str]:
+    # Only REMOTE_ADDR: forwarded headers are client-controlled unless a
+    # trusted proxy rewrites REMOTE_ADDR for us.
+    return request.META.get("REMOTE_ADDR") or None
+
+
+def too_many_requests(decision: Decision) -> JsonResponse:
+    response = JsonResponse(
+        {
+            "success": False,
+            "error": "Too many requests. Please wait a moment before sending another message.",
+            "retry_after": math.ceil(decision.retry_after),
+        },
+        status=429,
+    )
+    response["Retry-After"] = str(max(1, math.ceil(decision.retry_after)))
+    return response
+
+
+def rate_limited(scope: str):
+    """
+    View decorator applying ``scope``'s buckets to the requesting user and
+    IP. Place it below the login/role decorator so ``request.user`` is set.
+    """
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                decision = await get_rate_limiter(scope).ahit(user=user.pk, ip=client_ip(request))
+                if not decision.allowed:
+                    return too_many_requests(decision)
+                return await view_func(request, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            decision = get_rate_limiter(scope).hit(user=request.user.pk, ip=client_ip(request))
+            if not decision.allowed:
+                return too_many_requests(decision)
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def build_rate_limiter(scope: str, config: Optional[Dict[str, Any]] = None) -> RateLimiter:
+    """
+    Build the limiter for ``scope`` from a ``RATE_LIMITS`` style dict::
+
+        {"ENABLED": True, "CACHE_ALIAS": "default",
+         "SCOPES": {"chat_api": {"user": {"CAPACITY": 6, "REFILL_PER_MINUTE": 6},
+                                 "ip": {...}, "global": {...}}}}
+
+    A scope that is not configured gets no buckets and never limits.
+    """
+    config = config or {}
+    buckets = {
+        name: Bucket(int(spec["CAPACITY"]), float(spec["REFILL_PER_MINUTE"]) / 60.0)
+        for name, spec in (config.get("SCOPES") or {}).get(scope, {}).items()
+        if spec and float(spec.get("REFILL_PER_MINUTE") or 0) > 0
+    }
+    return RateLimiter(
+        scope,
+        buckets,
+        cache_alias=config.get("CACHE_ALIAS", "default"),
+        enabled=bool(config.get("ENABLED", True)),
+    )
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(scope: str) -> RateLimiter:
+    """Process-wide limiter for ``scope`` configured by ``settings.RATE_LIMITS``."""
+    limiter = _limiters.get(scope)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(scope)
+            if limiter is None:
+                limiter = build_rate_limiter(scope, getattr(settings, "RATE_LIMITS", None))
+                _limiters[scope] = limiter
+    return limiter
+
+
+def reset_rate_limiters() -> None:
+    """Forget the limiters; bucket state in the cache is left alone."""
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def _reset_on_config_change(setting, **kwargs):
+    if setting == "RATE_LIMITS":
+        reset_rate_limiters()
+
+
+setting_changed.connect(_reset_on_config_change)
@@ -0,0 +1,152 @@
+"""
+Time budgets, backoff and error classification for Gemini calls.
+
+A ``Deadline`` is created once per request (its length depends on the
+endpoint, see ``settings.TRIAGE_DEADLINES``) and handed down through
+generation, retries and repair, so the total time spent on one request is
+bounded however many models are tried. ``RetryPolicy`` spaces out retry
+sweeps with exponential backoff and full jitter, and ``classify_error``
+decides from the SDK exception whether a retry can help at all.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import time
+from typing import Any, Optional
+
+from django.conf import settings
+
+DEFAULT_DEADLINE_SECONDS = 25.0
+
+# Error classes
+TRANSIENT = "transient"  # worth retrying, on this or another model
+MODEL = "model"  # this model cannot serve the request; try the next one
+FATAL = "fatal"  # no model will succeed (bad key, invalid request)
+
+_TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+_MODEL_STATUSES = {404}
+_FATAL_STATUSES = {400, 401, 403}
+
+_TRANSIENT_NAMES = {
+    "ServiceUnavailable",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "DeadlineExceeded",
+    "InternalServerError",
+    "GatewayTimeout",
+    "ServerError",
+    "RetryError",
+}
+_MODEL_NAMES = {"NotFound"}
+_FATAL_NAMES = {"InvalidArgument", "PermissionDenied", "Unauthenticated", "Unauthorized"}
+
+_STATUS_IN_MESSAGE = re.compile(r"\b(400|401|403|404|408|429|500|502|503|504)\b")
+_TRANSIENT_WORDS = re.compile(
+    r"UNAVAILABLE|RESOURCE_EXHAUSTED|DEADLINE_EXCEEDED|timed? ?out|temporar", re.IGNORECASE
+)
+
+
+class DeadlineExceeded(RuntimeError):
+    """The request's time budget ran out before Gemini produced an answer."""
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which a request must finish."""
+
+    def __init__(self, seconds: Optional[float]) -> None:
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    @classmethod
+    def for_endpoint(cls, name: str) -> "Deadline":
+        """Budget configured for ``name`` in ``TRIAGE_DEADLINES`` (or its "default")."""
+        budgets = getattr(settings, "TRIAGE_DEADLINES", None) or {}
+        seconds = budgets.get(name, budgets.get("default", DEFAULT_DEADLINE_SECONDS))
+        return cls(None if seconds is None else float(seconds))
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """True when at least ``seconds`` of budget are left."""
+        remaining = self.remaining()
+        return remaining is None or remaining > seconds
+
+    def check(self) -> None:
+        if self.expired():
+            raise DeadlineExceeded(f"Gemini request exceeded its {self.seconds:g}s time budget")
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    for attr in ("code", "status_code", "status"):
+        value = getattr(exc, attr, None)
+        value = getattr(value, "value", value)  # grpc/enum style codes
+        if isinstance(value, int) and 100 <= value < 600:
+            return value
+    match = _STATUS_IN_MESSAGE.search(str(exc))
+    return int(match.group(1)) if match else None
+
+
+def classify_error(exc: BaseException) -> str:
+    """
+    Classify an exception raised by either Gemini SDK. Known exception types
+    (google.api_core / google.genai.errors) are matched by name so neither
+    package has to be importable; otherwise the HTTP status is used.
+    Unrecognised errors count as transient so a retry is still attempted.
+    """
+    if isinstance(exc, DeadlineExceeded):
+        return FATAL
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    if names & _FATAL_NAMES:
+        return FATAL
+    if names & _MODEL_NAMES:
+        return MODEL
+    if names & _TRANSIENT_NAMES or isinstance(exc, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+
+    status = _status_of(exc)
+    if status in _FATAL_STATUSES:
+        return FATAL
+    if status in _MODEL_STATUSES:
+        return MODEL
+    if status in _TRANSIENT_STATUSES or _TRANSIENT_WORDS.search(str(exc)):
+        return TRANSIENT
+    return TRANSIENT
+
+
+class RetryPolicy:
+    """Number of sweeps over the model list and the backoff between them."""
+
+    def __init__(
+        self,
+        sweeps: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 4.0,
+        multiplier: float = 2.0,
+    ) -> None:
+        self.sweeps = sweeps
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        config: Any = getattr(settings, "GEMINI_RETRY", None) or {}
+        return cls(
+            sweeps=int(config.get("SWEEPS", 2)),
+            base_delay=float(config.get("BASE_DELAY", 0.5)),
+            max_delay=float(config.get("MAX_DELAY", 4.0)),
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before sweep ``attempt + 1``."""
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier**attempt))
+        return random.uniform(0, ceiling)
@@ -0,0 +1,277 @@
+"""
+Request coalescing ("singleflight") for identical triage prompts.
+
+When a kiosk or a flaky client double-submits, the same prompt can reach
+Gemini several times at once. Callers passing the same key while a call is
+in flight wait for that call and share its result instead of starting their
+own. Across workers an optional lease in the Django cache marks a prompt as
+in flight; other workers then poll the (shared) triage cache for the
+leader's result and only call Gemini themselves if none appears.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import math
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from carelink.common.services.retry_policy import Deadline, DeadlineExceeded
+
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_POLL_SECONDS = 0.1
+
+
+class SingleFlightStats:
+    """Thread-safe per-process counters for coalesced requests."""
+
+    FIELDS = ("leaders", "coalesced", "lease_waits", "lease_hits", "lease_timeouts")
+
+    def __init__(self) -> None:
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self._counts)
+        callers = data["leaders"] + data["coalesced"]
+        data["coalesce_rate"] = round(data["coalesced"] / callers, 4) if callers else 0.0
+        return data
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+
+class _Call:
+    """One in-flight call that followers in other threads wait on."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def _wait_timeout(deadline: Optional[Deadline]) -> Optional[float]:
+    return deadline.remaining() if deadline is not None else None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    lease_prefix = "triage:lease:"
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        config = config or {}
+        self.enabled = bool(config.get("ENABLED", True))
+        self.lease = bool(config.get("LEASE", False))
+        self.lease_seconds = float(config.get("LEASE_SECONDS", DEFAULT_LEASE_SECONDS))
+        self.poll_seconds = float(config.get("POLL_SECONDS", DEFAULT_POLL_SECONDS))
+        self.alias = config.get("CACHE_ALIAS", "default")
+        self.stats = SingleFlightStats()
+        self._calls: Dict[str, _Call] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        deadline: Optional[Deadline] = None,
+        lookup: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """
+        Run ``fn`` unless a call for ``key`` is already in flight, in which
+        case wait for it and return a copy of its result (or re-raise its
+        error). ``lookup`` reads a result another worker may have stored and
+        is only used with the cross-worker lease.
+        """
+        if not self.enabled:
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self.stats.record("coalesced")
+            if not call.done.wait(_wait_timeout(deadline)):
+                raise DeadlineExceeded(
+                    "Timed out waiting for an identical in-flight triage request"
+                )
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        self.stats.record("leaders")
+        try:
+            call.result = self._run_leased(key, fn, deadline, lookup)
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        deadline: Optional[Deadline] = None,
+        lookup: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        """Async twin of ``do`` for callers on one event loop."""
+        if not self.enabled:
+            return await fn()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None or future.get_loop() is not loop
+            if leader:
+                future = self._futures[key] = loop.create_future()
+
+        if not leader:
+            self.stats.record("coalesced")
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), _wait_timeout(deadline))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(
+                    "Timed out waiting for an identical in-flight triage request"
+                ) from None
+            except asyncio.CancelledError:
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    # The leader was cancelled, not us: make the call ourselves
+                    return await fn()
+                raise
+            return copy.deepcopy(result)
+
+        self.stats.record("leaders")
+        try:
+            result = await self._arun_leased(key, fn, deadline, lookup)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved here, so an unawaited future does not log it
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+
+    def _run_leased(self, key, fn, deadline, lookup) -> Any:
+        if not self.lease or lookup is None:
+            return fn()
+        lease_key, token = self.lease_prefix + key, uuid.uuid4().hex
+        timeout = math.ceil(self.lease_seconds)
+        if self._cache.add(lease_key, token, timeout=timeout):
+            try:
+                # Another worker may have finished between our lookup and the lease
+                result = lookup()
+                return result if result is not None else fn()
+            finally:
+                if self._cache.get(lease_key) == token:
+                    self._cache.delete(lease_key)
+
+        # Another worker is already asking Gemini for this prompt
+        self.stats.record("lease_waits")
+        give_up_at = time.monotonic() + self.lease_seconds
+        while True:
+            result = lookup()
+            if result is not None:
+                self.stats.record("lease_hits")
+                return result
+            if self._cache.get(lease_key) is None:
+                break  # released without a cached result (e.g. the call failed)
+            if self._should_stop_waiting(give_up_at, deadline):
+                self.stats.record("lease_timeouts")
+                break
+            time.sleep(self.poll_seconds)
+        return fn()
+
+    async def _arun_leased(self, key, fn, deadline, lookup) -> Any:
+        if not self.lease or lookup is None:
+            return await fn()
+        lease_key, token = self.lease_prefix + key, uuid.uuid4().hex
+        timeout = math.ceil(self.lease_seconds)
+        if await self._cache.aadd(lease_key, token, timeout=timeout):
+            try:
+                result = await lookup()
+                return result if result is not None else await fn()
+            finally:
+                if await self._cache.aget(lease_key) == token:
+                    await self._cache.adelete(lease_key)
+
+        self.stats.record("lease_waits")
+        give_up_at = time.monotonic() + self.lease_seconds
+        while True:
+            result = await lookup()
+            if result is not None:
+                self.stats.record("lease_hits")
+                return result
+            if await self._cache.aget(lease_key) is None:
+                break
+            if self._should_stop_waiting(give_up_at, deadline):
+                self.stats.record("lease_timeouts")
+                break
+            await asyncio.sleep(self.poll_seconds)
+        return await fn()
+
+    def _should_stop_waiting(self, give_up_at: float, deadline: Optional[Deadline]) -> bool:
+        # Stop polling once the request's own budget is nearly spent
+        if deadline is not None and not deadline.allows(self.poll_seconds):
+            return True
+        return time.monotonic() + self.poll_seconds >= give_up_at
+
+
+_singleflight: Optional[SingleFlight] = None
+_singleflight_lock = threading.Lock()
+
+
+def get_singleflight() -> SingleFlight:
+    """Process-wide coalescer configured by ``settings.TRIAGE_SINGLEFLIGHT``."""
+    global _singleflight
+    if _singleflight is None:
+        with _singleflight_lock:
+            if _singleflight is None:
+                _singleflight = SingleFlight(getattr(settings, "TRIAGE_SINGLEFLIGHT", None))
+    return _singleflight
+
+
+def reset_singleflight() -> None:
+    """Forget the process-wide coalescer and its counters."""
+    global _singleflight
+    with _singleflight_lock:
+        _singleflight = None
+
+
+def _reset_on_config_change(setting, **kwargs):
+    if setting == "TRIAGE_SINGLEFLIGHT":
+        reset_singleflight()
+
+
+setting_changed.connect(_reset_on_config_change)
@@ -0,0 +1,256 @@
+"""
+Content-addressed cache for triage results.
+
+Entries are keyed on a hash of the normalized prompt, the model name and the
+prompt version, so identical (prompt, model) pairs are served without another
+Gemini call. Two backends are available: an in-process LRU dict and Django's
+cache framework (shared across workers when a shared cache is configured).
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.utils import timezone
+
+DEFAULT_TTL_SECONDS = 600
+DEFAULT_MAX_ENTRIES = 512
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt."""
+    return _WHITESPACE.sub(" ", (prompt or "").strip()).lower()
+
+
+def make_cache_key(prompt: str, model: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (prompt_version, model, normalize_prompt(prompt)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LocalLRUBackend:
+    """Thread-safe in-process dict with per-entry expiry and LRU eviction."""
+
+    def __init__(self, ttl: int = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    async def aget(self, key: str) -> Any:
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in one of Django's configured caches. Size limits and
+    eviction are handled by that cache (e.g. MAX_ENTRIES for locmem,
+    maxmemory-policy for Redis).
+    """
+
+    key_prefix = "triage:result:"
+
+    def __init__(self, alias: str = "default", ttl: int = DEFAULT_TTL_SECONDS):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Any:
+        return self._cache.get(self.key_prefix + key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._cache.set(self.key_prefix + key, value, timeout=self.ttl)
+
+    async def aget(self, key: str) -> Any:
+        return await self._cache.aget(self.key_prefix + key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        await self._cache.aset(self.key_prefix + key, value, timeout=self.ttl)
+
+    def clear(self) -> None:
+        # Only our own keys are removed when the backend supports patterns;
+        # otherwise entries simply age out through their TTL.
+        delete_pattern = getattr(self._cache, "delete_pattern", None)
+        if callable(delete_pattern):
+            delete_pattern(self.key_prefix + "*")
+
+
+class TriageCache:
+    """Front for a cache backend that keeps hit/miss counters."""
+
+    def __init__(self, backend, enabled: bool = True) -> None:
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self._on_lookup(self.backend.get(key))
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self._on_lookup(await self.backend.aget(key))
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Like ``get`` but without touching the hit/miss counters (for polling)."""
+        if not self.enabled:
+            return None
+        return self._on_lookup(self.backend.get(key), count=False)
+
+    async def apeek(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return self._on_lookup(await self.backend.aget(key), count=False)
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        self.backend.set(key, self._entry(result))
+        self._count("stores")
+
+    async def aset(self, key: str, result: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        await self.backend.aset(key, self._entry(result))
+        self._count("stores")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        data = {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if isinstance(self.backend, LocalLRUBackend):
+            data["size"] = len(self.backend)
+            data["evictions"] = self.backend.evictions
+        return data
+
+    def clear(self) -> None:
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.stores = 0
+
+    def _entry(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"result": copy.deepcopy(result), "stored_at": timezone.now().isoformat()}
+
+    def _on_lookup(self, entry: Any, count: bool = True) -> Optional[Dict[str, Any]]:
+        if not entry:
+            if count:
+                self._count("misses")
+            return None
+        if count:
+            self._count("hits")
+        # Mark served-from-cache results so clinicians can audit them
+        result = copy.deepcopy(entry["result"])
+        result["cached"] = True
+        result["cached_at"] = entry["stored_at"]
+        return result
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def build_triage_cache(config: Optional[Dict[str, Any]] = None) -> TriageCache:
+    """
+    Build a cache from a ``TRIAGE_CACHE`` style dict::
+
+        {"ENABLED": True, "BACKEND": "local" | "django", "TTL": 600,
+         "MAX_ENTRIES": 512, "ALIAS": "default"}
+    """
+    config = config or {}
+    ttl = int(config.get("TTL", DEFAULT_TTL_SECONDS))
+    if config.get("BACKEND", "local") == "django":
+        backend = DjangoCacheBackend(alias=config.get("ALIAS", "default"), ttl=ttl)
+    else:
+        backend = LocalLRUBackend(
+            ttl=ttl, max_entries=int(config.get("MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        )
+    return TriageCache(backend, enabled=bool(config.get("ENABLED", True)))
+
+
+_triage_cache: Optional[TriageCache] = None
+_triage_cache_lock = threading.Lock()
+
+
+def get_triage_cache() -> TriageCache:
+    """Return the process-wide triage cache configured by ``settings.TRIAGE_CACHE``."""
+    global _triage_cache
+    if _triage_cache is None:
+        with _triage_cache_lock:
+            if _triage_cache is None:
+                _triage_cache = build_triage_cache(getattr(settings, "TRIAGE_CACHE", None))
+    return _triage_cache
+
+
+def reset_triage_cache() -> None:
+    """Forget the process-wide cache; the next lookup rebuilds it from settings."""
+    global _triage_cache
+    with _triage_cache_lock:
+        if _triage_cache is not None:
+            _triage_cache.clear()
+        _triage_cache = None
+
+
+def _reset_on_config_change(setting, **kwargs):
+    if setting == "TRIAGE_CACHE":
+        reset_triage_cache()
+
+
+setting_changed.connect(_reset_on_config_change)
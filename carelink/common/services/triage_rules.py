@@ -0,0 +1,306 @@
+"""
+Offline, rule-based triage.
+
+A lexicon of symptom phrases, each tied to a severity, a red-flag label and
+likely causes, is compiled once into a single regex alternation, so the
+patient text is scanned in one pass (well under a millisecond for a chat
+message). Phrases preceded by a negation ("no chest pain", "denies fever")
+are ignored. The worst finding sets the severity, raised one level for
+high-risk patients (age or history from ``get_patient_context``).
+
+It is used in two ways: as a pre-screen that flags obvious Critical cases
+before Gemini answers, and as a fallback that produces the same dict shape
+as ``GeminiClient.generate_triage`` when Gemini is unconfigured or failing.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from carelink.common.types.triage import SEVERITIES, PreliminaryTriage
+
+# (severity, red flag shown to the patient or None, phrases, likely causes)
+LEXICON: Tuple[Tuple[str, Optional[str], Tuple[str, ...], Tuple[str, ...]], ...] = (
+    (
+        "Critical",
+        "Chest pain or pressure",
+        ("chest pain", "chest pressure", "chest tightness", "crushing chest", "pain in my chest"),
+        ("Acute coronary syndrome", "Pulmonary embolism"),
+    ),
+    (
+        "Critical",
+        "Severe difficulty breathing",
+        (
+            "can't breathe",
+            "cannot breathe",
+            "unable to breathe",
+            "struggling to breathe",
+            "gasping",
+        ),
+        ("Respiratory failure", "Severe asthma attack"),
+    ),
+    (
+        "Critical",
+        "Signs of stroke",
+        (
+            "face drooping",
+            "facial droop",
+            "slurred speech",
+            "one side of my body",
+            "numbness on one side",
+            "weakness on one side",
+            "sudden confusion",
+        ),
+        ("Stroke", "Transient ischaemic attack"),
+    ),
+    (
+        "Critical",
+        "Loss of consciousness or seizure",
+        ("unconscious", "unresponsive", "passed out", "seizure", "convulsion"),
+        ("Seizure", "Syncope"),
+    ),
+    (
+        "Critical",
+        "Heavy bleeding",
+        (
+            "severe bleeding",
+            "bleeding heavily",
+            "won't stop bleeding",
+            "vomiting blood",
+            "coughing up blood",
+        ),
+        ("Haemorrhage",),
+    ),
+    (
+        "Critical",
+        "Signs of anaphylaxis",
+        ("anaphylaxis", "throat swelling", "throat closing", "tongue swelling", "lips swelling"),
+        ("Anaphylaxis",),
+    ),
+    (
+        "Critical",
+        "Sudden worst-ever headache",
+        ("worst headache", "thunderclap headache"),
+        ("Subarachnoid haemorrhage",),
+    ),
+    (
+        "Critical",
+        "Thoughts of self-harm",
+        ("suicidal", "kill myself", "end my life", "overdose"),
+        ("Mental health crisis",),
+    ),
+    (
+        "Severe",
+        "Shortness of breath",
+        ("shortness of breath", "short of breath", "difficulty breathing", "wheezing"),
+        ("Asthma exacerbation", "Pneumonia"),
+    ),
+    (
+        "Severe",
+        "Fever with stiff neck",
+        ("stiff neck",),
+        ("Meningitis",),
+    ),
+    (
+        "Severe",
+        "Severe abdominal pain",
+        ("severe abdominal pain", "severe stomach pain", "severe belly pain"),
+        ("Appendicitis", "Bowel obstruction"),
+    ),
+    (
+        "Severe",
+        "Blood in stool or urine",
+        ("blood in stool", "black stool", "bloody stool", "blood in urine"),
+        ("Gastrointestinal bleeding", "Urinary tract infection"),
+    ),
+    (
+        "Severe",
+        "Fainting",
+        ("fainted", "fainting", "blacked out"),
+        ("Syncope", "Dehydration"),
+    ),
+    (
+        "Severe",
+        "Head injury",
+        ("head injury", "hit my head", "broken bone", "fracture"),
+        ("Concussion", "Fracture"),
+    ),
+    (
+        "Severe",
+        "High fever",
+        ("high fever", "fever of 103", "fever of 104", "fever of 40"),
+        ("Serious infection",),
+    ),
+    (
+        "Moderate",
+        None,
+        ("fever", "vomiting", "diarrhea", "diarrhoea", "persistent cough"),
+        ("Viral infection", "Gastroenteritis"),
+    ),
+    (
+        "Moderate",
+        None,
+        ("ear pain", "earache", "painful urination", "burning when i pee", "burning urination"),
+        ("Otitis media", "Urinary tract infection"),
+    ),
+    (
+        "Moderate",
+        None,
+        ("rash", "migraine", "sprain", "swollen ankle", "abdominal pain", "stomach pain"),
+        ("Dermatitis", "Migraine", "Soft tissue injury"),
+    ),
+    (
+        "Mild",
+        None,
+        ("runny nose", "sore throat", "sneezing", "congestion", "stuffy nose", "cough", "headache"),
+        ("Common cold", "Tension headache"),
+    ),
+)
+
+ADVICE = {
+    "Critical": "Call emergency services (911) or go to the nearest emergency department now.",
+    "Severe": "Seek urgent medical care today at an urgent care clinic or emergency department.",
+    "Moderate": (
+        "Contact your doctor or a telehealth clinician within 24 hours, and sooner if "
+        "symptoms get worse."
+    ),
+    "Mild": (
+        "Rest and self-care at home are usually enough; contact a clinician if symptoms "
+        "persist beyond a few days or get worse."
+    ),
+}
+
+_RISK_HISTORY = re.compile(
+    r"\b(diabet\w*|heart|cardiac|copd|asthma|pregnan\w*|immuno\w*|cancer|chemo\w*|kidney)\b",
+    re.IGNORECASE,
+)
+# A negation up to two words before the phrase, with no punctuation or
+# conjunction in between ("no fever, but chest pain" still counts)
+_NEGATION = re.compile(
+    r"\b(?:no|not|denies|denied|without|never)\b(?:[ \t]+(?!and\b|but\b|or\b)\w+){0,2}[ \t]*$"
+)
+_NEGATION_WINDOW = 30
+_WHITESPACE = re.compile(r"\s+")
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'"})
+
+
+def _compile():
+    by_phrase: Dict[str, int] = {}
+    for index, (_severity, _flag, phrases, _causes) in enumerate(LEXICON):
+        for phrase in phrases:
+            by_phrase.setdefault(phrase, index)
+    # Longest phrases first so "severe abdominal pain" wins over "abdominal pain"
+    alternation = "|".join(
+        re.escape(p) for p in sorted(by_phrase, key=lambda p: (-len(p), p))
+    ).replace(r"\ ", r"\s+")
+    return re.compile(r"\b(?:" + alternation + r")\b"), by_phrase
+
+
+_PATTERN, _RULE_BY_PHRASE = _compile()
+
+
+class Finding(NamedTuple):
+    phrase: str
+    severity: str
+    red_flag: Optional[str]
+    causes: Tuple[str, ...]
+
+
+def _normalize(text: str) -> str:
+    return (text or "").translate(_APOSTROPHES).lower()
+
+
+def find_symptoms(text: str) -> List[Finding]:
+    """Lexicon phrases in ``text`` that are not negated, in order of appearance."""
+    text = _normalize(text)
+    findings = []
+    for match in _PATTERN.finditer(text):
+        if _NEGATION.search(text[max(0, match.start() - _NEGATION_WINDOW) : match.start()]):
+            continue
+        phrase = _WHITESPACE.sub(" ", match.group(0))
+        severity, flag, _phrases, causes = LEXICON[_RULE_BY_PHRASE[phrase]]
+        findings.append(Finding(phrase, severity, flag, causes))
+    return findings
+
+
+def _risk_factors(patient_context: Optional[Dict[str, Any]]) -> List[str]:
+    ctx = patient_context or {}
+    factors = []
+    age = ctx.get("age")
+    if isinstance(age, (int, float)) and (age >= 65 or age < 2):
+        factors.append(f"age {age:g}")
+    match = _RISK_HISTORY.search(ctx.get("medical_history") or "")
+    if match:
+        factors.append(f"history of {match.group(1).lower()}")
+    return factors
+
+
+def _unique(items) -> List[str]:
+    return list(dict.fromkeys(item for item in items if item))
+
+
+def assess(text: str, patient_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Deterministic assessment of ``text`` in ``generate_triage``'s result shape."""
+    findings = find_symptoms(text)
+    risks = _risk_factors(patient_context)
+    if findings:
+        level = max(SEVERITIES.index(f.severity) for f in findings)
+        severity = SEVERITIES[level]
+        if risks and severity in ("Mild", "Moderate"):
+            severity = SEVERITIES[level + 1]
+        phrases = ", ".join(_unique(f.phrase for f in findings))
+        summary = f"Reported symptoms include {phrases}."
+        rationale = f"Matched symptom rules for: {phrases}."
+    else:
+        severity = "Moderate"
+        summary = "No specific symptoms were recognised in the description."
+        rationale = "No symptom rule matched, so a cautious default was used."
+    if risks:
+        rationale += f" Risk factors considered: {', '.join(risks)}."
+
+    triage = PreliminaryTriage(
+        severity=severity,
+        summary=summary,
+        advice=ADVICE[severity],
+        red_flags=_unique(f.red_flag for f in findings),
+        differential=_unique(cause for f in findings for cause in f.causes),
+        rationale=rationale + " Generated offline by rules, not reviewed by the AI model.",
+    ).to_dict()
+    # Lets clinicians and the UI tell these results from Gemini's
+    triage["engine"] = "rules"
+    return triage
+
+
+def prescreen(text: str, patient_context: Optional[Dict[str, Any]] = None):
+    """The rule assessment if ``text`` is an obvious Critical case, else None."""
+    if not any(f.severity == "Critical" for f in find_symptoms(text)):
+        return None
+    return assess(text, patient_context)
+
+
+def escalate(result: Dict[str, Any], screen: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply a Critical pre-screen to the model's ``result``: the severity never
+    ends up lower than Critical and the rule red flags are kept.
+    """
+    if not screen:
+        return result
+    merged = dict(result)
+    merged["red_flags"] = _unique([*screen["red_flags"], *(result.get("red_flags") or [])])
+    if merged.get("severity") != "Critical":
+        merged["severity"] = "Critical"
+        merged["advice"] = screen["advice"]
+        merged["escalated_by"] = "rules"
+    return merged
+
+
+def rules_config() -> Dict[str, bool]:
+    """``settings.TRIAGE_RULES`` with defaults filled in."""
+    config = getattr(settings, "TRIAGE_RULES", None) or {}
+    return {
+        "PRESCREEN": bool(config.get("PRESCREEN", True)),
+        "FALLBACK": bool(config.get("FALLBACK", True)),
+    }
@@ -1,7 +1,113 @@
-from dataclasses import dataclass
+from __future__ import annotations
 
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-@dataclass
+SEVERITIES = ("Mild", "Moderate", "Severe", "Critical")
+DEFAULT_SEVERITY = "Moderate"
+DEFAULT_SUMMARY = "No summary provided."
+DEFAULT_ADVICE = "Consider contacting a healthcare professional for guidance."
+DEFAULT_RATIONALE = "No rationale provided."
+
+MAX_LIST_ITEMS = 8
+MAX_ITEM_CHARS = 200
+
+_SEVERITY_SYNONYMS = {
+    "mild": "Mild",
+    "low": "Mild",
+    "minor": "Mild",
+    "minimal": "Mild",
+    "moderate": "Moderate",
+    "medium": "Moderate",
+    "intermediate": "Moderate",
+    "severe": "Severe",
+    "high": "Severe",
+    "serious": "Severe",
+    "urgent": "Severe",
+    "critical": "Critical",
+    "emergency": "Critical",
+    "emergent": "Critical",
+    "life-threatening": "Critical",
+    "life threatening": "Critical",
+}
+_SEVERITY_WORD = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, _SEVERITY_SYNONYMS), key=len, reverse=True)) + r")\b"
+)
+# Separators for list fields that come back as one string
+_LIST_SPLIT = re.compile(r"\s*(?:\n|;|•|,)\s*(?:[-*]\s+)?")
+
+
+def canonical_severity(value: Any) -> Optional[str]:
+    """Map a model-provided severity ("HIGH", "severe (urgent)") to a canonical level."""
+    if not isinstance(value, str):
+        return None
+    text = value.strip().lower()
+    if text in _SEVERITY_SYNONYMS:
+        return _SEVERITY_SYNONYMS[text]
+    match = _SEVERITY_WORD.search(text)
+    return _SEVERITY_SYNONYMS[match.group(1)] if match else None
+
+
+def _text(default: str, limit: int) -> Callable[[Any], str]:
+    def coerce(value: Any) -> str:
+        if value is None:
+            return default
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(v) for v in value if v is not None)
+        text = str(value).strip()
+        return text[:limit] if text else default
+
+    return coerce
+
+
+def _items(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = _LIST_SPLIT.split(value.strip().lstrip("-* "))
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    items = []
+    for item in value:
+        text = str(item).strip() if item is not None else ""
+        if text:
+            items.append(text[:MAX_ITEM_CHARS])
+            if len(items) == MAX_LIST_ITEMS:
+                break
+    return items
+
+
+def _severity(value: Any) -> str:
+    return canonical_severity(value) or DEFAULT_SEVERITY
+
+
+@dataclass(slots=True)
 class PreliminaryTriage:
-    severity: str | None = None
-    summary: str | None = None
+    severity: str = DEFAULT_SEVERITY
+    summary: str = DEFAULT_SUMMARY
+    advice: str = DEFAULT_ADVICE
+    red_flags: List[str] = field(default_factory=list)
+    differential: List[str] = field(default_factory=list)
+    rationale: str = DEFAULT_RATIONALE
+
+    @classmethod
+    def from_raw(cls, data: Dict[str, Any]) -> "PreliminaryTriage":
+        """Validate and normalize a parsed model response in one pass over the schema."""
+        data = data if isinstance(data, dict) else {}
+        return cls(**{name: coerce(data.get(name)) for name, coerce in _SCHEMA})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for ``TriageInteraction.result`` and JSON responses."""
+        return asdict(self)
+
+
+# Built once at import: (field name, coercer) for every key of the result
+_SCHEMA: Tuple[Tuple[str, Callable[[Any], Any]], ...] = (
+    ("severity", _severity),
+    ("summary", _text(DEFAULT_SUMMARY, 1000)),
+    ("advice", _text(DEFAULT_ADVICE, 2000)),
+    ("red_flags", _items),
+    ("differential", _items),
+    ("rationale", _text(DEFAULT_RATIONALE, 2000)),
+)
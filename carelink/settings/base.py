@@ -19,6 +19,135 @@ DEBUG = env("DJANGO_DEBUG")
 SECRET_KEY = env("DJANGO_SECRET_KEY")
 ALLOWED_HOSTS = [h.strip() for h in env("DJANGO_ALLOWED_HOSTS").split(",")]
 GEMINI_API_KEY = env("GEMINI_API_KEY", default=None)
+# Point the chat UI at the async triage endpoint (only useful under ASGI)
+TRIAGE_ASYNC_CHAT_API = env.bool("TRIAGE_ASYNC_CHAT_API", default=False)
+# Cache of triage results keyed on the built prompt ("local" or "django" backend)
+TRIAGE_CACHE = {
+    "ENABLED": env.bool("TRIAGE_CACHE_ENABLED", default=True),
+    "BACKEND": env("TRIAGE_CACHE_BACKEND", default="local"),
+    "TTL": env.int("TRIAGE_CACHE_TTL", default=600),
+    "MAX_ENTRIES": env.int("TRIAGE_CACHE_MAX_ENTRIES", default=512),
+    "ALIAS": "default",
+}
+# Coalescing of identical in-flight triage prompts. LEASE extends it across
+# workers and needs a shared CACHE_URL with TRIAGE_CACHE_BACKEND=django.
+TRIAGE_SINGLEFLIGHT = {
+    "ENABLED": env.bool("TRIAGE_SINGLEFLIGHT_ENABLED", default=True),
+    "LEASE": env.bool("TRIAGE_SINGLEFLIGHT_LEASE", default=False),
+    "LEASE_SECONDS": env.float("TRIAGE_SINGLEFLIGHT_LEASE_SECONDS", default=30.0),
+    "POLL_SECONDS": 0.1,
+    "CACHE_ALIAS": "default",
+}
+# Token buckets per scope: CAPACITY is the burst size, REFILL_PER_MINUTE the sustained rate
+RATE_LIMITS = {
+    "ENABLED": env.bool("RATE_LIMIT_ENABLED", default=True),
+    "CACHE_ALIAS": "default",
+    "SCOPES": {
+        "chat_api": {
+            "user": {
+                "CAPACITY": env.int("CHAT_RATE_USER_BURST", default=6),
+                "REFILL_PER_MINUTE": env.float("CHAT_RATE_USER_PER_MINUTE", default=6),
+            },
+            "ip": {
+                "CAPACITY": env.int("CHAT_RATE_IP_BURST", default=20),
+                "REFILL_PER_MINUTE": env.float("CHAT_RATE_IP_PER_MINUTE", default=30),
+            },
+            "global": {
+                "CAPACITY": env.int("CHAT_RATE_GLOBAL_BURST", default=60),
+                "REFILL_PER_MINUTE": env.float("CHAT_RATE_GLOBAL_PER_MINUTE", default=240),
+            },
+        },
+        # Nominatim's usage policy allows at most one request per second
+        "geocode": {"global": {"CAPACITY": 1, "REFILL_PER_MINUTE": 60}},
+        # Shared by every `manage.py retriage` process so backfills cannot
+        # starve live chats of Gemini quota
+        "retriage": {
+            "global": {
+                "CAPACITY": env.int("RETRIAGE_RATE_BURST", default=5),
+                "REFILL_PER_MINUTE": env.float("RETRIAGE_RATE_PER_MINUTE", default=60),
+            }
+        },
+    },
+}
+# Circuit breakers / health-aware routing across the Gemini fallback models
+GEMINI_ROUTING = {
+    "CACHE_ALIAS": "default",
+    "WINDOW_SECONDS": env.int("GEMINI_ROUTING_WINDOW_SECONDS", default=120),
+    "MIN_SAMPLES": env.int("GEMINI_ROUTING_MIN_SAMPLES", default=5),
+    "ERROR_THRESHOLD": env.float("GEMINI_ROUTING_ERROR_THRESHOLD", default=0.5),
+    "OPEN_SECONDS": env.int("GEMINI_ROUTING_OPEN_SECONDS", default=30),
+}
+# Server-side state for multi-turn triage chats (stored in the Django cache)
+TRIAGE_CONVERSATIONS = {
+    "ALIAS": "default",
+    "TTL": env.int("TRIAGE_CONVERSATION_TTL", default=6 * 60 * 60),
+    "RECENT_TURNS": env.int("TRIAGE_CONVERSATION_RECENT_TURNS", default=4),
+    "DIGEST_CHARS": 1200,
+}
+# Upper bound on the estimated size of one triage prompt
+GEMINI_PROMPT_MAX_TOKENS = env.int("GEMINI_PROMPT_MAX_TOKENS", default=1500)
+# Time budget in seconds for one triage request, per endpoint (retries and repair included)
+TRIAGE_DEADLINES = {
+    "default": env.float("TRIAGE_DEADLINE_SECONDS", default=25.0),
+    "chat_api": env.float("TRIAGE_DEADLINE_SECONDS", default=25.0),
+    "chat_api_async": env.float("TRIAGE_DEADLINE_SECONDS", default=25.0),
+    # Tokens reach the browser early, so a slow stream is more tolerable
+    "chat_stream": env.float("TRIAGE_STREAM_DEADLINE_SECONDS", default=40.0),
+    # Queued jobs: nobody is waiting on an open connection
+    "job": env.float("TRIAGE_JOB_DEADLINE_SECONDS", default=60.0),
+}
+# Background triage jobs (manage.py triage_worker). VISIBILITY_TIMEOUT must
+# exceed TRIAGE_DEADLINES["job"] or slow jobs would be claimed twice.
+TRIAGE_JOBS = {
+    "ENABLED": env.bool("TRIAGE_USE_JOB_QUEUE", default=False),
+    "VISIBILITY_TIMEOUT": env.int("TRIAGE_JOB_VISIBILITY_TIMEOUT", default=90),
+    "MAX_ATTEMPTS": env.int("TRIAGE_JOB_MAX_ATTEMPTS", default=3),
+}
+# Offline rule-based triage: Critical pre-screen before Gemini answers, and
+# the answer itself when Gemini is unconfigured or failing
+TRIAGE_RULES = {
+    "PRESCREEN": env.bool("TRIAGE_RULES_PRESCREEN", default=True),
+    "FALLBACK": env.bool("TRIAGE_RULES_FALLBACK", default=True),
+}
+# Sweeps over the model list and the jittered exponential backoff between them
+GEMINI_RETRY = {
+    "SWEEPS": env.int("GEMINI_RETRY_SWEEPS", default=2),
+    "BASE_DELAY": env.float("GEMINI_RETRY_BASE_DELAY", default=0.5),
+    "MAX_DELAY": env.float("GEMINI_RETRY_MAX_DELAY", default=4.0),
+}
+# How prompts reach a model: "sdk" (Gemini), "cassette" (record/replay to
+# CASSETTE_PATH) or "http" (manage.py fake_gemini_server) for offline load tests
+GEMINI_TRANSPORT = {
+    "BACKEND": env.str("GEMINI_TRANSPORT", default="sdk"),
+    "CASSETTE_PATH": env.str(
+        "GEMINI_CASSETTE_PATH", default=str(BASE_DIR / "gemini_cassette.json")
+    ),
+    "CASSETTE_MODE": env.str("GEMINI_CASSETTE_MODE", default="replay"),
+    "CASSETTE_REALTIME": env.bool("GEMINI_CASSETTE_REALTIME", default=False),
+    "HTTP_URL": env.str("GEMINI_FAKE_URL", default="http://127.0.0.1:8765"),
+}
+# Hedged requests: race the next model when the primary is slower than DELAY_SECONDS
+GEMINI_HEDGING = {
+    "ENABLED": env.bool("GEMINI_HEDGING_ENABLED", default=False),
+    "DELAY_SECONDS": env.float("GEMINI_HEDGE_DELAY_SECONDS", default=1.5),
+}
+# Per-call Gemini metrics (staff endpoint /triage/admin/metrics/) and the
+# sampled slow-call log on the "carelink.llm.slow" logger
+LLM_METRICS = {
+    "ENABLED": env.bool("LLM_METRICS_ENABLED", default=True),
+    "LOG_CALLS": env.bool("LLM_LOG_CALLS", default=True),
+    "SLOW_SECONDS": env.float("LLM_SLOW_CALL_SECONDS", default=5.0),
+    "SLOW_SAMPLE_RATE": env.float("LLM_SLOW_CALL_SAMPLE_RATE", default=0.1),
+    "SLOW_PROMPT_CHARS": 400,
+}
+# Cached metrics snapshot behind /admin/dashboard/ (TTL 0 recomputes on every request).
+# Once it expires, other workers serve the old one for up to STALE_SECONDS while one refreshes.
+ADMIN_DASHBOARD = {
+    "TTL": env.int("ADMIN_DASHBOARD_TTL", default=60),
+    "STALE_SECONDS": env.int("ADMIN_DASHBOARD_STALE_SECONDS", default=600),
+    "REFRESH_LOCK_SECONDS": 30,
+    "CACHE_ALIAS": "default",
+}
 
 INSTALLED_APPS = [
     "django.contrib.admin",
@@ -71,6 +200,10 @@ TEMPLATES = [
 WSGI_APPLICATION = "carelink.wsgi.application"
 ASGI_APPLICATION = "carelink.asgi.application"
 
+# Point CACHE_URL at a shared cache (e.g. redis://...) in production so model
+# health and cached triage results are shared by every worker.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
@@ -5,6 +5,11 @@ import math
 import requests
 from django.db.models import Q
 
+from carelink.common.services.rate_limit import get_rate_limiter
+
+# Longest a caller waits for a geocoding slot before giving up
+GEOCODE_RATE_WAIT_SECONDS = 30
+
 
 def geocode_location(location_string, retries=3, delay=1):
     """
@@ -24,7 +29,12 @@ def geocode_location(location_string, retries=3, delay=1):
     if not location_string or location_string.strip() == "":
         return None, None
 
+    limiter = get_rate_limiter("geocode")
     for attempt in range(retries):
+        # Shared across workers so bulk commands stay within Nominatim's policy
+        if not limiter.wait(timeout=GEOCODE_RATE_WAIT_SECONDS):
+            print(f"Geocoding skipped for '{location_string}': rate limit")
+            return None, None
         try:
             # Use OpenStreetMap Nominatim API (free)
             url = "https://nominatim.openstreetmap.org/search"
@@ -2,10 +2,9 @@ import json
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import models, transaction
+from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 try:
@@ -16,7 +15,9 @@ except ImportError:
     canvas = None
 
 from accounts.views import doctor_required, patient_required
+from triage.counters import dashboard_counts
 from triage.models import TriageDoctorNote, TriageInteraction
+from triage.pagination import keyset_page
 
 from .forms import DoctorAvailabilityFormSet, DoctorProfileForm
 from .models import DoctorAvailability, DoctorProfile
@@ -25,56 +26,34 @@ from .models import DoctorAvailability, DoctorProfile
 @doctor_required
 def index(request):
     """Doctor dashboard - only accessible to doctors."""
-    # Calculate stats from actual database
-    total_reports = TriageInteraction.objects.count()
-    today = timezone.now().date()
-    today_reports = TriageInteraction.objects.filter(created_at__date=today).count()
-
-    # Count high-risk patients (Critical or Severe severity)
-    high_risk_count = TriageInteraction.objects.filter(severity__in=["Critical", "Severe"]).count()
-
-    # Count unique active patients
-    active_patients = TriageInteraction.objects.values("user").distinct().count()
-
-    # Get recent triage reports ordered by severity and time
-    severity_order = models.Case(
-        models.When(severity="Critical", then=4),
-        models.When(severity="Severe", then=3),
-        models.When(severity="Moderate", then=2),
-        models.When(severity="Mild", then=1),
-        default=0,
-        output_field=models.IntegerField(),
-    )
-
-    recent_reports = (
-        TriageInteraction.objects.select_related("user")
-        .annotate(severity_rank=severity_order)
-        .order_by("-severity_rank", "-updated_at")[:10]
-    )
+    # Read from the materialized counters: one query, whatever the table size
+    counts = dashboard_counts()
+    total_reports = counts["total"]
+    today_reports = counts["today"]
+    # High-risk reports (Critical or Severe severity)
+    high_risk_count = counts["high_risk"]
+    # Unique patients with at least one report
+    active_patients = counts["patients"]
+
+    # Most severe first, then by recency; served by the severity_rank index
+    recent_reports = keyset_page(TriageInteraction.objects.select_related("user"), size=10).items
 
     # Get unassigned cases (priority queue)
-    priority_queue = (
-        TriageInteraction.objects.filter(assigned_doctor__isnull=True)
-        .select_related("user")
-        .annotate(severity_rank=severity_order)
-        .order_by("-severity_rank", "-updated_at")
-    )
+    priority_queue = keyset_page(
+        TriageInteraction.objects.filter(assigned_doctor__isnull=True).select_related("user")
+    ).items
 
     # Get team cases (assigned to any doctor)
-    team_cases = (
+    team_cases = keyset_page(
         TriageInteraction.objects.filter(assigned_doctor__isnull=False)
         .select_related("user", "assigned_doctor")
         .prefetch_related("notes")
-        .annotate(severity_rank=severity_order)
-        .order_by("-severity_rank", "-updated_at")
-    )
+    ).items
 
     # Calculate today's summary stats
     reports_reviewed_today = 0  # Placeholder
     appointments_today = 0  # Placeholder
-    follow_ups_required = TriageInteraction.objects.filter(
-        severity__in=["Critical", "Severe"]
-    ).count()
+    follow_ups_required = high_risk_count
 
     context = {
         "total_reports": total_reports,
@@ -327,20 +306,10 @@ def triage_feed(request):
     """JSON feed of triage interactions for polling/updates."""
     from django.http import JsonResponse
 
-    severity_order = models.Case(
-        models.When(severity="Critical", then=4),
-        models.When(severity="Severe", then=3),
-        models.When(severity="Moderate", then=2),
-        models.When(severity="Mild", then=1),
-        default=0,
-        output_field=models.IntegerField(),
-    )
-
-    interactions = (
-        TriageInteraction.objects.select_related("user")
-        .annotate(severity_rank=severity_order)
-        .order_by("-severity_rank", "-updated_at")[:20]
+    page = keyset_page(
+        TriageInteraction.objects.select_related("user"), after=request.GET.get("after"), size=20
     )
+    interactions = page.items
 
     data = [
         {
@@ -351,7 +320,7 @@ def triage_feed(request):
         }
         for i in interactions
     ]
-    return JsonResponse({"interactions": data})
+    return JsonResponse({"interactions": data, "next_cursor": page.next_cursor})
 
 
 @doctor_required
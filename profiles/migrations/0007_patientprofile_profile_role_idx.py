@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0006_patientprofile_address_patientprofile_latitude_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="patientprofile",
+            index=models.Index(fields=["role"], name="profile_role_idx"),
+        ),
+    ]
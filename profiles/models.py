@@ -55,6 +55,8 @@ class PatientProfile(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Patient Profile"
         verbose_name_plural = "Patient Profiles"
+        # Doctor lists are filtered by role
+        indexes = [models.Index(fields=["role"], name="profile_role_idx")]
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -0,0 +1,36 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _reset_gemini_state():
+    """Keep process-wide Gemini state from leaking between tests."""
+    from django.core.cache import cache
+
+    from carelink.common.services import (
+        conversation_store,
+        gemini_client,
+        hedging,
+        json_repair,
+        llm_metrics,
+        model_health,
+        rate_limit,
+        singleflight,
+        triage_cache,
+    )
+
+    def reset():
+        gemini_client.reset_gemini_clients()
+        triage_cache.reset_triage_cache()
+        model_health.reset_model_health()
+        hedging.get_hedge_stats().reset()
+        json_repair.get_repair_stats().reset()
+        llm_metrics.get_llm_metrics().reset()
+        conversation_store.reset_conversation_store()
+        singleflight.reset_singleflight()
+        rate_limit.reset_rate_limiters()
+        # Breaker state lives in the (locmem) Django cache
+        cache.clear()
+
+    reset()
+    yield
+    reset()
@@ -0,0 +1,104 @@
+import datetime
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from appointments.models import Appointment
+from carelink.common.dates import day_bounds
+from profiles.models import PatientProfile
+from triage.models import DailyMetrics, TriageInteraction
+from triage.rollups import METRICS, rollup
+
+
+@pytest.fixture
+def patient(db):
+    # Start without the demo patients the migrations seed
+    User.objects.all().delete()
+    user = User.objects.create_user("pat", password="pass12345")
+    PatientProfile.objects.create(user=user, role="patient")
+    return user
+
+
+def _days_ago(n):
+    return timezone.now() - datetime.timedelta(days=n)
+
+
+def _metrics(day):
+    return dict(DailyMetrics.objects.filter(day=day).values_list("metric", "value"))
+
+
+def _appointment(patient, status, n=0):
+    return Appointment.objects.create(
+        patient=patient,
+        doctor=patient,
+        appointment_date=datetime.date(2030, 1, 1 + n),
+        appointment_time=datetime.time(9),
+        status=status,
+    )
+
+
+def test_rollup_counts_each_metric_per_day(patient):
+    today = timezone.localdate()
+    yesterday = today - datetime.timedelta(days=1)
+    old = TriageInteraction.objects.create(user=patient, symptoms_text="a", severity="Severe")
+    TriageInteraction.objects.filter(pk=old.pk).update(created_at=_days_ago(1))
+    TriageInteraction.objects.create(user=patient, symptoms_text="b", severity="Critical")
+    TriageInteraction.objects.create(
+        user=patient,
+        symptoms_text="c",
+        review_status="finished_review",
+        reviewed_at=timezone.now(),
+    )
+    _appointment(patient, "completed")
+    _appointment(patient, "cancelled", n=1)
+
+    assert rollup() == [yesterday, today]
+
+    assert _metrics(yesterday) == {**dict.fromkeys(METRICS, 0), "triages": 1, "triages_severe": 1}
+    metrics = _metrics(today)
+    assert metrics["new_users"] == 1
+    assert metrics["triages"] == 2
+    assert metrics["triages_critical"] == metrics["triages_unknown"] == 1
+    assert metrics["reviews_finished"] == 1
+    assert metrics["appointments"] == 2
+    assert metrics["appointments_completed"] == metrics["appointments_cancelled"] == 1
+    assert metrics["cancellations"] == 1
+
+
+def test_later_runs_only_recompute_unfinished_days(patient):
+    today = timezone.localdate()
+    first = today - datetime.timedelta(days=3)
+    interaction = TriageInteraction.objects.create(user=patient, symptoms_text="a")
+    TriageInteraction.objects.filter(pk=interaction.pk).update(created_at=_days_ago(3))
+
+    assert len(rollup()) == 4
+    # Only today's partial row is left to recompute
+    TriageInteraction.objects.create(user=patient, symptoms_text="b")
+    assert rollup() == [today]
+    assert _metrics(today)["triages"] == 1
+
+    # A day last rolled up before it ended is still partial
+    yesterday = today - datetime.timedelta(days=1)
+    partial = day_bounds(yesterday)[0] + datetime.timedelta(hours=12)
+    DailyMetrics.objects.filter(day=yesterday).update(computed_at=partial)
+    assert rollup() == [yesterday, today]
+    assert DailyMetrics.objects.filter(day__gte=first).count() == 4 * len(METRICS)
+
+
+def test_command_rolls_up_since_a_day(patient):
+    today = timezone.localdate()
+    since = today - datetime.timedelta(days=2)
+    out = io.StringIO()
+
+    call_command("rollup_metrics", "--since", since.isoformat(), stdout=out)
+
+    assert f"Rolled up 3 day(s) from {since} to {today}" in out.getvalue()
+    assert set(DailyMetrics.objects.values_list("day", flat=True)) == {
+        since + datetime.timedelta(days=n) for n in range(3)
+    }
+    with pytest.raises(CommandError, match="--since must be a date"):
+        call_command("rollup_metrics", "--since", "last week")
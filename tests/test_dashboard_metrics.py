@@ -0,0 +1,200 @@
+import datetime
+import threading
+import time
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appointments.models import Appointment
+from carelink.common.services import dashboard_metrics
+from carelink.common.services.dashboard_metrics import compute_metrics
+from doctors.models import DoctorAvailability, DoctorProfile
+from profiles.models import PatientProfile
+from triage.models import TriageInteraction
+from triage.rollups import rollup
+
+SNAPSHOT_KEY = f"{dashboard_metrics.SNAPSHOT_KEY}:7"
+REFRESH_LOCK_KEY = f"{dashboard_metrics.REFRESH_LOCK_KEY}:7"
+
+
+def _user(username, role="patient", **extra):
+    user = User.objects.create_user(username, password="pass12345", **extra)
+    PatientProfile.objects.update_or_create(
+        user=user, defaults={"role": role, "onboarding_completed": role == "doctor"}
+    )
+    return user
+
+
+def _doctor_profile(user):
+    return DoctorProfile.objects.create(
+        user=user,
+        specialty="General Practice",
+        clinic_name="Clinic",
+        clinic_address="",  # skips geocoding
+        consultation_fee=50,
+    )
+
+
+@pytest.fixture
+def data(db):
+    # Start without the demo patients the migrations seed
+    User.objects.all().delete()
+    staff = _user("admin", role="doctor", is_staff=True)
+    idle_doctor = _user("idle", role="doctor")
+    patient = _user("pat")
+    doctor = _doctor_profile(staff)
+    _doctor_profile(idle_doctor)
+    DoctorAvailability.objects.create(doctor=doctor, day_of_week=0)
+    DoctorAvailability.objects.create(doctor=doctor, day_of_week=1)
+
+    for severity in ["Critical", "Mild", "Mild", None]:
+        TriageInteraction.objects.create(user=patient, symptoms_text="cough", severity=severity)
+    old = TriageInteraction.objects.create(
+        user=patient,
+        symptoms_text="rash",
+        severity="Mild",
+        review_status="finished_review",
+        data_integrity_status="verified",
+    )
+    TriageInteraction.objects.filter(pk=old.pk).update(
+        created_at=timezone.now() - datetime.timedelta(days=10)
+    )
+    for n, status in enumerate(["pending", "completed", "cancelled", "completed"]):
+        Appointment.objects.create(
+            patient=patient,
+            doctor=staff,
+            appointment_date=datetime.date(2030, 1, 1 + n),
+            appointment_time=datetime.time(9),
+            status=status,
+        )
+    rollup()
+    return {"staff": staff, "patient": patient}
+
+
+def test_metrics_match_the_tables(data):
+    metrics = compute_metrics()
+
+    assert metrics["total_users"] == 3
+    assert metrics["new_users_week"] == 3
+    assert metrics["total_patients"] == 1 and metrics["total_doctors"] == 2
+    assert metrics["onboarding_rate"] == 66.7
+    # The patient triaged and booked; the doctors never logged in
+    assert metrics["active_users"] == 1
+    assert metrics["total_doctors_with_profiles"] == 2
+    assert metrics["doctors_with_availability"] == 1
+
+    assert metrics["total_triages"] == 5
+    assert metrics["triages_this_month"] == 5
+    assert metrics["triages_this_week"] == metrics["triages_today"] == 4
+    assert metrics["severity_dist"] == [
+        {"severity": "Mild", "count": 3},
+        {"severity": "Critical", "count": 1},
+        {"severity": None, "count": 1},
+    ]
+    assert metrics["triages_reviewed"] == metrics["triages_verified"] == 1
+    assert metrics["triages_pending_review"] == 4
+    assert metrics["triage_review_rate"] == 20.0
+
+    assert metrics["total_appointments"] == 4
+    assert metrics["appointment_status_dist"][0] == {"status": "completed", "count": 2}
+    assert metrics["cancellation_rate"] == 25.0
+    assert metrics["avg_appointments_per_doctor"] == 2.0
+
+    trend = metrics["triage_trends"]
+    assert len(trend) == 7
+    assert trend[-1] == {
+        "date": timezone.localdate().isoformat(),
+        "label": timezone.localdate().strftime("%b %d"),
+        "count": 4,
+    }
+    assert sum(day["count"] for day in metrics["appointment_trends"]) == 4
+    assert not metrics["rollup_missing"]
+
+
+def test_ranges_come_from_the_rollup(data):
+    TriageInteraction.objects.create(user=data["patient"], symptoms_text="late", severity="Mild")
+
+    metrics = compute_metrics(trend_days=90)
+
+    # Totals are live; ranges wait for the next rollup
+    assert metrics["total_triages"] == 6
+    assert metrics["triages_today"] == 4
+    assert len(metrics["triage_trends"]) == 90
+    assert sum(day["count"] for day in metrics["triage_trends"]) == 5
+
+    rollup()
+    assert compute_metrics()["triages_today"] == 5
+
+
+def test_dashboard_renders_in_at_most_six_queries(client, data, django_assert_max_num_queries):
+    client.login(username="admin", password="pass12345")
+
+    with django_assert_max_num_queries(6):
+        response = client.get(reverse("admin_dashboard"))
+    assert response.status_code == 200
+    assert response.context["total_triages"] == 5
+
+    # The snapshot is cached: only the session and user lookups remain
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(reverse("admin_dashboard"))
+        api = client.get(reverse("admin_dashboard_api")).json()
+    assert not [q for q in ctx.captured_queries if "triage_triageinteraction" in q["sql"]]
+    assert api["triages_today"] == 4 and api["appointments_today"] == 4
+
+    response = client.get(reverse("admin_dashboard"), {"days": 365})
+    assert response.context["trend_days"] == 365
+    assert len(response.context["triage_trends"]) == 365
+    assert client.get(reverse("admin_dashboard"), {"days": "x"}).context["trend_days"] == 7
+
+
+def test_expired_snapshot_is_served_while_another_worker_refreshes(db, monkeypatch):
+    stale = {"metrics": {"total_triages": 7}, "fresh_until": time.time() - 1}
+    cache.set(SNAPSHOT_KEY, stale)
+    cache.add(REFRESH_LOCK_KEY, True)
+    monkeypatch.setattr(dashboard_metrics, "compute_metrics", pytest.fail)
+
+    assert dashboard_metrics.dashboard_metrics() == {"total_triages": 7}
+
+    # Once the other worker is done, the next caller refreshes
+    cache.delete(REFRESH_LOCK_KEY)
+    monkeypatch.setattr(dashboard_metrics, "compute_metrics", lambda days: {"total_triages": 8})
+    assert dashboard_metrics.dashboard_metrics() == {"total_triages": 8}
+    assert cache.get(REFRESH_LOCK_KEY) is None
+
+
+def test_concurrent_cold_requests_compute_once(db, monkeypatch):
+    calls = []
+
+    def slow_compute(days):
+        calls.append(1)
+        time.sleep(0.2)
+        return {"total_triages": 1}
+
+    monkeypatch.setattr(dashboard_metrics, "compute_metrics", slow_compute)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(dashboard_metrics.dashboard_metrics()))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"total_triages": 1}] * 5
+
+
+def test_zero_ttl_disables_the_snapshot(db, monkeypatch, settings):
+    settings.ADMIN_DASHBOARD = {"TTL": 0}
+    values = iter(range(2))
+    monkeypatch.setattr(dashboard_metrics, "compute_metrics", lambda days: {"n": next(values)})
+
+    assert dashboard_metrics.dashboard_metrics() == {"n": 0}
+    assert dashboard_metrics.dashboard_metrics() == {"n": 1}
+    assert cache.get(SNAPSHOT_KEY) is None
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from carelink.common.services import gemini_client
+from carelink.common.services.hedging import get_hedge_stats
+
+PRIMARY = gemini_client.DEFAULT_MODEL
+BACKUP = gemini_client.FALLBACK_MODELS[0]
+
+VALID = (
+    '{"severity":"Critical","summary":"%s","advice":"Call 911",'
+    '"red_flags":[],"differential":[],"rationale":"ok"}'
+)
+
+
+def _install_sdk(monkeypatch, handlers, calls):
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        return SimpleNamespace(text=handlers[model]())
+
+    async def agenerate_content(model=None, contents=None):
+        calls.append(model)
+        return SimpleNamespace(text=await handlers[model]())
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content),
+            aio=SimpleNamespace(models=SimpleNamespace(generate_content=agenerate_content)),
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+
+def test_slow_primary_is_hedged_and_backup_wins(monkeypatch, settings):
+    settings.GEMINI_HEDGING = {"ENABLED": True, "DELAY_SECONDS": 0.05}
+    release = threading.Event()
+    calls = []
+    _install_sdk(
+        monkeypatch,
+        {
+            PRIMARY: lambda: release.wait(5) and VALID % "primary",
+            BACKUP: lambda: VALID % "backup",
+        },
+        calls,
+    )
+
+    try:
+        result = gemini_client.GeminiClient(api_key="fake").generate_triage("crushing chest pain")
+    finally:
+        release.set()
+
+    assert result["summary"] == "backup"
+    assert calls == [PRIMARY, BACKUP]
+    stats = get_hedge_stats().snapshot()
+    assert stats["requests"] == 1 and stats["hedged"] == 1
+    assert stats["wins"] == {BACKUP: 1}
+    assert stats["losses"] == {PRIMARY: 1}
+
+
+def test_fast_primary_is_not_hedged(monkeypatch, settings):
+    settings.GEMINI_HEDGING = {"ENABLED": True, "DELAY_SECONDS": 5}
+    calls = []
+    _install_sdk(
+        monkeypatch,
+        {PRIMARY: lambda: VALID % "primary", BACKUP: lambda: VALID % "backup"},
+        calls,
+    )
+
+    result = gemini_client.GeminiClient(api_key="fake").generate_triage("chest pain")
+
+    assert result["summary"] == "primary"
+    assert calls == [PRIMARY]
+    assert get_hedge_stats().snapshot()["hedge_rate"] == 0.0
+
+
+def test_invalid_primary_answer_goes_straight_to_backup(monkeypatch, settings):
+    settings.GEMINI_HEDGING = {"ENABLED": True, "DELAY_SECONDS": 5}
+    calls = []
+    _install_sdk(
+        monkeypatch,
+        {PRIMARY: lambda: "not json", BACKUP: lambda: VALID % "backup"},
+        calls,
+    )
+
+    result = gemini_client.GeminiClient(api_key="fake").generate_triage("chest pain")
+
+    assert result["summary"] == "backup"
+    assert calls == [PRIMARY, BACKUP]
+    assert get_hedge_stats().snapshot()["hedged"] == 0
+
+
+def test_hedging_is_off_by_default(monkeypatch, settings):
+    settings.GEMINI_HEDGING = {"ENABLED": False, "DELAY_SECONDS": 0}
+    calls = []
+    _install_sdk(monkeypatch, {PRIMARY: lambda: VALID % "primary"}, calls)
+
+    gemini_client.GeminiClient(api_key="fake").generate_triage("cough")
+
+    assert get_hedge_stats().snapshot()["requests"] == 0
+
+
+def test_async_hedge_cancels_the_loser(monkeypatch, settings):
+    settings.GEMINI_HEDGING = {"ENABLED": True, "DELAY_SECONDS": 0.05}
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(PRIMARY)
+            raise
+        return VALID % "primary"
+
+    async def backup():
+        return VALID % "backup"
+
+    calls = []
+    _install_sdk(monkeypatch, {PRIMARY: slow_primary, BACKUP: backup}, calls)
+
+    client = gemini_client.GeminiClient(api_key="fake")
+    result = asyncio.run(client.agenerate_triage("crushing chest pain", hedge=True))
+
+    assert result["summary"] == "backup"
+    assert cancelled == [PRIMARY]
+    assert get_hedge_stats().snapshot()["wins"] == {BACKUP: 1}
@@ -0,0 +1,91 @@
+import threading
+from types import SimpleNamespace
+
+from carelink.common.services import gemini_client
+
+
+def _counting_sdk():
+    created = []
+
+    def make_client(api_key=None):
+        created.append(api_key)
+        return SimpleNamespace(models=SimpleNamespace(), aio=SimpleNamespace())
+
+    return SimpleNamespace(Client=make_client), created
+
+
+def test_pool_reuses_client_per_key_and_model(monkeypatch):
+    sdk, created = _counting_sdk()
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    first = gemini_client.get_gemini_client("key-a")
+    assert gemini_client.get_gemini_client("key-a") is first
+    assert gemini_client.get_gemini_client("key-a", model="gemini-1.5-pro") is not first
+    assert gemini_client.get_gemini_client("key-b") is not first
+    assert created == ["key-a", "key-a", "key-b"]
+
+
+def test_pool_builds_once_under_concurrency(monkeypatch):
+    sdk, created = _counting_sdk()
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(gemini_client.get_gemini_client("k")))
+        for _ in range(16)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1
+    assert all(c is results[0] for c in results)
+
+
+def test_reset_evicts_rotated_key(monkeypatch):
+    sdk, created = _counting_sdk()
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    old = gemini_client.get_gemini_client("old-key")
+    keep = gemini_client.get_gemini_client("new-key")
+
+    assert gemini_client.reset_gemini_clients("old-key") == 1
+    assert gemini_client.get_gemini_client("old-key") is not old
+    assert gemini_client.get_gemini_client("new-key") is keep
+
+
+def test_settings_change_resets_pool(monkeypatch, settings):
+    sdk, _created = _counting_sdk()
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    before = gemini_client.get_gemini_client("rotating")
+    settings.GEMINI_API_KEY = "rotated"
+    assert gemini_client.get_gemini_client("rotating") is not before
+
+
+def test_legacy_models_built_once_per_name(monkeypatch):
+    built = []
+
+    class FakeModel:
+        def __init__(self, name, system_instruction=None):
+            built.append(name)
+            self.model_name = name
+
+        def generate_content(self, prompt):
+            raise Exception("boom")
+
+    legacy = SimpleNamespace(configure=lambda api_key=None: None, GenerativeModel=FakeModel)
+    monkeypatch.setattr(gemini_client, "genai_new", None)
+    monkeypatch.setattr(gemini_client, "genai_legacy", legacy)
+    monkeypatch.setattr(gemini_client.time, "sleep", lambda s: None)
+
+    client = gemini_client.get_gemini_client("legacy-key")
+    for _ in range(2):
+        try:
+            client._request_with_retry("prompt")
+        except RuntimeError:
+            pass
+
+    # One object per model name, reused across both sweeps and both calls
+    assert sorted(built) == sorted([gemini_client.DEFAULT_MODEL] + gemini_client.FALLBACK_MODELS)
@@ -0,0 +1,191 @@
+import asyncio
+import io
+import random
+import threading
+
+import pytest
+from django.core.management import call_command
+
+from carelink.common.services import gemini_client
+from carelink.common.services.fake_gemini import FakeGemini, make_server, parse_latency
+from carelink.common.services.gemini_transport import (
+    CassetteTransport,
+    HTTPTransport,
+    TransportError,
+)
+from carelink.common.services.llm_metrics import get_llm_metrics
+
+
+@pytest.fixture
+def fake_server():
+    """Start a fake Gemini server on a free port; the test configures ``server.fake``."""
+    server = make_server(FakeGemini(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(transport):
+    return gemini_client.GeminiClient(transport=transport)
+
+
+def test_client_runs_end_to_end_against_fake_server(fake_server):
+    client = _client(HTTPTransport(fake_server.url))
+
+    result = client.generate_triage("crushing chest pain", {})
+
+    assert result["severity"] == "Critical"
+    assert "Chest pain or pressure" in result["red_flags"]
+    assert fake_server.fake.stats() == {"requests": 1, "ok": 1}
+
+
+def test_fake_server_errors_go_through_retries(fake_server, settings):
+    settings.GEMINI_RETRY = {"SWEEPS": 1}
+    fake_server.fake = FakeGemini(error_rate=1.0, seed=1)
+
+    with pytest.raises(RuntimeError, match="Gemini error"):
+        _client(HTTPTransport(fake_server.url)).generate_triage("cough", {})
+
+    # Every model was tried once
+    assert fake_server.fake.stats()["error"] == 1 + len(gemini_client.FALLBACK_MODELS)
+
+
+@pytest.mark.parametrize(
+    "kind, path",
+    [
+        ("prose_wrapped", "extracted"),
+        ("trailing_comma", "local_repair"),
+        ("truncated", "network_repair"),
+    ],
+)
+def test_malformed_answers_take_the_expected_parse_path(fake_server, kind, path):
+    # Only the first answer is malformed; the repair request gets a valid one
+    fake_server.fake = FakeGemini(malformed_rate=1.0, malformed_kinds=[kind])
+    original = fake_server.fake.reply
+    calls = []
+
+    def reply(model, prompt):
+        calls.append(model)
+        if len(calls) > 1:
+            fake_server.fake.malformed_rate = 0.0
+        return original(model, prompt)
+
+    fake_server.fake.reply = reply
+
+    result = _client(HTTPTransport(fake_server.url)).generate_triage("runny nose", {})
+
+    # A repair prompt carries only the broken output, so its severity may differ
+    assert result["severity"] in ("Mild", "Moderate")
+    assert get_llm_metrics().snapshot()["parse_paths"][path] == 1
+
+
+def test_streaming_through_fake_server(fake_server):
+    events = list(_client(HTTPTransport(fake_server.url)).stream_triage("sore throat", {}))
+
+    assert events[-1][0] == "result"
+    assert events[-1][1]["severity"] == "Mild"
+    assert any(kind == "token" for kind, _data in events)
+
+
+def test_async_generation_through_fake_server(fake_server):
+    result = asyncio.run(
+        _client(HTTPTransport(fake_server.url)).agenerate_triage("sore throat", {})
+    )
+    assert result["severity"] == "Mild"
+
+
+def test_unreachable_server_is_a_transient_error():
+    from carelink.common.services.retry_policy import TRANSIENT, classify_error
+
+    with pytest.raises(ConnectionError) as exc_info:
+        HTTPTransport("http://127.0.0.1:9", timeout=1).generate("m", "p")
+    assert classify_error(exc_info.value) == TRANSIENT
+
+
+def test_latency_specs():
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.2 <= parse_latency("uniform:0.2,0.4")(rng) <= 0.4
+    assert parse_latency("normal:0,1")(rng) >= 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+
+class _ScriptedTransport:
+    """Answers from a list; exceptions in the list are raised."""
+
+    enabled = ready = True
+    native_system_instruction = False
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+
+    def generate(self, model_name, prompt):
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_cassette_records_and_replays_retries(tmp_path, settings):
+    settings.GEMINI_RETRY = {"BASE_DELAY": 0, "MAX_DELAY": 0}
+    path = tmp_path / "cassette.json"
+    valid = (
+        '{"severity":"Moderate","summary":"Recorded","advice":"See a GP",'
+        '"red_flags":[],"differential":[],"rationale":"ok"}'
+    )
+    inner = _ScriptedTransport([TransportError(503, "UNAVAILABLE"), valid])
+    recorded = _client(CassetteTransport(path, "record", inner=inner)).generate_triage(
+        "earache", {"age": 30}
+    )
+
+    assert "earache" not in path.read_text()
+    gemini_client.reset_gemini_clients()
+    from carelink.common.services.triage_cache import reset_triage_cache
+
+    reset_triage_cache()
+    get_llm_metrics().reset()
+
+    replayed = _client(CassetteTransport(path, "replay")).generate_triage("earache", {"age": 30})
+
+    assert replayed == recorded
+    # The recorded 503 is replayed too, so the retry path runs again
+    calls = get_llm_metrics().snapshot()["models"]
+    assert sum(m["outcomes"].get("error", 0) for m in calls.values()) == 1
+
+
+def test_cassette_miss_fails_without_retrying(tmp_path):
+    path = tmp_path / "cassette.json"
+    path.write_text('{"version": 1, "interactions": {}}')
+
+    with pytest.raises(RuntimeError, match="No recorded answer"):
+        _client(CassetteTransport(path, "replay")).generate_triage("cough", {})
+    assert sum(m["calls"] for m in get_llm_metrics().snapshot()["models"].values()) == 1
+
+
+def test_transport_is_chosen_by_settings(settings, fake_server):
+    settings.GEMINI_TRANSPORT = {"BACKEND": "http", "HTTP_URL": fake_server.url}
+
+    client = gemini_client.get_gemini_client()
+
+    assert isinstance(client.transport, HTTPTransport)
+    # No API key is needed to talk to the fake server
+    assert client.generate_triage("runny nose", {})["severity"] == "Mild"
+
+
+def test_bench_command_reports_latency(fake_server):
+    out = io.StringIO()
+    call_command(
+        "gemini_bench",
+        "--url",
+        fake_server.url,
+        "--requests",
+        "6",
+        "--concurrency",
+        "3",
+        stdout=out,
+    )
+    assert "6 requests in" in out.getvalue()
+    assert "0 failed" in out.getvalue()
@@ -0,0 +1,87 @@
+import time
+from types import SimpleNamespace
+
+from carelink.common.services import gemini_client
+from carelink.common.services.json_extract import (
+    JSONObjectExtractor,
+    extract_first_object,
+    extract_objects,
+)
+
+
+def test_braces_inside_strings_are_ignored():
+    text = 'Answer: {"summary": "use } and { freely", "nested": {"a": [1, 2]}} done'
+    assert extract_first_object(text) == (
+        '{"summary": "use } and { freely", "nested": {"a": [1, 2]}}'
+    )
+
+
+def test_escaped_quotes_do_not_end_strings():
+    text = '{"advice": "say \\"}\\" twice", "ok": true}'
+    assert extract_first_object(text) == text
+
+
+def test_all_top_level_objects_in_order():
+    assert extract_objects('{"a": 1} then {"b": {"c": 2}} and {"d"') == [
+        '{"a": 1}',
+        '{"b": {"c": 2}}',
+    ]
+    assert extract_first_object("no json here") is None
+
+
+def test_chunked_feed_matches_single_pass():
+    text = 'prefix {"summary": "a \\\\ b \\"}\\"", "x": {"y": "}"}} {"z": 1}'
+    extractor = JSONObjectExtractor()
+    for ch in text:
+        extractor.feed(ch)
+    assert extractor.objects == extract_objects(text)
+    assert len(extractor.objects) == 2
+
+
+def test_stream_stops_reading_after_the_object_closes(monkeypatch):
+    consumed = []
+
+    def chunks():
+        for text in ('{"severity":"Mild","summary":"ok"', "}", " Hope this helps!", " More"):
+            consumed.append(text)
+            yield SimpleNamespace(text=text)
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content_stream=lambda model=None, contents=None: chunks()
+            )
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    events = list(gemini_client.GeminiClient(api_key="fake").stream_triage("cough", {}))
+
+    assert events[-1][1]["summary"] == "ok"
+    assert consumed == ['{"severity":"Mild","summary":"ok"', "}"]
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def test_benchmark_adversarial_inputs_are_linear():
+    # The previous extractor restarted a depth scan at every "{", so these
+    # inputs cost O(n^2); a single pass handles each in well under a second.
+    n = 200_000
+    cases = {
+        "unclosed_braces": "{" * n,
+        "braces_in_string": '{"a": "' + "{" * n,
+        "many_small_objects": '{"k": "v"} ' * (n // 10),
+        "escapes": '{"a": "' + "\\\\" * (n // 2) + '"}',
+    }
+    for name, text in cases.items():
+        elapsed = _timed(extract_objects, text)
+        assert elapsed < 1.0, f"{name} took {elapsed:.3f}s"
+
+    # Doubling the input should roughly double the time, not quadruple it
+    small = _timed(extract_objects, "{" * (n // 2))
+    large = _timed(extract_objects, "{" * n)
+    assert large < max(small, 0.01) * 6
@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from carelink.common.services import gemini_client
+from carelink.common.services.json_repair import get_repair_stats, repair_json
+
+
+@pytest.mark.parametrize(
+    "text, rule, expected",
+    [
+        ('{"severity": "Mild", "red_flags": ["a",],}', "trailing_commas", {"red_flags": ["a"]}),
+        ("{'severity': 'Mild', 'summary': 'ok'}", "single_quotes", {"summary": "ok"}),
+        ('{severity: "Mild", red_flags: []}', "unquoted_keys", {"red_flags": []}),
+        ("{“severity”: “Mild”}", "smart_quotes", {"severity": "Mild"}),
+        ('{"severity": "Mild", "red_flags": ["fever", "ras', "unterminated_string", {}),
+        ('{"severity": "Mild", "differential": ["flu",', "dangling_tail", {}),
+        ('{"severity": "Mild", "summary": "X"', "missing_closers", {"summary": "X"}),
+    ],
+)
+def test_rules_repair_almost_json(text, rule, expected):
+    data = repair_json(text)
+
+    assert data["severity"] == "Mild"
+    for key, value in expected.items():
+        assert data[key] == value
+    assert rule in get_repair_stats().snapshot()["rules"]
+
+
+def test_apostrophes_inside_strings_survive():
+    data = repair_json('{"summary": "patient\'s pain", "advice": "rest",}')
+    assert data["summary"] == "patient's pain"
+
+
+def test_truncated_array_keeps_complete_items():
+    data = repair_json('Here you go: {"severity": "Severe", "red_flags": ["chest pain", "sweat')
+    assert data["red_flags"] == ["chest pain", "sweat"]
+
+
+def test_unrepairable_text_returns_none():
+    assert repair_json("I cannot help with that.") is None
+    assert get_repair_stats().snapshot()["local_failures"] == 1
+
+
+def test_local_repair_avoids_network_call(monkeypatch):
+    calls = []
+
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        return SimpleNamespace(text="```json\n{'severity': 'Severe', summary: 'Chest pain',}\n```")
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    result = gemini_client.GeminiClient(api_key="fake").generate_triage("chest pain", {})
+
+    assert result["severity"] == "Severe"
+    assert result["summary"] == "Chest pain"
+    assert len(calls) == 1
+    stats = get_repair_stats().snapshot()
+    assert stats["network_repairs_avoided"] == 1
+    assert stats["network_repairs"] == 0
+    json.dumps(stats)
@@ -0,0 +1,135 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from carelink.common.services import gemini_client
+from carelink.common.services.llm_metrics import Histogram, get_llm_metrics, redact_phi
+
+PRIMARY = gemini_client.DEFAULT_MODEL
+BACKUP = gemini_client.FALLBACK_MODELS[0]
+
+VALID = (
+    '{"severity":"Mild","summary":"Cold","advice":"Rest",'
+    '"red_flags":[],"differential":[],"rationale":"ok"}'
+)
+
+
+def _install_sdk(monkeypatch, answers):
+    """Each call pops the next answer: a string is returned, an exception raised."""
+
+    def generate_content(model=None, contents=None):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return SimpleNamespace(text=answer)
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+    hist = Histogram((1, 2, 5))
+    for value in (0.5, 0.7, 1.5, 4, 9):
+        hist.observe(value)
+
+    snap = hist.snapshot()
+    assert snap["buckets"] == {"1": 2, "2": 1, "5": 1, "+Inf": 1}
+    assert (snap["p50"], snap["p95"]) == (2, None)
+    assert snap["count"] == 5 and snap["sum"] == 15.7
+
+
+def test_retried_call_records_attempts_errors_and_parse_path(monkeypatch, settings):
+    settings.GEMINI_RETRY = {"BASE_DELAY": 0, "MAX_DELAY": 0}
+    _install_sdk(monkeypatch, [RuntimeError("503 UNAVAILABLE"), "```json\n" + VALID + "\n```"])
+
+    gemini_client.GeminiClient(api_key="fake").generate_triage("runny nose", {})
+
+    snap = get_llm_metrics().snapshot()
+    calls = list(snap["models"].values())
+    assert sum(m["calls"] for m in calls) == 2
+    assert {k: v for m in calls for k, v in m["errors"].items()} == {"RuntimeError": 1}
+    assert {k for m in calls for k in m["attempts"]} == {"1", "2"}
+    assert snap["parse_paths"]["direct"] == 1
+    ok = next(m for m in calls if m["outcomes"].get("ok"))
+    assert ok["response_tokens"]["count"] == 1
+    assert ok["prompt_tokens"]["sum"] > 50
+
+
+def test_network_repair_is_counted_as_such(monkeypatch):
+    _install_sdk(monkeypatch, ["Sorry, I cannot format that.", VALID])
+
+    gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+
+    assert get_llm_metrics().snapshot()["parse_paths"]["network_repair"] == 1
+
+
+def test_each_call_is_logged_as_json(monkeypatch, caplog):
+    _install_sdk(monkeypatch, [VALID])
+
+    with caplog.at_level(logging.INFO, logger="carelink.llm"):
+        gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+
+    (line,) = [r.getMessage() for r in caplog.records if r.getMessage().startswith("llm_call")]
+    fields = json.loads(line.split(" ", 1)[1])
+    assert fields["model"] == PRIMARY
+    assert fields["attempt"] == 1 and fields["error_class"] is None
+    assert fields["response_chars"] == len(VALID)
+
+
+def test_slow_call_log_redacts_patient_details(monkeypatch, settings, caplog):
+    settings.LLM_METRICS = {"SLOW_SECONDS": 0, "SLOW_SAMPLE_RATE": 1.0, "LOG_CALLS": False}
+    _install_sdk(monkeypatch, [VALID])
+    context = {"age": 47, "medical_history": "HIV positive", "allergies": "penicillin"}
+
+    with caplog.at_level(logging.WARNING, logger="carelink.llm.slow"):
+        gemini_client.GeminiClient(api_key="fake").generate_triage(
+            "fever since 03/02/2025, call me on 555-123-4567 or jo@example.com", context
+        )
+
+    (record,) = caplog.records
+    excerpt = json.loads(record.getMessage().split(" ", 1)[1])["prompt_excerpt"]
+    for secret in ("47", "HIV", "penicillin", "03/02/2025", "555-123-4567", "jo@example.com"):
+        assert secret not in excerpt
+    assert "fever since" in excerpt
+    assert "ROLE:" not in excerpt
+
+
+def test_redact_phi_truncates_long_prompts():
+    assert len(redact_phi("PATIENT_CONTEXT:\n" + "a" * 5000, max_chars=100)) == 100
+
+
+def test_metrics_can_be_disabled(monkeypatch, settings):
+    settings.LLM_METRICS = {"ENABLED": False}
+    _install_sdk(monkeypatch, [VALID])
+    gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+    assert get_llm_metrics().snapshot()["models"] == {}
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_is_staff_only(client):
+    User.objects.create_user("alice", password="pass12345")
+    client.login(username="alice", password="pass12345")
+    assert client.get(reverse("triage:llm_metrics")).status_code in (302, 403)
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_all_layers(client, monkeypatch):
+    _install_sdk(monkeypatch, [VALID])
+    gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+    User.objects.create_user("doc", password="pass12345", is_staff=True)
+    client.login(username="doc", password="pass12345")
+
+    data = json.loads(client.get(reverse("triage:llm_metrics")).content)
+
+    assert data["llm"]["models"][PRIMARY]["outcomes"] == {"ok": 1}
+    assert set(data) >= {"model_health", "hedging", "json_repair", "singleflight", "rate_limits"}
+    assert BACKUP in data["model_health"]
+    assert "chat_api" in data["rate_limits"]
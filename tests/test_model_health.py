@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+from carelink.common.services import gemini_client, model_health
+from carelink.common.services.model_health import CLOSED, OPEN, ModelHealthRegistry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [10_000.0]
+    monkeypatch.setattr(model_health.time, "time", lambda: now[0])
+    return now
+
+
+def _registry(**kwargs):
+    options = {"min_samples": 3, "error_threshold": 0.5, "open_seconds": 30}
+    options.update(kwargs)
+    return ModelHealthRegistry(**options)
+
+
+def test_breaker_opens_and_route_skips_model(clock):
+    health = _registry()
+    for _ in range(3):
+        health.record_failure("a", 1.0)
+
+    assert health.snapshot(["a"])["a"]["state"] == OPEN
+    assert health.route(["a", "b"]) == ["b"]
+
+
+def test_half_open_allows_single_probe_then_closes(clock):
+    health = _registry()
+    for _ in range(3):
+        health.record_failure("a", 1.0)
+
+    clock[0] += 31
+    assert health.route(["a", "b"]) == ["a", "b"]
+    # A concurrent request while the probe is in flight still skips "a"
+    assert health.route(["a", "b"]) == ["b"]
+
+    health.record_success("a", 0.2)
+    assert health.snapshot(["a"])["a"]["state"] == CLOSED
+    assert health.route(["a", "b"]) == ["a", "b"]
+
+
+def test_failed_probe_reopens(clock):
+    health = _registry()
+    for _ in range(3):
+        health.record_failure("a", 1.0)
+    clock[0] += 31
+    health.route(["a"])
+    health.record_failure("a", 1.0)
+
+    assert health.snapshot(["a"])["a"]["state"] == OPEN
+    assert health.route(["a", "b"]) == ["b"]
+
+
+def test_route_prefers_lowest_p95(clock):
+    health = _registry()
+    for _ in range(3):
+        health.record_success("slow", 4.0)
+        health.record_success("fast", 0.5)
+
+    # Models without enough samples are scored at the average p95
+    assert health.route(["slow", "fast", "unknown"]) == ["fast", "unknown", "slow"]
+
+
+def test_all_open_still_returns_a_model(clock):
+    health = _registry()
+    for model in ("a", "b"):
+        for _ in range(3):
+            health.record_failure(model, 1.0)
+            clock[0] += 1
+
+    assert health.route(["a", "b"]) == ["a"]
+
+
+def test_client_stops_calling_degraded_primary(monkeypatch, settings):
+    settings.GEMINI_ROUTING = {"MIN_SAMPLES": 2, "ERROR_THRESHOLD": 0.5, "OPEN_SECONDS": 60}
+    calls = []
+
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        if model == gemini_client.DEFAULT_MODEL:
+            raise Exception("503 Service Unavailable")
+        return SimpleNamespace(text='{"severity":"Mild"}')
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    client = gemini_client.GeminiClient(api_key="fake")
+
+    for _ in range(2):
+        client._request_with_retry("prompt")
+    calls.clear()
+
+    client._request_with_retry("prompt")
+    assert gemini_client.DEFAULT_MODEL not in calls
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from carelink.common.services import gemini_client
+from carelink.common.services.conversation_store import Conversation
+from carelink.common.services.gemini_client import SYSTEM_INSTRUCTIONS, GeminiClient
+from carelink.common.services.prompt_budget import estimate_tokens, truncate_middle
+
+CONTEXT = {"age": 40, "allergies": "penicillin " * 20, "medical_history": "asthma " * 40}
+
+
+def test_prompt_report_counts_each_section(settings):
+    settings.GEMINI_PROMPT_MAX_TOKENS = 5000
+    report = GeminiClient(api_key=None).prompt_report("sore throat", CONTEXT)
+
+    assert set(report["sections"]) == {"system", "patient_context", "symptoms", "response_format"}
+    assert report["sections"]["system"]["tokens"] == estimate_tokens(SYSTEM_INSTRUCTIONS + "\n\n")
+    assert report["tokens"] == sum(s["tokens"] for s in report["sections"].values())
+    assert report["compacted"] == []
+
+
+def test_context_fields_are_trimmed_before_symptoms(settings):
+    client = GeminiClient(api_key=None)
+    full = client.prompt_report("sore throat", CONTEXT)
+    settings.GEMINI_PROMPT_MAX_TOKENS = full["tokens"] - 40
+
+    report = client.prompt_report("sore throat", CONTEXT)
+    assert report["compacted"] == ["medical_history"]
+    assert report["tokens"] <= report["budget_tokens"]
+
+    settings.GEMINI_PROMPT_MAX_TOKENS = full["tokens"] - 40 + 10
+    long_symptoms = "pain " * 400
+    prompt = client._build_prompt(long_symptoms, CONTEXT)
+    report = client.prompt_report(long_symptoms, CONTEXT)
+    assert report["compacted"][-1] == "symptoms"
+    assert report["tokens"] <= report["budget_tokens"]
+    assert "[…]" in prompt
+
+
+def test_legacy_prompt_relies_on_native_system_instruction():
+    client = GeminiClient(api_key=None)
+    client.transport._api_variant = "legacy"
+
+    prompt = client._build_prompt("cough", {})
+    assert SYSTEM_INSTRUCTIONS not in prompt
+    assert "RESPONSE_FORMAT" not in prompt
+    assert "PATIENT_SYMPTOM_DESCRIPTION:\ncough" in prompt
+
+
+def test_repair_sends_malformed_output_not_original_prompt(monkeypatch):
+    sent = []
+
+    def generate_content(model=None, contents=None):
+        sent.append(contents[0]["parts"][0]["text"])
+        if len(sent) == 1:
+            return SimpleNamespace(text="Severity is mild; the summary was cut off")
+        return SimpleNamespace(text='{"severity":"Mild","summary":"fixed"}')
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    result = GeminiClient(api_key="fake").generate_triage("itchy eyes", {})
+
+    assert result["summary"] == "fixed"
+    assert "MALFORMED_OUTPUT" in sent[1]
+    assert "cut off" in sent[1]
+    assert "PATIENT_CONTEXT" not in sent[1]
+
+
+def test_conversation_trims_older_turns_to_fit():
+    conversation = Conversation(1, "s", recent_turns=3, digest_chars=500)
+    for turn in range(6):
+        conversation.add_turn(f"message {turn} " + "y" * 50)
+
+    full = conversation.prompt_text("latest")
+    assert "EARLIER_DETAILS" in full
+
+    trimmed = conversation.prompt_text("latest", max_chars=len(full) - 100)
+    assert "EARLIER_DETAILS" not in trimmed
+    assert trimmed.startswith("INITIAL_COMPLAINT: message 0")
+
+    tight = conversation.prompt_text("latest", max_chars=150)
+    assert "RECENT_MESSAGES" not in tight
+    assert tight.endswith("NEW_MESSAGE: latest")
+
+
+def test_truncate_middle_keeps_both_ends():
+    text = "start " + "x" * 100 + " end"
+    short = truncate_middle(text, 30)
+    assert len(short) == 30
+    assert short.startswith("start") and short.endswith("end")
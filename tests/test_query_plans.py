@@ -0,0 +1,188 @@
+"""
+Query plan regression tests for the hot views.
+
+Each view is requested with a little data in place, every SELECT it runs is
+captured, and the database is asked how it would execute it. A plan that
+reads a whole table row by row (SQLite ``SCAN t``, PostgreSQL ``Seq Scan``)
+fails the test, as does a sort the dashboards' keyset queries should get
+from an index.
+"""
+
+import datetime
+import json
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+
+from appointments.models import Appointment
+from profiles.models import PatientProfile
+from triage.models import TriageInteraction
+from triage.pagination import encode_cursor
+
+# SQLite: "SCAN t", optionally "USING [COVERING] INDEX i". Aliased tables
+# show up under Django's alias (U0, T3); other names are subqueries
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$")
+_DJANGO_ALIAS = re.compile(r"^[A-Z]\d+$")
+
+
+def _explain(sql, params):
+    """The plan of one query as a list of lines."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[3] for row in cursor.fetchall()]
+        if connection.vendor == "postgresql":
+            # Tiny test tables are always cheaper to scan; ask what the
+            # planner can do with indexes instead
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    pytest.skip(f"No query plan check for {connection.vendor}")
+
+
+def full_scans(sql, plan):
+    """
+    Tables a plan reads in full. Walking a whole index is accepted only for
+    a LIMITed query, which stops early, or an aggregate over the whole table.
+    """
+    if connection.vendor == "sqlite":
+        tables = set(connection.introspection.table_names())
+        whole_index_ok = " WHERE " not in sql or " LIMIT " in sql
+        scans = []
+        for line in plan:
+            match = _SQLITE_SCAN.match(line)
+            if not match or not (match.group(1) in tables or _DJANGO_ALIAS.match(match.group(1))):
+                continue
+            if "INDEX" not in line or not whole_index_ok:
+                scans.append(match.group(1))
+        return scans
+    # PostgreSQL still reports a seq scan when no index can be used at all
+    return re.findall(r"Seq Scan on (\w+)", "\n".join(plan))
+
+
+def capture_plans(client, url, method="get", **kwargs):
+    """Request ``url`` and return ``(sql, plan)`` for each SELECT it ran."""
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        response = getattr(client, method)(url, **kwargs)
+    assert response.status_code == 200, url
+    return [
+        (sql, _explain(sql, params))
+        for sql, params in queries
+        if sql.lstrip().upper().startswith("SELECT")
+    ]
+
+
+def _user(username, role="patient", **extra):
+    user = User.objects.create_user(username, password="pass12345", **extra)
+    PatientProfile.objects.update_or_create(
+        user=user, defaults={"role": role, "onboarding_completed": True}
+    )
+    return user
+
+
+@pytest.fixture
+def data(db):
+    doctor = _user("doc", role="doctor", is_staff=True)
+    patient = _user("pat")
+    for n, severity in enumerate(["Mild", "Severe", "Critical", "Moderate"]):
+        TriageInteraction.objects.create(
+            user=patient,
+            session_id=f"s-{n}",
+            symptoms_text="cough",
+            severity=severity,
+            result={"summary": "ok"},
+            assigned_doctor=doctor if n % 2 else None,
+        )
+        Appointment.objects.create(
+            patient=patient,
+            doctor=doctor,
+            appointment_date=datetime.date(2030, 1, 1 + n),
+            appointment_time=datetime.time(9 + n),
+            status="confirmed" if n % 2 else "pending",
+        )
+    return {"doctor": doctor, "patient": patient}
+
+
+DOCTOR_PAGES = [
+    ("doctors:index", {}),
+    ("doctors:triage_feed", {}),
+    ("triage:admin_dashboard", {}),
+    ("triage:admin_dashboard", {"severity": "Critical"}),
+    ("appointments:doctor_appointments", {}),
+]
+PATIENT_PAGES = [
+    ("home:index", {}),
+    ("triage:history", {}),
+    ("appointments:index", {}),
+]
+
+
+def _assert_no_full_scans(plans):
+    for sql, plan in plans:
+        assert not full_scans(sql, plan), f"Full table scan:\n{sql}\n{plan}"
+
+
+@pytest.mark.parametrize("name, query", DOCTOR_PAGES)
+def test_doctor_pages_use_indexes(client, data, name, query):
+    client.login(username="doc", password="pass12345")
+    _assert_no_full_scans(capture_plans(client, reverse(name), data=query))
+
+
+@pytest.mark.parametrize("name, query", PATIENT_PAGES)
+def test_patient_pages_use_indexes(client, data, name, query):
+    client.login(username="pat", password="pass12345")
+    _assert_no_full_scans(capture_plans(client, reverse(name), data=query))
+
+
+def test_chat_api_finds_the_session_by_index(client, data, monkeypatch):
+    from carelink.common.services import gemini_client
+
+    monkeypatch.setattr(
+        gemini_client.GeminiClient,
+        "generate_triage",
+        lambda self, s, patient_context=None, **kwargs: {
+            "severity": "Mild",
+            "summary": "Cold",
+            "advice": "Rest",
+            "red_flags": [],
+            "differential": [],
+            "rationale": "ok",
+        },
+    )
+    client.login(username="pat", password="pass12345")
+
+    plans = capture_plans(
+        client,
+        reverse("triage:chat_api"),
+        method="post",
+        data=json.dumps({"symptoms": "still coughing", "session_id": "s-1"}),
+        content_type="application/json",
+    )
+
+    _assert_no_full_scans(plans)
+    if connection.vendor == "sqlite":
+        lookups = [plan for sql, plan in plans if '"session_id" =' in sql]
+        assert lookups and "triage_user_session_idx" in " ".join(lookups[0])
+
+
+def test_keyset_pages_are_read_in_index_order(client, data):
+    """Later pages seek into the index instead of sorting the table."""
+    client.login(username="doc", password="pass12345")
+    cursor = encode_cursor(TriageInteraction.objects.by_severity()[1])
+
+    for name in ("doctors:triage_feed", "triage:admin_dashboard", "doctors:index"):
+        plans = capture_plans(client, reverse(name), data={"after": cursor})
+        pages = [plan for sql, plan in plans if "ORDER BY" in sql and "LIMIT" in sql]
+        assert pages, name
+        for plan in pages:
+            assert not any("TEMP B-TREE FOR ORDER BY" in line for line in plan), plan
+            assert not any(line.lstrip("-> ").startswith("Sort") for line in plan), plan
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from carelink.common.services import rate_limit
+from carelink.common.services.rate_limit import Bucket, RateLimiter, get_rate_limiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit.time, "time", lambda: now[0])
+    return now
+
+
+def _limiter(**buckets):
+    return RateLimiter("test", {name: Bucket(*spec) for name, spec in buckets.items()})
+
+
+def test_bucket_allows_burst_then_refills(clock):
+    limiter = _limiter(user=(3, 1.0))  # 3 tokens, one per second
+
+    assert all(limiter.hit(user=1).allowed for _ in range(3))
+    rejected = limiter.hit(user=1)
+    assert not rejected.allowed
+    assert rejected.bucket == "user"
+    assert rejected.retry_after == pytest.approx(1.0)
+
+    clock[0] += 1.0
+    assert limiter.hit(user=1).allowed
+    assert not limiter.hit(user=1).allowed
+
+
+def test_buckets_are_per_identity_and_global_is_shared(clock):
+    limiter = _limiter(user=(2, 1.0), **{"global": (3, 1.0)})
+
+    assert limiter.hit(user=1).allowed
+    assert limiter.hit(user=1).allowed
+    assert not limiter.hit(user=1).allowed  # user bucket empty
+    assert limiter.hit(user=2).allowed  # global still has one token
+    decision = limiter.hit(user=3)
+    assert not decision.allowed and decision.bucket == "global"
+    assert limiter.stats()["rejections"] == {"user": 1, "global": 1}
+
+
+def test_rejected_request_does_not_consume_tokens(clock):
+    limiter = _limiter(user=(1, 1.0), ip=(5, 1.0))
+    assert limiter.hit(user=1, ip="a").allowed
+    for _ in range(3):
+        assert not limiter.hit(user=1, ip="a").allowed
+    # Only one token was taken from the ip bucket, so user 2 still has four
+    assert all(limiter.hit(user=2 + i, ip="a").allowed for i in range(4))
+
+
+def test_one_batched_read_per_check(clock, monkeypatch):
+    limiter = _limiter(user=(1, 1.0), ip=(5, 1.0), **{"global": (5, 1.0)})
+    calls = []
+    cache = limiter._cache
+    for name in ("get_many", "set_many"):
+        original = getattr(cache, name)
+        monkeypatch.setattr(
+            cache, name, lambda *a, _n=name, _o=original, **kw: calls.append(_n) or _o(*a, **kw)
+        )
+
+    assert limiter.hit(user=1, ip="10.0.0.1").allowed
+    assert calls == ["get_many", "set_many"]
+    calls.clear()
+    # A rejected request only reads
+    assert not limiter.hit(user=1, ip="10.0.0.1").allowed
+    assert calls == ["get_many"]
+
+
+def test_async_hit_matches_sync(clock):
+    limiter = _limiter(user=(1, 1.0))
+    assert asyncio.run(limiter.ahit(user=1)).allowed
+    assert not asyncio.run(limiter.ahit(user=1)).allowed
+
+
+def test_wait_sleeps_until_token_or_gives_up(clock, monkeypatch):
+    limiter = _limiter(**{"global": (1, 0.5)})  # one call every two seconds
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(rate_limit.time, "sleep", sleep)
+    assert limiter.wait(timeout=5)
+    assert limiter.wait(timeout=5)
+    assert slept == [pytest.approx(2.0)]
+    assert not limiter.wait(timeout=0.5)
+
+
+@pytest.mark.django_db
+def test_chat_api_returns_429_with_retry_after(client, monkeypatch, settings):
+    settings.RATE_LIMITS = {
+        "SCOPES": {"chat_api": {"user": {"CAPACITY": 2, "REFILL_PER_MINUTE": 6}}},
+    }
+    User.objects.create_user("alice", password="pass12345")
+    client.login(username="alice", password="pass12345")
+
+    from carelink.common.services import gemini_client
+
+    monkeypatch.setattr(
+        gemini_client.GeminiClient,
+        "generate_triage",
+        lambda self, s, patient_context=None, **kwargs: {"severity": "Mild", "summary": "ok"},
+    )
+
+    def post():
+        return client.post(
+            reverse("triage:chat_api"),
+            json.dumps({"symptoms": "cough"}),
+            content_type="application/json",
+        )
+
+    assert post().status_code == 200
+    assert post().status_code == 200
+    r = post()
+    assert r.status_code == 429
+    assert r["Retry-After"] == "10"
+    assert json.loads(r.content)["success"] is False
+    assert get_rate_limiter("chat_api").stats()["rejections"] == {"user": 1}
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+from profiles.models import PatientProfile
+from triage.management.commands.retriage import confusion_matrix
+from triage.models import TriageInteraction, TriageMessage, TriageRescore
+
+
+@pytest.fixture
+def interactions(db):
+    user = User.objects.create_user("jane", password="pass12345")
+    PatientProfile.objects.create(user=user, age=70)
+    rows = []
+    for text, severity in [
+        ("runny nose", "Mild"),
+        ("crushing chest pain", "Severe"),
+        ("rash on my arm", "Moderate"),
+    ]:
+        interaction = TriageInteraction.objects.create(
+            user=user, symptoms_text=text, severity=severity
+        )
+        TriageMessage.objects.create(interaction=interaction, role="user", text=text)
+        rows.append(interaction)
+    return rows
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    from carelink.common.services import gemini_client
+
+    calls = []
+
+    def generate(self, s, patient_context=None, **kwargs):
+        calls.append((s, patient_context))
+        if "rash" in s:
+            raise RuntimeError("Gemini error: 503 UNAVAILABLE")
+        return {"severity": "Critical" if "chest" in s else "Mild", "summary": "ok"}
+
+    monkeypatch.setattr(gemini_client.GeminiClient, "generate_triage", generate)
+    return calls
+
+
+def retriage(*args):
+    out = io.StringIO()
+    call_command("retriage", "--workers", "2", "--chunk-size", "2", *args, stdout=out)
+    return out.getvalue()
+
+
+def test_confusion_matrix_lays_out_old_by_new():
+    table = confusion_matrix({("Mild", "Mild"): 3, ("Severe", "Critical"): 1})
+    header, mild, severe = table.splitlines()
+    assert header.split()[-2:] == ["Mild", "Critical"]
+    assert mild.split() == ["Mild", "3", "0"]
+    assert severe.split() == ["Severe", "0", "1"]
+
+
+def test_dry_run_reports_drift_without_saving(interactions):
+    out = retriage("--engine", "rules", "--dry-run")
+
+    assert TriageRescore.objects.count() == 0
+    # Rules call the chest pain Critical and raise the rest for a 70-year-old
+    assert "3 scored, 3 changed severity, 0 failed (dry run" in out
+    assert out.splitlines()[2].split() == ["old", "\\", "new", "Moderate", "Severe", "Critical"]
+
+
+def test_run_saves_rescores_and_records_failures(interactions, fake_gemini):
+    out = retriage("--run", "v3")
+
+    rescores = {r.interaction.symptoms_text: r for r in TriageRescore.objects.filter(run="v3")}
+    assert rescores["crushing chest pain"].new_severity == "Critical"
+    assert rescores["crushing chest pain"].old_severity == "Severe"
+    assert rescores["rash on my arm"].new_severity is None
+    assert "503" in rescores["rash on my arm"].error
+    assert fake_gemini[0][1]["age"] == 70
+    assert "3 scored, 1 changed severity, 1 failed" in out
+    # Interactions themselves are not touched
+    assert TriageInteraction.objects.get(pk=interactions[1].pk).severity == "Severe"
+
+
+def test_run_resumes_after_checkpoint(interactions, fake_gemini):
+    TriageRescore.objects.create(
+        run="v3", interaction=interactions[0], old_severity="Mild", new_severity="Mild"
+    )
+    TriageRescore.objects.create(
+        run="v3", interaction=interactions[1], old_severity="Severe", new_severity="Critical"
+    )
+
+    out = retriage("--run", "v3")
+
+    assert [s for s, _ctx in fake_gemini] == ["rash on my arm"]
+    assert "Resuming run 'v3' after interaction" in out
+    # The summary covers the whole run, not just this invocation
+    assert "3 scored" in out
+
+    retriage("--run", "v3", "--restart")
+    assert len(fake_gemini) == 4
+    assert TriageRescore.objects.filter(run="v3").count() == 3
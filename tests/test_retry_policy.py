@@ -0,0 +1,143 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from carelink.common.services import gemini_client
+from carelink.common.services.retry_policy import (
+    FATAL,
+    MODEL,
+    TRANSIENT,
+    Deadline,
+    DeadlineExceeded,
+    RetryPolicy,
+    classify_error,
+)
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class NotFound(Exception):
+    pass
+
+
+class APIError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+@pytest.mark.parametrize(
+    "exc, kind",
+    [
+        (ServiceUnavailable("busy"), TRANSIENT),
+        (NotFound("no such model"), MODEL),
+        (APIError(401, "API key not valid"), FATAL),
+        (APIError(429, "RESOURCE_EXHAUSTED"), TRANSIENT),
+        (APIError(404, "models/x is not found"), MODEL),
+        (Exception("503 UNAVAILABLE"), TRANSIENT),
+        (TimeoutError(), TRANSIENT),
+        (Exception("something odd"), TRANSIENT),
+        (DeadlineExceeded("out of time"), FATAL),
+    ],
+)
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def test_backoff_is_exponential_with_full_jitter():
+    policy = RetryPolicy(base_delay=0.5, max_delay=3.0)
+    for attempt, ceiling in enumerate([0.5, 1.0, 2.0, 3.0, 3.0]):
+        delays = [policy.backoff(attempt) for _ in range(50)]
+        assert all(0 <= d <= ceiling for d in delays)
+
+
+def test_deadline_for_endpoint_uses_settings(settings):
+    settings.TRIAGE_DEADLINES = {"default": 5, "chat_stream": 30}
+    assert Deadline.for_endpoint("chat_stream").seconds == 30
+    assert Deadline.for_endpoint("chat_api").seconds == 5
+    assert Deadline(None).remaining() is None
+
+
+def _sdk(monkeypatch, handler):
+    calls = []
+
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        return SimpleNamespace(text=handler(model))
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    return calls
+
+
+def test_fatal_error_stops_without_trying_other_models(monkeypatch):
+    def handler(model):
+        raise APIError(403, "PERMISSION_DENIED")
+
+    calls = _sdk(monkeypatch, handler)
+    with pytest.raises(RuntimeError, match="403"):
+        gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+    assert len(calls) == 1
+
+
+def test_missing_model_is_not_retried_in_the_next_sweep(monkeypatch, settings):
+    settings.GEMINI_RETRY = {"SWEEPS": 2, "BASE_DELAY": 0}
+
+    def handler(model):
+        if model == gemini_client.DEFAULT_MODEL:
+            raise NotFound("gone")
+        raise ServiceUnavailable("busy")
+
+    calls = _sdk(monkeypatch, handler)
+    with pytest.raises(RuntimeError):
+        gemini_client.GeminiClient(api_key="fake").generate_triage("cough", {})
+    assert calls.count(gemini_client.DEFAULT_MODEL) == 1
+    assert calls.count(gemini_client.FALLBACK_MODELS[0]) == 2
+
+
+def test_exhausted_budget_fails_fast(monkeypatch, settings):
+    settings.GEMINI_RETRY = {"SWEEPS": 2, "BASE_DELAY": 30, "MAX_DELAY": 30}
+    slept = []
+    monkeypatch.setattr(gemini_client.time, "sleep", slept.append)
+
+    def handler(model):
+        raise ServiceUnavailable("busy")
+
+    calls = _sdk(monkeypatch, handler)
+    client = gemini_client.GeminiClient(api_key="fake")
+
+    with pytest.raises(DeadlineExceeded):
+        client.generate_triage("cough", {}, deadline=Deadline(0))
+    assert calls == []
+
+    # The backoff before the second sweep does not fit in the budget
+    with pytest.raises(RuntimeError):
+        client.generate_triage("cough", {}, deadline=Deadline(0.5))
+    assert slept == [] or slept[0] < 0.5
+
+
+def test_async_call_is_cancelled_at_the_deadline(monkeypatch):
+    async def generate_content(model=None, contents=None):
+        await asyncio.sleep(5)
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)),
+            models=SimpleNamespace(),
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    client = gemini_client.GeminiClient(api_key="fake")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(client.agenerate_triage("cough", {}, deadline=Deadline(0.1)))
+    assert time.monotonic() - started < 2
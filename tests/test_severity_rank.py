@@ -0,0 +1,116 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.db.models import F, Value
+from django.urls import reverse
+
+from profiles.models import PatientProfile
+from triage.models import TriageInteraction
+from triage.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def patient(db):
+    return User.objects.create_user("patient", password="pass12345")
+
+
+def _rank(interaction):
+    return TriageInteraction.objects.values_list("severity_rank", flat=True).get(pk=interaction.pk)
+
+
+def test_rank_follows_severity_on_save(patient):
+    interaction = TriageInteraction.objects.create(user=patient, symptoms_text="a", severity="Mild")
+    assert _rank(interaction) == 1
+
+    interaction.severity = "Critical"
+    interaction.save(update_fields=["severity", "updated_at"])
+    assert _rank(interaction) == 4
+
+    interaction.severity = None
+    interaction.save()
+    assert _rank(interaction) == 0
+
+
+def test_rank_follows_severity_on_bulk_writes(patient):
+    rows = TriageInteraction.objects.bulk_create(
+        [TriageInteraction(user=patient, symptoms_text="a", severity="Severe") for _ in range(3)]
+    )
+    assert {_rank(r) for r in rows} == {3}
+
+    TriageInteraction.objects.filter(pk=rows[0].pk).update(severity="Moderate")
+    assert _rank(rows[0]) == 2
+
+    rows[1].severity = "Critical"
+    TriageInteraction.objects.bulk_update([rows[1]], ["severity"])
+    assert _rank(rows[1]) == 4
+
+    # An expression is ranked in SQL
+    TriageInteraction.objects.filter(pk=rows[2].pk).update(severity=Value("Mild"))
+    assert _rank(rows[2]) == 1
+    TriageInteraction.objects.update(severity=F("severity"))
+    assert [_rank(r) for r in rows] == [2, 4, 1]
+
+
+def test_keyset_pages_cover_every_row_once(patient):
+    severities = ["Mild", "Critical", "Severe", None, "Moderate"] * 5
+    for severity in severities:
+        TriageInteraction.objects.create(user=patient, symptoms_text="a", severity=severity)
+    expected = list(TriageInteraction.objects.order_by("-severity_rank", "-updated_at", "-id"))
+
+    seen, after = [], None
+    while True:
+        page = keyset_page(TriageInteraction.objects.all(), after=after, size=4)
+        seen.extend(page.items)
+        if not page.has_next:
+            break
+        after = page.next_cursor
+
+    assert seen == expected
+    assert [i.severity for i in seen[:5]] == ["Critical"] * 5
+
+
+def test_cursor_round_trip_and_malformed_cursor(patient):
+    interaction = TriageInteraction.objects.create(user=patient, symptoms_text="a", severity="Mild")
+
+    assert decode_cursor(encode_cursor(interaction)) == (
+        1,
+        interaction.updated_at,
+        interaction.pk,
+    )
+    assert decode_cursor("not a cursor") is None
+    # A malformed cursor falls back to the first page
+    assert keyset_page(TriageInteraction.objects.all(), after="???").items == [interaction]
+
+
+def test_admin_dashboard_links_to_next_page(client, patient, monkeypatch):
+    monkeypatch.setattr("triage.pagination.DEFAULT_PAGE_SIZE", 2)
+    for n in range(3):
+        TriageInteraction.objects.create(user=patient, symptoms_text=f"case {n}", severity="Mild")
+    User.objects.create_user("doc", password="pass12345", is_staff=True)
+    client.login(username="doc", password="pass12345")
+
+    first = client.get(reverse("triage:admin_dashboard"))
+    page = first.context["page"]
+    second = client.get(reverse("triage:admin_dashboard"), {"after": page.next_cursor})
+
+    assert len(first.context["interactions"]) == 2 and page.has_next
+    assert "after=" in first.content.decode()
+    assert [i.symptoms_text for i in second.context["interactions"]] == ["case 0"]
+    assert not second.context["page"].has_next
+
+
+def test_triage_feed_returns_next_cursor(client, patient):
+    for _ in range(21):
+        TriageInteraction.objects.create(user=patient, symptoms_text="a", severity="Mild")
+    doctor = User.objects.create_user("doc", password="pass12345")
+    PatientProfile.objects.update_or_create(user=doctor, defaults={"role": "doctor"})
+    client.login(username="doc", password="pass12345")
+
+    data = json.loads(client.get(reverse("doctors:triage_feed")).content)
+    rest = json.loads(
+        client.get(reverse("doctors:triage_feed"), {"after": data["next_cursor"]}).content
+    )
+
+    assert len(data["interactions"]) == 20
+    assert len(rest["interactions"]) == 1 and rest["next_cursor"] is None
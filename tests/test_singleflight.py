@@ -0,0 +1,174 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+
+from carelink.common.services import gemini_client
+from carelink.common.services.singleflight import SingleFlight, get_singleflight
+from carelink.common.services.triage_cache import LocalLRUBackend, TriageCache
+
+VALID = (
+    '{"severity":"Mild","summary":"Sore throat","advice":"Rest",'
+    '"red_flags":[],"differential":["Pharyngitis"],"rationale":"ok"}'
+)
+
+
+def _run_concurrently(n, target):
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(target) for _ in range(n)]
+        return [f.result(timeout=5) for f in futures]
+
+
+def _gated(flight, key, release, calls):
+    """Callers of a do() whose fn blocks until ``release`` is set."""
+
+    def fn():
+        calls.append(1)
+        assert release.wait(5)
+        return {"severity": "Mild"}
+
+    def target():
+        return flight.do(key, fn)
+
+    return target
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release, calls = threading.Event(), []
+    target = _gated(flight, "k", release, calls)
+
+    def releaser():
+        # Wait until all four callers are inside do() before letting the leader finish
+        while flight.stats.snapshot()["coalesced"] < 3:
+            threading.Event().wait(0.01)
+        release.set()
+
+    threading.Thread(target=releaser).start()
+    results = _run_concurrently(4, target)
+
+    assert len(calls) == 1
+    assert results == [{"severity": "Mild"}] * 4
+    # Followers get copies, not the leader's dict
+    assert len({id(r) for r in results}) == 4
+    stats = flight.stats.snapshot()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 3
+    assert stats["coalesce_rate"] == 0.75
+
+
+def test_leader_error_reaches_followers_and_key_is_released():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        assert release.wait(5)
+        raise RuntimeError("Gemini error: boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", failing)
+        assert started.wait(5)
+        follower = pool.submit(flight.do, "k", lambda: "unused")
+        while flight.stats.snapshot()["coalesced"] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="boom"):
+                future.result(timeout=5)
+
+    # A later call with the same key runs again
+    assert flight.do("k", lambda: "fresh") == "fresh"
+
+
+def test_disabled_singleflight_calls_every_time():
+    flight = SingleFlight({"ENABLED": False})
+    calls = []
+    for _ in range(3):
+        flight.do("k", lambda: calls.append(1))
+    assert len(calls) == 3
+    assert flight.stats.snapshot()["leaders"] == 0
+
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"severity": "Severe"}
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", fn) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r == {"severity": "Severe"} for r in results)
+    assert flight.stats.snapshot()["coalesced"] == 4
+
+
+def test_lease_waiter_uses_result_from_other_worker():
+    flight = SingleFlight({"LEASE": True, "POLL_SECONDS": 0.01})
+    cache.add(flight.lease_prefix + "k", "other-worker", timeout=30)
+    polls = []
+
+    def lookup():
+        polls.append(1)
+        return {"severity": "Mild", "cached": True} if len(polls) >= 3 else None
+
+    result = flight.do("k", lambda: pytest.fail("should not call upstream"), lookup=lookup)
+
+    assert result == {"severity": "Mild", "cached": True}
+    stats = flight.stats.snapshot()
+    assert stats["lease_waits"] == 1 and stats["lease_hits"] == 1
+
+
+def test_lease_waiter_calls_upstream_when_lease_released_without_result():
+    flight = SingleFlight({"LEASE": True, "POLL_SECONDS": 0.01})
+    lease_key = flight.lease_prefix + "k"
+    cache.add(lease_key, "other-worker", timeout=30)
+
+    def lookup():
+        cache.delete(lease_key)  # the other worker failed and let go
+        return None
+
+    assert flight.do("k", lambda: "own", lookup=lookup) == "own"
+    assert flight.stats.snapshot()["lease_hits"] == 0
+
+
+def test_leader_releases_its_lease():
+    flight = SingleFlight({"LEASE": True})
+    flight.do("k", lambda: "done", lookup=lambda: None)
+    assert cache.get(flight.lease_prefix + "k") is None
+
+
+def test_generate_triage_coalesces_identical_prompts(monkeypatch):
+    release, calls = threading.Event(), []
+
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        assert release.wait(5)
+        return SimpleNamespace(text=VALID)
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    client = gemini_client.GeminiClient(api_key="fake", cache=TriageCache(LocalLRUBackend()))
+    flight = get_singleflight()
+
+    def releaser():
+        while flight.stats.snapshot()["coalesced"] < 2:
+            threading.Event().wait(0.01)
+        release.set()
+
+    threading.Thread(target=releaser).start()
+    results = _run_concurrently(3, lambda: client.generate_triage("sore throat"))
+
+    assert len(calls) == 1
+    assert {r["severity"] for r in results} == {"Mild"}
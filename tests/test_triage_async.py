@@ -0,0 +1,106 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from triage.models import TriageInteraction
+
+
+class FakeResp:
+    def __init__(self, text):
+        self.text = text
+
+
+def _fake_async_sdk(responses):
+    """Build a stand-in for ``google.genai`` whose aio client replays ``responses``."""
+    calls = []
+
+    async def generate_content(model=None, contents=None):
+        calls.append(model)
+        item = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(item, Exception):
+            raise item
+        return FakeResp(item)
+
+    def make_client(api_key=None):
+        aio = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+        return SimpleNamespace(aio=aio, models=SimpleNamespace())
+
+    return SimpleNamespace(Client=make_client), calls
+
+
+VALID = (
+    '{"severity":"Severe","summary":"Async","advice":"See doctor",'
+    '"red_flags":[],"differential":[],"rationale":"ok"}'
+)
+
+
+def test_agenerate_triage_falls_back_and_retries(monkeypatch):
+    from carelink.common.services import gemini_client
+
+    sdk, calls = _fake_async_sdk([Exception("Transient")] * 5 + [VALID])
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    slept = []
+
+    async def fake_sleep(delay):
+        slept.append(delay)
+
+    monkeypatch.setattr(gemini_client.asyncio, "sleep", fake_sleep)
+
+    client = gemini_client.GeminiClient(api_key="fake")
+    result = asyncio.run(client.agenerate_triage("chest pain", patient_context={}))
+
+    assert result["severity"] == "Severe"
+    assert result["summary"] == "Async"
+    # Every model failed once, then the second sweep succeeded on the primary
+    assert len(calls) == 6
+    assert calls[0] == gemini_client.DEFAULT_MODEL
+    # One jittered exponential backoff between the two sweeps
+    assert len(slept) == 1 and 0 <= slept[0] <= 0.5
+
+
+def test_agenerate_triage_requires_configuration():
+    from carelink.common.services.gemini_client import GeminiClient
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(GeminiClient(api_key=None).agenerate_triage("cough"))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_chat_api_persists_interaction(client, monkeypatch, settings):
+    User.objects.create_user("ada", password="pass12345")
+    client.login(username="ada", password="pass12345")
+    settings.GEMINI_API_KEY = "fake"
+    settings.TRIAGE_RULES = {"PRESCREEN": False}
+
+    from carelink.common.services import gemini_client
+
+    sdk, _calls = _fake_async_sdk([VALID])
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+
+    r = client.post(
+        reverse("triage:chat_api_async"),
+        json.dumps({"symptoms": "chest pain", "session_id": "s-async"}),
+        content_type="application/json",
+    )
+    assert r.status_code == 200
+    data = json.loads(r.content)
+    assert data["success"] is True
+    assert data["result"]["summary"] == "Async"
+
+    interaction = TriageInteraction.objects.get(session_id="s-async")
+    assert interaction.severity == "Severe"
+    assert interaction.symptoms_text == "chest pain"
+
+
+@pytest.mark.django_db
+def test_async_chat_api_requires_login(client):
+    r = client.post(
+        reverse("triage:chat_api_async"),
+        json.dumps({"symptoms": "cough"}),
+        content_type="application/json",
+    )
+    assert r.status_code == 302
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from carelink.common.services import gemini_client
+from carelink.common.services.triage_cache import (
+    LocalLRUBackend,
+    TriageCache,
+    build_triage_cache,
+    make_cache_key,
+)
+
+VALID = (
+    '{"severity":"Mild","summary":"Sore throat","advice":"Rest",'
+    '"red_flags":[],"differential":["Pharyngitis"],"rationale":"ok"}'
+)
+
+
+def _counting_sdk(text):
+    calls = []
+
+    def generate_content(model=None, contents=None):
+        calls.append(model)
+        return SimpleNamespace(text=text)
+
+    sdk = SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content=generate_content)
+        )
+    )
+    return sdk, calls
+
+
+def test_cache_key_normalizes_whitespace_and_case():
+    a = make_cache_key("Fever and   sore throat\n", "m", "1")
+    b = make_cache_key("fever and sore throat", "m", "1")
+    assert a == b
+    assert a != make_cache_key("fever and sore throat", "other-model", "1")
+    assert a != make_cache_key("fever and sore throat", "m", "2")
+
+
+def test_local_backend_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("carelink.common.services.triage_cache.time.monotonic", lambda: now[0])
+    backend = LocalLRUBackend(ttl=10, max_entries=2)
+
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1  # "a" is now most recently used
+    backend.set("c", 3)
+    assert backend.get("b") is None
+    assert backend.evictions == 1
+
+    now[0] += 11
+    assert backend.get("a") is None
+
+
+def test_generate_triage_serves_repeat_prompt_from_cache(monkeypatch):
+    sdk, calls = _counting_sdk(VALID)
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    cache = TriageCache(LocalLRUBackend())
+    client = gemini_client.GeminiClient(api_key="fake", cache=cache)
+
+    first = client.generate_triage("fever and sore throat", {"age": 30})
+    second = client.generate_triage("Fever and  sore throat", {"age": 30})
+
+    assert len(calls) == 1
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["cached_at"]
+    assert second["summary"] == first["summary"]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_unparseable_output_is_not_cached(monkeypatch):
+    sdk, calls = _counting_sdk("not json at all")
+    monkeypatch.setattr(gemini_client, "genai_new", sdk)
+    monkeypatch.setattr(gemini_client.time, "sleep", lambda s: None)
+    cache = TriageCache(LocalLRUBackend())
+    client = gemini_client.GeminiClient(api_key="fake", cache=cache)
+
+    client.generate_triage("headache")
+    client.generate_triage("headache")
+
+    assert cache.stats()["stores"] == 0
+    assert cache.stats()["hits"] == 0
+
+
+def test_django_backend_round_trip():
+    cache = build_triage_cache({"BACKEND": "django", "TTL": 60})
+    cache.set("k", {"severity": "Mild"})
+    hit = cache.get("k")
+    assert hit["severity"] == "Mild"
+    assert hit["cached"] is True
+
+
+def test_disabled_cache_never_hits(settings):
+    settings.TRIAGE_CACHE = {"ENABLED": False}
+    from carelink.common.services.triage_cache import get_triage_cache
+
+    cache = get_triage_cache()
+    cache.set("k", {"severity": "Mild"})
+    assert cache.get("k") is None
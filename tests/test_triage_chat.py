@@ -29,7 +29,7 @@ def test_triage_chat_post_monkeypatched(client, monkeypatch):
         captured_prompt["text"] = text
         return text
 
-    def fake_generate(self, s, patient_context=None):
+    def fake_generate(self, s, patient_context=None, **kwargs):
         # Ensure prompt is constructed for validation
         _ = self._build_prompt(s, patient_context=patient_context)
         return {
@@ -101,7 +101,7 @@ def test_json_repair_flow(client, monkeypatch, settings):
         def generate_content(self, prompt):
             FakeModel.calls += 1
             if FakeModel.calls == 1:
-                return FakeResp('```json\n{"severity":"Moderate","summary":"X"\n```')
+                return FakeResp("```json\nSeverity: Moderate. Summary: X\n```")
             else:
                 return FakeResp(
                     '{"severity":"Mild","summary":"OK","advice":"Hydrate",'
@@ -118,23 +118,25 @@ def test_json_repair_flow(client, monkeypatch, settings):
             "GNew",
             (),
             {
-                "Client": lambda api_key=None: type(
-                    "C",
-                    (),
-                    {
-                        "models": type(
-                            "M",
-                            (),
-                            {
-                                "generate_content": (
-                                    lambda self=None, model=None, contents=None: (
-                                        FakeModel().generate_content("")
+                "Client": staticmethod(
+                    lambda api_key=None: type(
+                        "C",
+                        (),
+                        {
+                            "models": type(
+                                "M",
+                                (),
+                                {
+                                    "generate_content": (
+                                        lambda self=None, model=None, contents=None: (
+                                            FakeModel().generate_content("")
+                                        )
                                     )
-                                )
-                            },
-                        )()
-                    },
-                )()
+                                },
+                            )()
+                        },
+                    )()
+                )
             },
         )(),
     )
@@ -181,23 +183,25 @@ def test_transient_error_backoff(client, monkeypatch, settings):
             "GNew",
             (),
             {
-                "Client": lambda api_key=None: type(
-                    "C",
-                    (),
-                    {
-                        "models": type(
-                            "M",
-                            (),
-                            {
-                                "generate_content": (
-                                    lambda self=None, model=None, contents=None: (
-                                        FlakyModel().generate_content("")
+                "Client": staticmethod(
+                    lambda api_key=None: type(
+                        "C",
+                        (),
+                        {
+                            "models": type(
+                                "M",
+                                (),
+                                {
+                                    "generate_content": (
+                                        lambda self=None, model=None, contents=None: (
+                                            FlakyModel().generate_content("")
+                                        )
                                     )
-                                )
-                            },
-                        )()
-                    },
-                )()
+                                },
+                            )()
+                        },
+                    )()
+                )
             },
         )(),
     )
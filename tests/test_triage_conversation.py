@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from carelink.common.services.conversation_store import Conversation, get_conversation_store
+from triage.models import TriageInteraction
+
+
+def _result(summary, severity="Moderate"):
+    return {
+        "severity": severity,
+        "summary": summary,
+        "advice": "Rest",
+        "red_flags": [],
+        "differential": [],
+        "rationale": "ok",
+    }
+
+
+def test_prompt_text_stays_bounded_as_conversation_grows():
+    conversation = Conversation(1, "s", recent_turns=2, digest_chars=300)
+    assert conversation.prompt_text("chest pain") == "chest pain"
+
+    for turn in range(40):
+        conversation.add_turn(f"message {turn} " + "x" * 150, _result(f"summary {turn}"))
+
+    prompt = conversation.prompt_text("new detail")
+    assert prompt.startswith("INITIAL_COMPLAINT: message 0")
+    assert prompt.endswith("NEW_MESSAGE: new detail")
+    assert "summary 39" in prompt
+    # Two verbatim recent messages, the capped digest and fixed labels
+    assert len(prompt) < 1200
+    assert "message 38" in prompt and "message 39" in prompt
+    assert "message 5 " not in prompt
+
+
+def test_store_round_trip_and_seed_from_history():
+    store = get_conversation_store()
+    conversation = store.load(1, "abc", seed_history=None)
+    conversation.add_turn("cough", _result("Cold"))
+    store.save(conversation)
+
+    loaded = store.load(1, "abc")
+    assert loaded.turns == 1 and loaded.first == "cough"
+    # Another user's session with the same id is separate
+    assert store.load(2, "abc").turns == 0
+
+    seeded = store.load(
+        3,
+        "old",
+        seed_history=[
+            {"role": "user", "content": "fever"},
+            {"role": "assistant", "content": _result("Flu", "Mild")},
+        ],
+    )
+    assert seeded.first == "fever"
+    assert seeded.assessment["severity"] == "Mild"
+
+
+@pytest.mark.django_db
+def test_chat_api_sends_only_context_and_new_message(client, monkeypatch, settings):
+    User.objects.create_user("bob", password="pass12345")
+    client.login(username="bob", password="pass12345")
+    # Keep the fake assessments as given (no Critical escalation for "chest pain")
+    settings.TRIAGE_RULES = {"PRESCREEN": False}
+
+    from carelink.common.services import gemini_client
+
+    seen = []
+
+    def fake_generate(self, s, patient_context=None, **kwargs):
+        seen.append(s)
+        return _result(f"Assessment {len(seen)}")
+
+    monkeypatch.setattr(gemini_client.GeminiClient, "generate_triage", fake_generate)
+
+    for message in ("chest pain", "it spreads to my arm"):
+        r = client.post(
+            reverse("triage:chat_api"),
+            json.dumps({"symptoms": message, "session_id": "s-conv"}),
+            content_type="application/json",
+        )
+        assert json.loads(r.content)["success"] is True
+
+    assert seen[0] == "chest pain"
+    assert "INITIAL_COMPLAINT: chest pain" in seen[1]
+    assert "PREVIOUS_ASSESSMENT: Moderate - Assessment 1" in seen[1]
+    assert seen[1].endswith("NEW_MESSAGE: it spreads to my arm")
+
+    interaction = TriageInteraction.objects.get(session_id="s-conv")
+    assert interaction.symptoms_text == "chest pain"
+    assert interaction.result["summary"] == "Assessment 2"
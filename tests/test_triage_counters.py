@@ -0,0 +1,140 @@
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from profiles.models import PatientProfile
+from triage.counters import actual_counts, dashboard_counts, reconcile
+from triage.models import TriageCounter, TriageInteraction
+
+
+def _stored():
+    return {
+        name: value for name, value in TriageCounter.objects.values_list("name", "value") if value
+    }
+
+
+def _assert_in_sync():
+    assert _stored() == {name: value for name, value in actual_counts().items() if value}
+
+
+@pytest.fixture
+def patients(db):
+    return [User.objects.create_user(f"p{n}", password="pass12345") for n in range(2)]
+
+
+def _create(user, severity="Mild", **kwargs):
+    return TriageInteraction.objects.create(
+        user=user, symptoms_text="cough", severity=severity, **kwargs
+    )
+
+
+def test_counters_follow_creates_updates_and_deletes(patients):
+    first = _create(patients[0], "Critical")
+    _create(patients[0], "Mild")
+    other = _create(patients[1], "Severe")
+
+    counts = dashboard_counts()
+    assert counts["total"] == counts["today"] == 3
+    assert counts["patients"] == counts["high_risk"] == 2
+
+    first.severity = "Moderate"
+    first.review_status = "under_review"
+    first.save()
+    assert dashboard_counts()["by_review_status"]["under_review"] == 1
+    assert dashboard_counts()["high_risk"] == 1
+
+    other.delete()
+    assert dashboard_counts()["patients"] == 1
+    _assert_in_sync()
+
+
+def test_update_fields_and_deferred_loads_are_counted(patients):
+    created = _create(patients[0], "Mild")
+
+    # chat_api loads only a few columns before rewriting the severity
+    interaction = TriageInteraction.objects.only("id", "severity", "updated_at").get(pk=created.pk)
+    interaction.severity = "Critical"
+    interaction.save(update_fields=["severity", "updated_at"])
+
+    # review_status was deferred, so its old value comes from the table
+    partial = TriageInteraction.objects.only("id").get(pk=created.pk)
+    partial.review_status = "finished_review"
+    partial.save(update_fields=["review_status"])
+
+    assert dashboard_counts()["by_severity"]["Critical"] == 1
+    assert dashboard_counts()["by_review_status"]["finished_review"] == 1
+    _assert_in_sync()
+
+
+def test_bulk_writes_are_counted(patients):
+    TriageInteraction.objects.bulk_create(
+        [TriageInteraction(user=user, symptoms_text="a", severity="Mild") for user in patients * 2]
+    )
+    TriageInteraction.objects.filter(user=patients[0]).update(severity="Severe")
+
+    assert dashboard_counts()["by_severity"] == {
+        "Critical": 0,
+        "Severe": 2,
+        "Moderate": 0,
+        "Mild": 2,
+    }
+    _assert_in_sync()
+
+
+def test_cascade_delete_counts_the_patient_once(patients):
+    for _ in range(3):
+        _create(patients[0])
+    _create(patients[1])
+
+    patients[0].delete()
+
+    assert dashboard_counts()["patients"] == 1
+    _assert_in_sync()
+
+
+def test_reconcile_fixes_drift(patients):
+    _create(patients[0], "Severe")
+    # Raw SQL bypasses the counters
+    TriageCounter.objects.filter(name="total").update(value=42)
+    TriageCounter.objects.filter(name="severity:Severe").delete()
+
+    assert reconcile(dry_run=True) == {"severity:Severe": (0, 1), "total": (42, 1)}
+    assert TriageCounter.objects.get(name="total").value == 42
+
+    out = io.StringIO()
+    call_command("reconcile_triage_counters", stdout=out)
+
+    assert "total: 42 -> 1" in out.getvalue()
+    assert "2 counter(s) corrected" in out.getvalue()
+    _assert_in_sync()
+    assert reconcile() == {}
+
+
+def test_days_are_counted_in_the_current_time_zone(patients, settings):
+    settings.TIME_ZONE = "Pacific/Kiritimati"  # UTC+14: usually a day ahead of UTC
+    interaction = _create(patients[0])
+
+    day = timezone.localdate(interaction.created_at)
+    assert TriageCounter.objects.get(name=f"day:{day.isoformat()}").value == 1
+    assert dashboard_counts(day)["today"] == 1
+    _assert_in_sync()
+
+
+def test_doctor_dashboard_reads_counters_in_one_query(client, patients):
+    _create(patients[0], "Critical")
+    doctor = User.objects.create_user("doc", password="pass12345")
+    PatientProfile.objects.update_or_create(user=doctor, defaults={"role": "doctor"})
+    client.login(username="doc", password="pass12345")
+
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(reverse("doctors:index"))
+
+    assert response.context["high_risk_count"] == 1
+    assert response.context["active_patients"] == 1
+    assert not [q for q in ctx.captured_queries if "COUNT(" in q["sql"]]
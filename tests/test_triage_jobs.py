@@ -0,0 +1,202 @@
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from triage import jobs
+from triage.models import TriageInteraction, TriageJob
+
+RESULT = {
+    "severity": "Mild",
+    "summary": "Likely a cold",
+    "advice": "Rest",
+    "red_flags": [],
+    "differential": [],
+    "rationale": "ok",
+}
+
+
+@pytest.fixture
+def patient(db):
+    return User.objects.create_user("jane", password="pass12345")
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    from carelink.common.services import gemini_client
+
+    # Queued outcomes (results or exceptions) are used first, then RESULT
+    outcomes = []
+
+    def generate(self, s, patient_context=None, **kwargs):
+        outcome = outcomes.pop(0) if outcomes else RESULT
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(gemini_client.GeminiClient, "generate_triage", generate)
+    return outcomes
+
+
+@pytest.mark.django_db
+def test_chat_api_enqueues_when_queue_enabled(client, patient, fake_gemini, settings):
+    settings.TRIAGE_JOBS = {"ENABLED": True}
+    client.login(username="jane", password="pass12345")
+
+    r = client.post(
+        reverse("triage:chat_api"),
+        json.dumps({"symptoms": "runny nose", "session_id": "s-q"}),
+        content_type="application/json",
+    )
+
+    assert r.status_code == 202
+    data = json.loads(r.content)
+    job = TriageJob.objects.get(pk=data["job_id"])
+    assert (job.message, job.session_id, job.status) == ("runny nose", "s-q", "queued")
+    assert TriageInteraction.objects.count() == 0
+
+    status = json.loads(client.get(data["status_url"]).content)
+    assert status == {"job_id": job.pk, "status": "queued", "attempts": 0}
+
+
+@pytest.mark.django_db
+def test_job_status_is_private_to_its_owner(client, patient):
+    job = jobs.enqueue(patient, "cough")
+    User.objects.create_user("other", password="pass12345")
+    client.login(username="other", password="pass12345")
+    assert client.get(reverse("triage:job_status", args=[job.pk])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_claimed_job_is_not_handed_to_another_worker(patient):
+    first, second = jobs.enqueue(patient, "a"), jobs.enqueue(patient, "b")
+
+    claimed_a = jobs.claim_jobs("w1")
+    claimed_b = jobs.claim_jobs("w2")
+
+    assert [j.pk for j in claimed_a] == [first.pk]
+    assert [j.pk for j in claimed_b] == [second.pk]
+    assert jobs.claim_jobs("w3") == []
+    first.refresh_from_db()
+    assert (first.status, first.locked_by, first.attempts) == ("running", "w1", 1)
+
+
+@pytest.mark.django_db
+def test_skip_locked_path_claims_jobs(patient, monkeypatch):
+    # SQLite has no FOR UPDATE, so the locking clause is simply not emitted
+    monkeypatch.setattr(connection.features, "has_select_for_update_skip_locked", True)
+    job = jobs.enqueue(patient, "a")
+    assert [j.pk for j in jobs.claim_jobs("w1", limit=5)] == [job.pk]
+    assert jobs.claim_jobs("w2") == []
+
+
+@pytest.mark.django_db
+def test_run_job_saves_result_and_interaction(patient, fake_gemini):
+    job = jobs.enqueue(patient, "sore throat", session_id="s-job")
+    (claimed,) = jobs.claim_jobs("w1")
+
+    assert jobs.run_job(claimed, "w1") == "succeeded"
+
+    job.refresh_from_db()
+    assert job.status == "succeeded"
+    assert job.result["summary"] == "Likely a cold"
+    assert job.interaction.session_id == "s-job"
+    assert job.interaction.messages.count() == 2
+    assert job.locked_by == "" and job.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_failed_job_is_retried_then_dead_lettered(patient, fake_gemini, settings):
+    settings.TRIAGE_JOBS = {"MAX_ATTEMPTS": 2}
+    settings.TRIAGE_RULES = {"FALLBACK": False}
+    fake_gemini.extend([RuntimeError("Gemini error: 503 UNAVAILABLE")] * 2)
+    job = jobs.enqueue(patient, "dizzy")
+
+    assert jobs.run_job(jobs.claim_jobs("w1")[0], "w1") == "queued"
+    job.refresh_from_db()
+    assert job.available_at > timezone.now() - timedelta(seconds=1)
+    assert "503" in job.error
+
+    TriageJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+    assert jobs.run_job(jobs.claim_jobs("w1")[0], "w1") == "dead"
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == ("dead", 2)
+    assert jobs.job_payload(job)["success"] is False
+
+
+@pytest.mark.django_db
+def test_last_attempt_falls_back_to_rules(patient, fake_gemini, settings):
+    settings.TRIAGE_JOBS = {"MAX_ATTEMPTS": 2}
+    fake_gemini.extend([RuntimeError("Gemini error: 503 UNAVAILABLE")] * 2)
+    job = jobs.enqueue(patient, "vomiting since last night")
+
+    assert jobs.run_job(jobs.claim_jobs("w1")[0], "w1") == "queued"
+    TriageJob.objects.filter(pk=job.pk).update(available_at=timezone.now())
+    assert jobs.run_job(jobs.claim_jobs("w1")[0], "w1") == "succeeded"
+    job.refresh_from_db()
+    assert job.result["engine"] == "rules"
+
+
+@pytest.mark.django_db
+def test_fatal_error_is_dead_lettered_at_once(patient, fake_gemini, settings):
+    settings.TRIAGE_RULES = {"FALLBACK": False}
+    fake_gemini.append(PermissionError("403 API key not valid"))
+    jobs.enqueue(patient, "rash")
+    assert jobs.run_job(jobs.claim_jobs("w1")[0], "w1") == "dead"
+
+
+@pytest.mark.django_db
+def test_expired_lock_makes_job_visible_again(patient):
+    job = jobs.enqueue(patient, "a")
+    jobs.claim_jobs("crashed")
+    TriageJob.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    assert [j.pk for j in jobs.claim_jobs("w2")] == [job.pk]
+    job.refresh_from_db()
+    assert (job.locked_by, job.attempts) == ("w2", 2)
+
+    # A worker that lost its lock cannot overwrite the new owner's job
+    jobs.run_job(job, "crashed")
+    job.refresh_from_db()
+    assert job.status == "running"
+
+
+@pytest.mark.django_db
+def test_reaper_dead_letters_job_that_timed_out_on_last_attempt(patient):
+    job = jobs.enqueue(patient, "a")
+    TriageJob.objects.filter(pk=job.pk).update(
+        status="running", attempts=3, locked_until=timezone.now() - timedelta(seconds=1)
+    )
+    assert jobs.reap_expired() == 1
+    job.refresh_from_db()
+    assert job.status == "dead"
+
+
+@pytest.mark.django_db
+def test_job_status_stream_ends_with_result(client, patient):
+    job = jobs.enqueue(patient, "a")
+    TriageJob.objects.filter(pk=job.pk).update(status="succeeded", result=RESULT)
+    client.login(username="jane", password="pass12345")
+
+    r = client.get(reverse("triage:job_status", args=[job.pk]), {"stream": "1"})
+    body = b"".join(r.streaming_content).decode()
+
+    assert body.startswith("event: result\n")
+    assert '"Likely a cold"' in body
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_command_drains_queue(patient, fake_gemini):
+    for text in ("a", "b", "c"):
+        jobs.enqueue(patient, text)
+
+    # One thread: the in-memory test database does not allow concurrent writers
+    call_command("triage_worker", "--threads", "1", "--once", stdout=io.StringIO())
+
+    assert set(TriageJob.objects.values_list("status", flat=True)) == {"succeeded"}
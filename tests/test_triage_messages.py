@@ -0,0 +1,89 @@
+import importlib
+import json
+
+import pytest
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from triage.models import TriageInteraction
+
+backfill = importlib.import_module("triage.migrations.0010_split_symptoms_into_messages")
+
+
+def _result(summary):
+    return {
+        "severity": "Moderate",
+        "summary": summary,
+        "advice": "Rest",
+        "red_flags": [],
+        "differential": [],
+        "rationale": "ok",
+    }
+
+
+@pytest.mark.django_db
+def test_follow_up_turn_appends_messages_without_rewriting_symptoms(client, monkeypatch):
+    User.objects.create_user("carol", password="pass12345")
+    client.login(username="carol", password="pass12345")
+
+    from carelink.common.services import gemini_client
+
+    monkeypatch.setattr(
+        gemini_client.GeminiClient,
+        "generate_triage",
+        lambda self, s, patient_context=None, **kwargs: _result(f"turn {len(s)}"),
+    )
+
+    def post(message):
+        return client.post(
+            reverse("triage:chat_api"),
+            json.dumps({"symptoms": message, "session_id": "s-msg"}),
+            content_type="application/json",
+        )
+
+    post("headache")
+    with CaptureQueriesContext(connection) as ctx:
+        post("now with a stiff neck")
+
+    interaction = TriageInteraction.objects.get(session_id="s-msg")
+    assert interaction.symptoms_text == "headache"
+    assert [(m.role, m.text) for m in interaction.messages.filter(role="user")] == [
+        ("user", "headache"),
+        ("user", "now with a stiff neck"),
+    ]
+    assert interaction.messages.filter(role="assistant").count() == 2
+
+    updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
+    assert "symptoms_text" not in updates[0]
+
+
+@pytest.mark.django_db
+def test_backfill_splits_joined_symptoms():
+    user = User.objects.create_user("dave", password="pass12345")
+    joined = TriageInteraction.objects.create(
+        user=user,
+        symptoms_text="cough\n\nAdditional information: fever\n\nAdditional information: chills",
+        severity="Moderate",
+        result=_result("Flu"),
+    )
+    single = TriageInteraction.objects.create(user=user, symptoms_text="rash", severity="Mild")
+
+    backfill.split_symptoms(apps, None)
+
+    joined.refresh_from_db()
+    assert joined.symptoms_text == "cough"
+    assert list(joined.messages.filter(role="user").values_list("text", flat=True)) == [
+        "cough",
+        "fever",
+        "chills",
+    ]
+    assert joined.messages.get(role="assistant").result["summary"] == "Flu"
+    assert list(single.messages.values_list("role", "text")) == [("user", "rash")]
+
+    backfill.join_symptoms(apps, None)
+    joined.refresh_from_db()
+    assert joined.symptoms_text.split(backfill.SEPARATOR) == ["cough", "fever", "chills"]
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from carelink.common.services.triage_rules import assess, escalate, find_symptoms, prescreen
+from carelink.common.types.triage import PreliminaryTriage
+
+
+def _phrases(text):
+    return [f.phrase for f in find_symptoms(text)]
+
+
+def test_lexicon_matches_phrases_case_and_spacing_insensitively():
+    assert _phrases("Crushing CHEST\n pain, can’t breathe") == ["crushing chest", "can't breathe"]
+    # The longest phrase wins over the one it contains
+    assert _phrases("severe abdominal pain") == ["severe abdominal pain"]
+    assert _phrases("chesty cough") == ["cough"]
+
+
+def test_negated_phrases_are_ignored():
+    assert _phrases("no chest pain, just a runny nose") == ["runny nose"]
+    assert _phrases("denies any shortness of breath") == []
+    # A conjunction ends the negation
+    assert _phrases("no fever but chest pain") == ["chest pain"]
+
+
+def test_assess_has_generate_triage_shape():
+    result = assess("fever and a sore throat")
+    fields = set(PreliminaryTriage.__dataclass_fields__)
+    assert set(result) == fields | {"engine"}
+    assert result["engine"] == "rules"
+    assert result["severity"] == "Moderate"
+    assert "Viral infection" in result["differential"]
+
+
+def test_worst_finding_sets_severity_and_red_flags():
+    result = assess("cough, fever and now slurred speech")
+    assert result["severity"] == "Critical"
+    assert result["red_flags"] == ["Signs of stroke"]
+    assert "911" in result["advice"]
+
+
+def test_risk_factors_raise_severity_one_level():
+    assert assess("runny nose")["severity"] == "Mild"
+    assert assess("runny nose", {"age": 72})["severity"] == "Moderate"
+    elderly = assess("vomiting", {"age": 40, "medical_history": "Type 2 diabetes"})
+    assert elderly["severity"] == "Severe"
+    assert "history of diabetes" in elderly["rationale"]
+
+
+def test_unrecognised_text_gets_cautious_default():
+    assert assess("I feel off")["severity"] == "Moderate"
+
+
+def test_prescreen_only_flags_critical_cases():
+    assert prescreen("sore throat") is None
+    assert prescreen("throat closing up after a bee sting")["severity"] == "Critical"
+
+
+def test_escalate_keeps_critical_floor_and_red_flags():
+    screen = assess("chest pain")
+    model = {"severity": "Moderate", "advice": "Rest", "red_flags": ["Fever"]}
+    merged = escalate(model, screen)
+    assert merged["severity"] == "Critical"
+    assert merged["red_flags"] == ["Chest pain or pressure", "Fever"]
+    assert merged["escalated_by"] == "rules"
+    assert escalate(model, None) is model
+
+
+@pytest.fixture
+def patient_client(client, db):
+    User.objects.create_user("rules", password="pass12345")
+    client.login(username="rules", password="pass12345")
+    return client
+
+
+def _post(client, symptoms):
+    r = client.post(
+        reverse("triage:chat_api"),
+        json.dumps({"symptoms": symptoms}),
+        content_type="application/json",
+    )
+    return json.loads(r.content)
+
+
+def test_chat_api_falls_back_to_rules_without_gemini(patient_client, settings):
+    settings.GEMINI_API_KEY = None
+
+    data = _post(patient_client, "high fever and a stiff neck")
+
+    assert data["success"] is True
+    assert data["result"]["engine"] == "rules"
+    assert data["result"]["severity"] == "Severe"
+
+
+def test_chat_api_reports_error_when_fallback_disabled(patient_client, settings):
+    settings.GEMINI_API_KEY = None
+    settings.TRIAGE_RULES = {"FALLBACK": False}
+
+    data = _post(patient_client, "cough")
+
+    assert data["success"] is False
+    assert "Gemini not configured" in data["error"]
+
+
+def test_critical_prescreen_hedges_and_escalates_model_answer(patient_client, monkeypatch):
+    from carelink.common.services import gemini_client
+
+    seen = {}
+
+    def generate(self, s, patient_context=None, **kwargs):
+        seen.update(kwargs)
+        return {"severity": "Mild", "summary": "Anxiety", "advice": "Breathe", "red_flags": []}
+
+    monkeypatch.setattr(gemini_client.GeminiClient, "generate_triage", generate)
+
+    result = _post(patient_client, "chest pain spreading to my arm")["result"]
+
+    assert seen["hedge"] is True
+    assert result["severity"] == "Critical"
+    assert result["summary"] == "Anxiety"
+    assert result["red_flags"] == ["Chest pain or pressure"]
@@ -0,0 +1,122 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from triage.models import TriageInteraction
+
+CHUNKS = [
+    '{"severity":"Mild","summ',
+    'ary":"Likely a common ',
+    'cold.","advice":"Rest and ',
+    'fluids.","red_flags":[],"differential":["Cold"],"rationale":"ok"}',
+]
+
+
+def _streaming_sdk(chunks):
+    def generate_content_stream(model=None, contents=None):
+        return iter([SimpleNamespace(text=c) for c in chunks])
+
+    return SimpleNamespace(
+        Client=lambda api_key=None: SimpleNamespace(
+            models=SimpleNamespace(generate_content_stream=generate_content_stream)
+        )
+    )
+
+
+def _events(response):
+    body = b"".join(response.streaming_content).decode()
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _stream(client, symptoms, session_id="s-stream"):
+    return client.post(
+        reverse("triage:chat_stream"),
+        json.dumps({"symptoms": symptoms, "session_id": session_id}),
+        content_type="application/json",
+    )
+
+
+@pytest.mark.django_db
+def test_stream_emits_tokens_then_result(client, monkeypatch, settings):
+    User.objects.create_user("sse", password="pass12345")
+    client.login(username="sse", password="pass12345")
+    settings.GEMINI_API_KEY = "fake"
+
+    from carelink.common.services import gemini_client
+
+    monkeypatch.setattr(gemini_client, "genai_new", _streaming_sdk(CHUNKS))
+
+    r = _stream(client, "runny nose")
+    assert r["Content-Type"] == "text/event-stream"
+    events = _events(r)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == "result"
+    assert set(kinds[:-1]) == {"token"}
+
+    streamed = {"summary": "", "advice": ""}
+    for kind, data in events[:-1]:
+        streamed[data["field"]] += data["text"]
+    assert streamed == {"summary": "Likely a common cold.", "advice": "Rest and fluids."}
+
+    final = events[-1][1]
+    assert final["success"] is True
+    assert final["result"]["severity"] == "Mild"
+    assert final["result"]["differential"] == ["Cold"]
+
+
+@pytest.mark.django_db
+def test_stream_persists_interaction_once_per_turn(client, monkeypatch, settings):
+    User.objects.create_user("sse2", password="pass12345")
+    client.login(username="sse2", password="pass12345")
+    settings.GEMINI_API_KEY = "fake"
+
+    from carelink.common.services import gemini_client
+
+    monkeypatch.setattr(gemini_client, "genai_new", _streaming_sdk(CHUNKS))
+
+    r = _stream(client, "runny nose")
+    # Nothing is written until the stream has been consumed
+    assert TriageInteraction.objects.count() == 0
+    _events(r)
+
+    interaction = TriageInteraction.objects.get()
+    assert interaction.session_id == "s-stream"
+    assert interaction.severity == "Mild"
+
+
+@pytest.mark.django_db
+def test_stream_reports_configuration_error(client, settings):
+    User.objects.create_user("sse3", password="pass12345")
+    client.login(username="sse3", password="pass12345")
+    settings.GEMINI_API_KEY = None
+    settings.TRIAGE_RULES = {"FALLBACK": False}
+
+    events = _events(_stream(client, "cough"))
+
+    assert events == [("error", events[0][1])]
+    assert events[0][1]["success"] is False
+    assert "Gemini not configured" in events[0][1]["error"]
+    assert TriageInteraction.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_stream_falls_back_to_rules_and_prescreens(client, settings):
+    User.objects.create_user("sse4", password="pass12345")
+    client.login(username="sse4", password="pass12345")
+    settings.GEMINI_API_KEY = None
+
+    events = _events(_stream(client, "sudden chest pain and sweating"))
+
+    assert [kind for kind, _ in events] == ["prescreen", "result"]
+    assert events[0][1]["severity"] == "Critical"
+    result = events[1][1]["result"]
+    assert result["engine"] == "rules"
+    assert TriageInteraction.objects.get().severity == "Critical"
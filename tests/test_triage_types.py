@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from carelink.common.types.triage import (
+    MAX_LIST_ITEMS,
+    PreliminaryTriage,
+    canonical_severity,
+)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("severe", "Severe"),
+        ("CRITICAL", "Critical"),
+        ("High", "Severe"),
+        ("low", "Mild"),
+        ("Life-threatening", "Critical"),
+        ("moderate to severe", "Moderate"),
+        ("purple", None),
+        (3, None),
+    ],
+)
+def test_canonical_severity(raw, expected):
+    assert canonical_severity(raw) == expected
+
+
+def test_from_raw_coerces_and_clamps_in_one_pass():
+    triage = PreliminaryTriage.from_raw(
+        {
+            "severity": "EMERGENCY",
+            "summary": 42,
+            "advice": ["Call 911", "Stay seated"],
+            "red_flags": "chest pain; sweating\n- arm numbness",
+            "differential": [f"dx {i}" for i in range(20)] + [None, ""],
+            "unexpected": "dropped",
+        }
+    )
+
+    assert triage.severity == "Critical"
+    assert triage.summary == "42"
+    assert triage.advice == "Call 911 Stay seated"
+    assert triage.red_flags == ["chest pain", "sweating", "arm numbness"]
+    assert len(triage.differential) == MAX_LIST_ITEMS
+    assert triage.rationale == "No rationale provided."
+
+
+def test_unknown_or_missing_values_fall_back_to_defaults():
+    triage = PreliminaryTriage.from_raw({"severity": "purple", "summary": "  "})
+    assert triage.severity == "Moderate"
+    assert triage.summary == "No summary provided."
+    assert triage.red_flags == []
+    assert PreliminaryTriage.from_raw(None) == PreliminaryTriage()
+
+
+def test_to_dict_is_json_ready_and_slotted():
+    triage = PreliminaryTriage.from_raw({"severity": "mild", "red_flags": ("fever",)})
+    data = triage.to_dict()
+
+    assert json.loads(json.dumps(data)) == data
+    assert set(data) == {"severity", "summary", "advice", "red_flags", "differential", "rationale"}
+    assert not hasattr(triage, "__dict__")
@@ -1,6 +1,24 @@
 from django.contrib import admin
 
-from .models import TriageInteraction
+from .models import (
+    DailyMetrics,
+    TriageCounter,
+    TriageInteraction,
+    TriageJob,
+    TriageMessage,
+    TriageRescore,
+)
+
+
+class TriageMessageInline(admin.TabularInline):
+    model = TriageMessage
+    extra = 0
+    can_delete = False
+    fields = ("created_at", "role", "text")
+    readonly_fields = ("created_at", "role", "text")
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(TriageInteraction)
@@ -9,9 +27,38 @@ class TriageInteractionAdmin(admin.ModelAdmin):
     list_filter = ("severity", "created_at", "reviewed_at")
     search_fields = ("user__username", "symptoms_text", "doctor_notes")
     readonly_fields = ("created_at", "updated_at", "reviewed_at")
+    inlines = [TriageMessageInline]
     fieldsets = (
         ("Patient Information", {"fields": ("user", "session_id")}),
         ("Triage Data", {"fields": ("symptoms_text", "severity", "result")}),
         ("Doctor Review", {"fields": ("doctor_notes", "reviewed_by", "reviewed_at")}),
         ("Timestamps", {"fields": ("created_at", "updated_at"), "classes": ("collapse",)}),
     )
+
+
+@admin.register(TriageJob)
+class TriageJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "status", "attempts", "created_at", "finished_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("user__username", "session_id", "error")
+    readonly_fields = ("created_at", "finished_at", "locked_by", "locked_until")
+
+
+@admin.register(TriageRescore)
+class TriageRescoreAdmin(admin.ModelAdmin):
+    list_display = ("run", "interaction", "old_severity", "new_severity", "model", "created_at")
+    list_filter = ("run", "old_severity", "new_severity")
+    readonly_fields = ("created_at",)
+
+
+@admin.register(TriageCounter)
+class TriageCounterAdmin(admin.ModelAdmin):
+    list_display = ("name", "value")
+    search_fields = ("name",)
+
+
+@admin.register(DailyMetrics)
+class DailyMetricsAdmin(admin.ModelAdmin):
+    list_display = ("day", "metric", "value", "computed_at")
+    list_filter = ("metric",)
+    date_hierarchy = "day"
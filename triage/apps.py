@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TriageConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "triage"
+
+    def ready(self):
+        import triage.signals  # noqa: F401
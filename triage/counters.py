@@ -0,0 +1,232 @@
+"""
+Materialized counts of triage interactions for the dashboards.
+
+``TriageCounter`` holds one row per count:
+
+    total                  all interactions
+    patients               distinct patients with at least one interaction
+    severity:<severity>    per severity ("severity:none" when unset)
+    review:<status>        per review status
+    day:<YYYY-MM-DD>       created on that day, in the current time zone
+
+Counters change in the same transaction as the interactions: ``save()``
+and ``delete()`` through the signals in ``triage.signals``, ``bulk_create``
+and ``update()`` with literal values through ``TriageInteractionQuerySet``.
+``bulk_update``, ``update()`` with expressions and raw SQL are not tracked,
+and two first interactions of one patient saved concurrently can both count
+them; ``manage.py reconcile_triage_counters`` recounts and fixes any drift.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SEVERITY_RANKS, TriageCounter, TriageInteraction
+
+TOTAL = "total"
+PATIENTS = "patients"
+COUNTED_FIELDS = ("severity", "review_status")
+REVIEW_STATUSES = [
+    value for value, _label in TriageInteraction._meta.get_field("review_status").choices
+]
+HIGH_RISK = ("Critical", "Severe")
+
+# Instance and origin attributes used by the signal hooks
+_LOADED = "_counted_values"
+_CHANGES = "_counted_changes"
+_UNCOUNTED_PATIENTS = "_uncounted_patients"
+
+
+def severity_key(severity: Optional[str]) -> str:
+    return f"severity:{severity or 'none'}"
+
+
+def review_key(status: Optional[str]) -> str:
+    return f"review:{status or 'none'}"
+
+
+def day_key(day: date) -> str:
+    return f"day:{day.isoformat()}"
+
+
+def _field_key(field: str, value: Any) -> str:
+    return severity_key(value) if field == "severity" else review_key(value)
+
+
+def _local_day(value: datetime) -> date:
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def row_keys(interaction: TriageInteraction) -> List[str]:
+    """The counters one interaction adds to (apart from ``patients``)."""
+    return [
+        TOTAL,
+        severity_key(interaction.severity),
+        review_key(interaction.review_status),
+        day_key(_local_day(interaction.created_at)),
+    ]
+
+
+def apply(deltas: Dict[str, int]) -> None:
+    """Add ``deltas`` to the counters, creating rows that do not exist yet."""
+    # A fixed order keeps concurrent writers from locking rows in opposite orders
+    for name, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        if TriageCounter.objects.filter(name=name).update(value=F("value") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                TriageCounter.objects.create(name=name, value=delta)
+        except IntegrityError:
+            # Another writer created it first
+            TriageCounter.objects.filter(name=name).update(value=F("value") + delta)
+
+
+# Hooks for single-row writes (see triage.signals)
+
+
+def remember_loaded(instance: TriageInteraction) -> None:
+    """Keep the counted values an instance was loaded (or last saved) with."""
+    setattr(
+        instance,
+        _LOADED,
+        {f: instance.__dict__[f] for f in COUNTED_FIELDS if f in instance.__dict__},
+    )
+
+
+def before_save(instance: TriageInteraction, update_fields: Optional[Iterable[str]]) -> None:
+    """Work out which counted fields an update of an existing row changes."""
+    if instance._state.adding:
+        return
+    fields = [f for f in COUNTED_FIELDS if update_fields is None or f in update_fields]
+    loaded = dict(getattr(instance, _LOADED, {}))
+    missing = [f for f in fields if f not in loaded]
+    if missing:
+        # Deferred when loaded, then assigned: the old value is only in the table
+        loaded.update(
+            TriageInteraction.objects.filter(pk=instance.pk).values(*missing).first() or {}
+        )
+    setattr(
+        instance,
+        _CHANGES,
+        {f: loaded[f] for f in fields if f in loaded and loaded[f] != getattr(instance, f)},
+    )
+
+
+def after_save(instance: TriageInteraction, created: bool) -> None:
+    deltas: Counter[str] = Counter()
+    if created:
+        deltas.update(row_keys(instance))
+        others = TriageInteraction.objects.filter(user_id=instance.user_id).exclude(pk=instance.pk)
+        if not others.exists():
+            deltas[PATIENTS] += 1
+    else:
+        for field, old in instance.__dict__.pop(_CHANGES, {}).items():
+            deltas[_field_key(field, old)] -= 1
+            deltas[_field_key(field, getattr(instance, field))] += 1
+    apply(deltas)
+    remember_loaded(instance)
+
+
+def after_delete(instance: TriageInteraction, origin: Any = None) -> None:
+    deltas = Counter({key: -1 for key in row_keys(instance)})
+    # A cascade deletes all of a patient's rows before the first signal is
+    # sent; count the patient once per delete() call
+    uncounted = getattr(origin, "__dict__", {}).setdefault(_UNCOUNTED_PATIENTS, set())
+    if instance.user_id not in uncounted:
+        if not TriageInteraction.objects.filter(user_id=instance.user_id).exists():
+            uncounted.add(instance.user_id)
+            deltas[PATIENTS] -= 1
+    apply(deltas)
+
+
+# Hooks for bulk writes (see TriageInteractionQuerySet)
+
+
+def count_created(interactions: Sequence[TriageInteraction], new_patients: int) -> None:
+    deltas: Counter[str] = Counter()
+    for interaction in interactions:
+        deltas.update(row_keys(interaction))
+    deltas[PATIENTS] += new_patients
+    apply(deltas)
+
+
+def group_counts(queryset, fields: Sequence[str]) -> List[Tuple[Dict[str, Any], int]]:
+    """Rows of ``queryset`` per combination of ``fields`` values."""
+    rows = queryset.order_by().values(*fields).annotate(n=Count("pk"))
+    return [({f: row[f] for f in fields}, row["n"]) for row in rows]
+
+
+def count_updated(before: List[Tuple[Dict[str, Any], int]], values: Dict[str, Any]) -> None:
+    """Move the rows counted in ``before`` to the counters of the new ``values``."""
+    deltas: Counter[str] = Counter()
+    for old_values, n in before:
+        for field, new in values.items():
+            deltas[_field_key(field, old_values[field])] -= n
+            deltas[_field_key(field, new)] += n
+    apply(deltas)
+
+
+# Reads and reconciliation
+
+
+def dashboard_counts(day: Optional[date] = None) -> Dict[str, Any]:
+    """The doctor dashboard's numbers for ``day`` (default today), in one query."""
+    day = day or timezone.localdate()
+    names = [TOTAL, PATIENTS, day_key(day)]
+    names += [severity_key(s) for s in SEVERITY_RANKS] + [review_key(s) for s in REVIEW_STATUSES]
+    values = dict(TriageCounter.objects.filter(name__in=names).values_list("name", "value"))
+    by_severity = {s: values.get(severity_key(s), 0) for s in SEVERITY_RANKS}
+    return {
+        "total": values.get(TOTAL, 0),
+        "today": values.get(day_key(day), 0),
+        "patients": values.get(PATIENTS, 0),
+        "high_risk": sum(by_severity[s] for s in HIGH_RISK),
+        "by_severity": by_severity,
+        "by_review_status": {s: values.get(review_key(s), 0) for s in REVIEW_STATUSES},
+    }
+
+
+def actual_counts() -> Dict[str, int]:
+    """Every counter recomputed from the interactions table."""
+    rows = TriageInteraction.objects.order_by()
+    counts = {
+        TOTAL: rows.count(),
+        PATIENTS: rows.values("user").distinct().count(),
+    }
+    for severity, n in rows.values_list("severity").annotate(n=Count("pk")):
+        counts[severity_key(severity)] = n
+    for status, n in rows.values_list("review_status").annotate(n=Count("pk")):
+        counts[review_key(status)] = n
+    days = rows.annotate(day=TruncDate("created_at")).values_list("day").annotate(n=Count("pk"))
+    for day, n in days:
+        counts[day_key(day)] = n
+    return counts
+
+
+def reconcile(dry_run: bool = False) -> Dict[str, Tuple[int, int]]:
+    """
+    Recount everything and fix the counters that drifted; returns
+    ``{name: (stored, actual)}`` for those. Stored rows are locked first, so
+    writers that commit meanwhile add to the corrected values.
+    """
+    with transaction.atomic():
+        stored = dict(TriageCounter.objects.select_for_update().values_list("name", "value"))
+        actual = actual_counts()
+        drift = {
+            name: (stored.get(name, 0), actual.get(name, 0))
+            for name in sorted(stored.keys() | actual.keys())
+            if stored.get(name, 0) != actual.get(name, 0)
+        }
+        if not dry_run:
+            for name, (_stored, value) in drift.items():
+                TriageCounter.objects.update_or_create(name=name, defaults={"value": value})
+    return drift
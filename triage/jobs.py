@@ -0,0 +1,166 @@
+"""
+Database-backed queue for triage generation.
+
+``enqueue`` stores a ``TriageJob``; ``manage.py triage_worker`` claims jobs
+and runs them off the request path. On backends with ``SKIP LOCKED``
+(PostgreSQL, MySQL 8) workers lock candidate rows without blocking each
+other; elsewhere (SQLite) each candidate is claimed with a conditional
+UPDATE, which only one worker can win. A claim holds the job for the
+visibility timeout; if the worker dies, the job becomes claimable again
+once that passes. Failed attempts are retried with backoff until
+``max_attempts``, then the job is dead-lettered.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from carelink.common.services.retry_policy import (
+    FATAL,
+    Deadline,
+    DeadlineExceeded,
+    RetryPolicy,
+    classify_error,
+)
+
+from .models import TriageJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISIBILITY_TIMEOUT = 90
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def jobs_config() -> Dict[str, Any]:
+    """``settings.TRIAGE_JOBS`` with defaults filled in."""
+    config = getattr(settings, "TRIAGE_JOBS", None) or {}
+    return {
+        "ENABLED": bool(config.get("ENABLED", False)),
+        "VISIBILITY_TIMEOUT": int(config.get("VISIBILITY_TIMEOUT", DEFAULT_VISIBILITY_TIMEOUT)),
+        "MAX_ATTEMPTS": int(config.get("MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+    }
+
+
+def enqueue(user, message: str, session_id: Optional[str] = None) -> TriageJob:
+    return TriageJob.objects.create(
+        user=user,
+        session_id=session_id or None,
+        message=message,
+        max_attempts=jobs_config()["MAX_ATTEMPTS"],
+    )
+
+
+def _claimable(now) -> Q:
+    # Queued and due, or running with an expired lock (its worker died)
+    return Q(status=TriageJob.QUEUED, available_at__lte=now) | Q(
+        status=TriageJob.RUNNING, locked_until__lt=now
+    )
+
+
+def claim_jobs(worker_id: str, limit: int = 1) -> List[TriageJob]:
+    """Lock up to ``limit`` due jobs for ``worker_id`` and return them."""
+    now = timezone.now()
+    lock = {
+        "status": TriageJob.RUNNING,
+        "locked_by": worker_id,
+        "locked_until": now + timedelta(seconds=jobs_config()["VISIBILITY_TIMEOUT"]),
+        "attempts": F("attempts") + 1,
+    }
+    due = (
+        TriageJob.objects.filter(_claimable(now), attempts__lt=F("max_attempts"))
+        .order_by("available_at", "id")
+        .values_list("id", flat=True)
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True)[:limit])
+            TriageJob.objects.filter(id__in=ids).update(**lock)
+    else:
+        ids = []
+        # Read a few extra candidates in case other workers win some of them
+        for job_id in list(due[: limit * 4]):
+            # The WHERE clause is re-checked when the row is written, so only
+            # one worker's UPDATE can match.
+            claim = TriageJob.objects.filter(
+                _claimable(now), id=job_id, attempts__lt=F("max_attempts")
+            )
+            if claim.update(**lock):
+                ids.append(job_id)
+                if len(ids) == limit:
+                    break
+    return list(TriageJob.objects.filter(id__in=ids, locked_by=worker_id).select_related("user"))
+
+
+def reap_expired() -> int:
+    """Dead-letter running jobs whose lock expired on their last attempt."""
+    now = timezone.now()
+    return TriageJob.objects.filter(
+        status=TriageJob.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts")
+    ).update(
+        status=TriageJob.DEAD,
+        error="Worker did not finish the last attempt before its visibility timeout",
+        locked_by="",
+        locked_until=None,
+        finished_at=now,
+    )
+
+
+def run_job(job: TriageJob, worker_id: str) -> str:
+    """Generate and save the assessment for ``job``; returns its new status."""
+    from .views import run_chat_turn
+
+    payload = {"symptoms": job.message, "session_id": job.session_id, "conversation_history": []}
+    mine = TriageJob.objects.filter(pk=job.pk, locked_by=worker_id, status=TriageJob.RUNNING)
+    try:
+        # Earlier attempts fail so the job is retried; the last one may use the rules
+        result, interaction = run_chat_turn(
+            job.user,
+            payload,
+            Deadline.for_endpoint("job"),
+            fallback=job.attempts >= job.max_attempts,
+        )
+    except Exception as exc:
+        now = timezone.now()
+        # Running out of time is worth another attempt; a bad request is not
+        fatal = classify_error(exc) == FATAL and not isinstance(exc, DeadlineExceeded)
+        if fatal or job.attempts >= job.max_attempts:
+            logger.warning("Triage job %s dead-lettered: %s", job.pk, exc)
+            updates = {"status": TriageJob.DEAD, "finished_at": now}
+        else:
+            delay = RetryPolicy.from_settings().backoff(job.attempts)
+            updates = {
+                "status": TriageJob.QUEUED,
+                "available_at": now + timedelta(seconds=delay),
+            }
+        # A worker whose lock expired meanwhile must not overwrite the new owner
+        mine.update(error=str(exc)[:2000], locked_by="", locked_until=None, **updates)
+        return updates["status"]
+
+    mine.update(
+        status=TriageJob.SUCCEEDED,
+        result=result,
+        interaction=interaction,
+        error="",
+        locked_by="",
+        locked_until=None,
+        finished_at=timezone.now(),
+    )
+    return TriageJob.SUCCEEDED
+
+
+def job_payload(job: TriageJob) -> Dict[str, Any]:
+    """What the status endpoint reports for ``job``."""
+    data: Dict[str, Any] = {"job_id": job.pk, "status": job.status, "attempts": job.attempts}
+    if job.status == TriageJob.SUCCEEDED:
+        data.update(success=True, result=job.result)
+    elif job.status == TriageJob.DEAD:
+        data.update(success=False, error=job.error or "The assessment could not be generated.")
+    return data
@@ -0,0 +1,54 @@
+"""
+Management command that serves a fake Gemini API for offline load tests.
+Usage: python manage.py fake_gemini_server --latency lognormal:0.8,0.5 --error-rate 0.05
+Point the app at it with GEMINI_TRANSPORT=http (GEMINI_FAKE_URL=http://127.0.0.1:8765).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from carelink.common.services.fake_gemini import MALFORMED_KINDS, FakeGemini, make_server
+
+
+class Command(BaseCommand):
+    help = "Serve a fake Gemini API with configurable latency, errors and malformed output"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--latency",
+            default="lognormal:0.8,0.5",
+            help="fixed:S, uniform:A,B, normal:MEAN,SD, lognormal:MEDIAN,SIGMA or exponential:MEAN",
+        )
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 429/5xx")
+        parser.add_argument(
+            "--malformed-rate", type=float, default=0.0, help="Share of broken JSON answers"
+        )
+        parser.add_argument(
+            "--malformed-kinds",
+            default=",".join(MALFORMED_KINDS),
+            help="Comma-separated subset of: " + ", ".join(MALFORMED_KINDS),
+        )
+        parser.add_argument("--seed", type=int, help="Seed for reproducible runs")
+        parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    def handle(self, *args, **options):
+        try:
+            fake = FakeGemini(
+                latency=options["latency"],
+                error_rate=options["error_rate"],
+                malformed_rate=options["malformed_rate"],
+                malformed_kinds=[k for k in options["malformed_kinds"].split(",") if k],
+                seed=options["seed"],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        server = make_server(fake, options["host"], options["port"], verbose=options["verbose"])
+        self.stdout.write(f"Fake Gemini listening on {server.url} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        self.stdout.write(f"Served: {fake.stats()}")
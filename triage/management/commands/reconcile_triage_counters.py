@@ -0,0 +1,28 @@
+"""
+Management command that recounts the dashboard counters (``TriageCounter``)
+from the interactions table and fixes any that drifted. Run it periodically,
+e.g. nightly from cron.
+Usage: python manage.py reconcile_triage_counters [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+
+from triage.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount the triage dashboard counters and correct drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report drift; nothing is changed"
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        drift = reconcile(dry_run=dry_run)
+        for name, (stored, actual) in drift.items():
+            self.stdout.write(f"{name}: {stored} -> {actual}")
+        verb = "would be corrected" if dry_run else "corrected"
+        message = f"{len(drift)} counter(s) {verb}"
+        self.stdout.write(self.style.WARNING(message) if drift else self.style.SUCCESS(message))
@@ -0,0 +1,197 @@
+"""
+Management command that re-scores past triage interactions, e.g. after
+changing ``SYSTEM_INSTRUCTIONS`` or the model, to measure severity drift.
+Usage: python manage.py retriage --run prompt-v3 --workers 4
+       python manage.py retriage --dry-run --limit 200
+"""
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
+
+from carelink.common.services.gemini_client import (
+    DEFAULT_MODEL,
+    PROMPT_VERSION,
+    get_gemini_client,
+)
+from carelink.common.services.rate_limit import get_rate_limiter
+from carelink.common.services.retry_policy import Deadline
+from carelink.common.services.triage_rules import assess
+from carelink.common.types.triage import SEVERITIES
+from triage.models import TriageInteraction, TriageMessage, TriageRescore
+from triage.views import profile_context
+
+RATE_WAIT_SECONDS = 300
+NONE = "-"
+ERROR = "error"
+
+
+def confusion_matrix(counts):
+    """Text table of ``{(old, new): n}``: one row per old severity, one column per new."""
+    labels = list(SEVERITIES) + [NONE]
+    rows = [label for label in labels if any(k[0] == label for k in counts)]
+    columns = [label for label in labels + [ERROR] if any(k[1] == label for k in counts)]
+    width = max([len(label) for label in labels + [ERROR]] + [len(str(n)) for n in counts.values()])
+    lines = ["old \\ new".ljust(width + 2) + " ".join(c.rjust(width) for c in columns)]
+    for row in rows:
+        cells = " ".join(str(counts.get((row, c), 0)).rjust(width) for c in columns)
+        lines.append(row.ljust(width + 2) + cells)
+    return "\n".join(lines)
+
+
+def _outcome(rescore):
+    return ERROR if rescore["error"] else rescore["new_severity"] or NONE
+
+
+def _saved_counts(rescores):
+    rows = rescores.values("old_severity", "new_severity", "error").annotate(n=Count("id"))
+    return Counter({(r["old_severity"] or NONE, _outcome(r)): r["n"] for r in rows})
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = "Re-score stored TriageInteraction rows into TriageRescore to compare severities"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--run",
+            help="Label for this re-scoring; re-running a label resumes it "
+            "(default: prompt version and model)",
+        )
+        parser.add_argument("--model", default=DEFAULT_MODEL, help="Gemini model to score with")
+        parser.add_argument(
+            "--engine",
+            choices=["gemini", "rules"],
+            default="gemini",
+            help="Score with Gemini or with the offline rules",
+        )
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent scoring calls")
+        parser.add_argument(
+            "--chunk-size", type=int, default=100, help="Rows read and written per batch"
+        )
+        parser.add_argument("--limit", type=int, help="Stop after this many interactions")
+        parser.add_argument(
+            "--restart", action="store_true", help="Discard earlier results for --run first"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print the severity confusion matrix; nothing is saved",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--workers and --chunk-size must be positive")
+        self.engine = options["engine"]
+        self.model = options["model"] if self.engine == "gemini" else "rules"
+        run = options["run"] or f"v{PROMPT_VERSION}-{self.model}"
+        dry_run = options["dry_run"]
+        if self.engine == "gemini":
+            self.client = get_gemini_client(getattr(settings, "GEMINI_API_KEY", None), self.model)
+            self.limiter = get_rate_limiter("retriage")
+
+        existing = TriageRescore.objects.filter(run=run)
+        if options["restart"] and not dry_run:
+            existing.delete()
+        # Batches are saved in id order, so the highest saved id is the checkpoint
+        checkpoint = 0 if dry_run else existing.aggregate(n=Max("interaction_id"))["n"] or 0
+        if checkpoint:
+            self.stdout.write(f"Resuming run {run!r} after interaction {checkpoint}")
+
+        rows = (
+            TriageInteraction.objects.filter(id__gt=checkpoint)
+            .order_by("id")
+            .select_related("user__patient_profile")
+            .prefetch_related(
+                Prefetch(
+                    "messages",
+                    queryset=TriageMessage.objects.filter(role="user").only(
+                        "interaction", "text", "created_at"
+                    ),
+                )
+            )
+        )
+        if options["limit"]:
+            rows = rows[: options["limit"]]
+
+        counts = Counter()
+        done = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            # Workers only call the model; all database access stays on this thread
+            for chunk in _chunks(
+                rows.iterator(chunk_size=options["chunk_size"]), options["chunk_size"]
+            ):
+                prepared = [self.prepare(interaction) for interaction in chunk]
+                rescores = [
+                    TriageRescore(
+                        run=run,
+                        interaction_id=interaction_id,
+                        model=self.model,
+                        prompt_version=PROMPT_VERSION,
+                        old_severity=old,
+                        new_severity=(result or {}).get("severity"),
+                        result=result,
+                        error=error,
+                    )
+                    for (interaction_id, old, _text, _ctx), (result, error) in zip(
+                        prepared, pool.map(self.score, prepared)
+                    )
+                ]
+                for rescore in rescores:
+                    counts[(rescore.old_severity or NONE, _outcome(vars(rescore)))] += 1
+                if not dry_run:
+                    with transaction.atomic():
+                        TriageRescore.objects.bulk_create(rescores)
+                done += len(rescores)
+                self.stdout.write(f"Scored {done} interaction(s)")
+
+        if not dry_run:
+            # Includes batches saved by earlier, interrupted invocations
+            counts = _saved_counts(existing)
+        if not counts:
+            self.stdout.write("Nothing to re-score")
+            return
+        self.stdout.write(confusion_matrix(counts))
+        total = sum(counts.values())
+        changed = sum(n for (old, new), n in counts.items() if old != new and new != ERROR)
+        errors = sum(n for (_old, new), n in counts.items() if new == ERROR)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Run {run!r}: {total} scored, {changed} changed severity, {errors} failed"
+                + (" (dry run, nothing saved)" if dry_run else "")
+            )
+        )
+
+    def prepare(self, interaction):
+        turns = [m.text for m in interaction.messages.all() if m.text]
+        text = "\n".join(turns) or interaction.symptoms_text
+        profile = getattr(interaction.user, "patient_profile", None)
+        ctx = profile_context(profile) if profile is not None else {}
+        return interaction.pk, interaction.severity, text, ctx
+
+    def score(self, prepared):
+        """``(result, error)`` for one prepared interaction; never raises."""
+        _interaction_id, _old, text, ctx = prepared
+        try:
+            if self.engine == "rules":
+                return assess(text, ctx), ""
+            if not self.limiter.wait(timeout=RATE_WAIT_SECONDS):
+                return None, "Timed out waiting for the retriage rate limit"
+            return (
+                self.client.generate_triage(
+                    text, ctx, hedge=False, deadline=Deadline.for_endpoint("job")
+                ),
+                "",
+            )
+        except Exception as exc:
+            return None, str(exc)[:2000]
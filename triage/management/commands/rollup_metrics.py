@@ -0,0 +1,41 @@
+"""
+Management command that rolls platform activity up into ``DailyMetrics``
+for the admin dashboard's date ranges. Days already complete are skipped,
+so it is cheap to run often (e.g. every few minutes from cron); each run
+recomputes today's partial row.
+Usage: python manage.py rollup_metrics
+       python manage.py rollup_metrics --since 2025-01-01
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from triage.rollups import rollup
+
+
+class Command(BaseCommand):
+    help = "Roll up daily platform metrics for the days not rolled up yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="First day to roll up, YYYY-MM-DD (default: the first day with activity)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError(
+                    f"--since must be a date (YYYY-MM-DD), not {options['since']!r}"
+                ) from None
+        days = rollup(since=since)
+        if not days:
+            self.stdout.write(self.style.SUCCESS("Nothing to roll up"))
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Rolled up {len(days)} day(s) from {days[0]} to {days[-1]}")
+        )
@@ -0,0 +1,88 @@
+"""
+Management command that answers queued triage chat messages.
+Usage: python manage.py triage_worker --threads 4
+"""
+
+import os
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from triage.jobs import claim_jobs, reap_expired, run_job
+
+
+class Command(BaseCommand):
+    help = "Run worker threads that claim and process TriageJob rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=2, help="Worker threads")
+        parser.add_argument(
+            "--poll-interval", type=float, default=1.0, help="Seconds to sleep when idle"
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no job is due instead of polling"
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.counts = {"succeeded": 0, "queued": 0, "dead": 0}
+        self.counts_lock = threading.Lock()
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(f"{base_id}:{n}", options["poll_interval"], options["once"]),
+                name=f"triage-worker-{n}",
+                daemon=True,
+            )
+            for n in range(max(1, options["threads"]))
+        ]
+        self.stdout.write(f"Starting {len(threads)} triage worker thread(s) as {base_id}")
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping after the current jobs...")
+            self.stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Done: {succeeded} succeeded, {queued} requeued, {dead} dead-lettered".format(
+                    **self.counts
+                )
+            )
+        )
+
+    def work(self, worker_id, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    reap_expired()
+                    jobs = claim_jobs(worker_id)
+                except OperationalError as exc:
+                    # e.g. "database is locked" on SQLite; a job claimed but
+                    # not finished is picked up again after its timeout
+                    self.stderr.write(f"{worker_id}: {exc}")
+                    self.stop.wait(poll_interval)
+                    continue
+                if not jobs:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+                for job in jobs:
+                    status = run_job(job, worker_id)
+                    with self.counts_lock:
+                        self.counts[status] = self.counts.get(status, 0) + 1
+        finally:
+            # Each thread has its own connection
+            connection.close()
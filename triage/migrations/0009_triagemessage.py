@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0008_triageinteraction_data_integrity_notes_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TriageMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[("user", "Patient"), ("assistant", "Assistant")], max_length=10
+                    ),
+                ),
+                ("text", models.TextField(blank=True)),
+                (
+                    "result",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Assessment returned for this turn (assistant only)",
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "interaction",
+                    models.ForeignKey(
+                        help_text="Triage interaction this turn belongs to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="messages",
+                        to="triage.triageinteraction",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["created_at", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["interaction", "created_at"], name="triage_tria_interac_ccc3c8_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+"""
+Backfill TriageMessage rows from existing interactions.
+
+Follow-up messages used to be appended to ``symptoms_text`` joined by
+"Additional information:". Each piece becomes a patient turn, the stored
+result becomes one assistant turn, and ``symptoms_text`` keeps only the
+first complaint.
+"""
+
+from django.db import migrations
+
+SEPARATOR = "\n\nAdditional information: "
+BATCH_SIZE = 500
+
+
+def split_symptoms(apps, schema_editor):
+    TriageInteraction = apps.get_model("triage", "TriageInteraction")
+    TriageMessage = apps.get_model("triage", "TriageMessage")
+
+    messages = []
+    rows = TriageInteraction.objects.values_list(
+        "pk", "symptoms_text", "result", "created_at", "updated_at"
+    )
+    for pk, symptoms_text, result, created_at, updated_at in rows.iterator(chunk_size=BATCH_SIZE):
+        parts = [p.strip() for p in (symptoms_text or "").split(SEPARATOR)]
+        parts = [p for p in parts if p] or [symptoms_text or ""]
+        for index, text in enumerate(parts):
+            # Only the first and last turn times are known
+            at = created_at if index == 0 else updated_at
+            messages.append(TriageMessage(interaction_id=pk, role="user", text=text, created_at=at))
+        if result:
+            messages.append(
+                TriageMessage(
+                    interaction_id=pk,
+                    role="assistant",
+                    text=(result.get("summary") or "") if isinstance(result, dict) else "",
+                    result=result,
+                    created_at=updated_at,
+                )
+            )
+        if len(parts) > 1:
+            # update() keeps updated_at as it was
+            TriageInteraction.objects.filter(pk=pk).update(symptoms_text=parts[0])
+        if len(messages) >= BATCH_SIZE:
+            TriageMessage.objects.bulk_create(messages)
+            messages = []
+    TriageMessage.objects.bulk_create(messages)
+
+
+def join_symptoms(apps, schema_editor):
+    TriageInteraction = apps.get_model("triage", "TriageInteraction")
+    TriageMessage = apps.get_model("triage", "TriageMessage")
+
+    turns = {}
+    user_messages = TriageMessage.objects.filter(role="user").order_by(
+        "interaction_id", "created_at", "id"
+    )
+    for interaction_id, text in user_messages.values_list("interaction_id", "text").iterator():
+        turns.setdefault(interaction_id, []).append(text)
+    for interaction_id, texts in turns.items():
+        if len(texts) > 1:
+            TriageInteraction.objects.filter(pk=interaction_id).update(
+                symptoms_text=SEPARATOR.join(texts)
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0009_triagemessage"),
+    ]
+
+    operations = [
+        migrations.RunPython(split_symptoms, join_symptoms),
+    ]
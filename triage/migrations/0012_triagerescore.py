@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0011_triagejob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TriageRescore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("run", models.CharField(help_text="Label of the retriage run", max_length=64)),
+                ("model", models.CharField(blank=True, max_length=64)),
+                ("prompt_version", models.CharField(blank=True, max_length=16)),
+                ("old_severity", models.CharField(blank=True, max_length=20, null=True)),
+                ("new_severity", models.CharField(blank=True, max_length=20, null=True)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "interaction",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rescores",
+                        to="triage.triageinteraction",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["run", "interaction_id"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "interaction"), name="unique_rescore_per_run"
+                    )
+                ],
+            },
+        ),
+    ]
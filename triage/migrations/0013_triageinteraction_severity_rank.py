@@ -0,0 +1,41 @@
+"""
+Store the severity rank the dashboards sort by, and index it.
+
+Existing rows are backfilled with one UPDATE per severity, which leaves
+``updated_at`` untouched.
+"""
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of triage.models.SEVERITY_RANKS
+SEVERITY_RANKS = {"Critical": 4, "Severe": 3, "Moderate": 2, "Mild": 1}
+
+
+def backfill_rank(apps, schema_editor):
+    TriageInteraction = apps.get_model("triage", "TriageInteraction")
+    for severity, rank in SEVERITY_RANKS.items():
+        TriageInteraction.objects.filter(severity=severity).update(severity_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0012_triagerescore"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="triageinteraction",
+            name="severity_rank",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="triageinteraction",
+            index=models.Index(
+                fields=["severity_rank", "updated_at", "id"], name="triage_severity_rank_idx"
+            ),
+        ),
+    ]
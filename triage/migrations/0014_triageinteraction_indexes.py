@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0013_triageinteraction_severity_rank"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="triageinteraction",
+            index=models.Index(
+                fields=["assigned_doctor", "severity_rank", "updated_at", "id"],
+                name="triage_assignee_rank_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="triageinteraction",
+            index=models.Index(fields=["user", "session_id"], name="triage_user_session_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="triageinteraction",
+            index=models.Index(fields=["review_status"], name="triage_review_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="triageinteraction",
+            index=models.Index(fields=["created_at"], name="triage_created_at_idx"),
+        ),
+    ]
@@ -0,0 +1,56 @@
+"""
+Add the materialized dashboard counters and fill them from the existing
+interactions. The counting mirrors ``triage.counters.actual_counts``.
+"""
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_counters(apps, schema_editor):
+    TriageInteraction = apps.get_model("triage", "TriageInteraction")
+    TriageCounter = apps.get_model("triage", "TriageCounter")
+
+    rows = TriageInteraction.objects.order_by()
+    counts = {
+        "total": rows.count(),
+        "patients": rows.values("user").distinct().count(),
+    }
+    for severity, n in rows.values_list("severity").annotate(n=Count("pk")):
+        counts[f"severity:{severity or 'none'}"] = n
+    for status, n in rows.values_list("review_status").annotate(n=Count("pk")):
+        counts[f"review:{status or 'none'}"] = n
+    days = rows.annotate(day=TruncDate("created_at")).values_list("day").annotate(n=Count("pk"))
+    for day, n in days:
+        counts[f"day:{day.isoformat()}"] = n
+    TriageCounter.objects.bulk_create(
+        [TriageCounter(name=name, value=value) for name, value in counts.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0014_triageinteraction_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TriageCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
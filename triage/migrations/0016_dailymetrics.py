@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("triage", "0015_triagecounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("metric", models.CharField(max_length=64)),
+                ("value", models.BigIntegerField(default=0)),
+                (
+                    "computed_at",
+                    models.DateTimeField(help_text="When the value was last recomputed"),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily metrics",
+                "ordering": ["day", "metric"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("day", "metric"), name="unique_daily_metric")
+                ],
+            },
+        ),
+    ]
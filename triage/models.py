@@ -1,6 +1,101 @@
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+# Higher is more urgent; unknown or missing severities rank 0
+SEVERITY_RANKS = {"Critical": 4, "Severe": 3, "Moderate": 2, "Mild": 1}
+# Dashboard order, most urgent first; ``id`` breaks ties so keyset pages are stable
+SEVERITY_ORDERING = ("-severity_rank", "-updated_at", "-id")
+
+
+def rank_for(severity) -> int:
+    return SEVERITY_RANKS.get(severity, 0)
+
+
+def rank_expression(severity):
+    """SQL computing the rank of a severity expression, e.g. ``F("severity")``."""
+    return models.Case(
+        *(models.When(Exact(severity, name), then=rank) for name, rank in SEVERITY_RANKS.items()),
+        default=0,
+        output_field=models.PositiveSmallIntegerField(),
+    )
+
+
+class TriageInteractionQuerySet(models.QuerySet):
+    """Keeps ``severity_rank`` in step with ``severity`` on bulk writes, which skip ``save()``."""
+
+    def update(self, **kwargs):
+        from .counters import COUNTED_FIELDS, count_updated, group_counts
+
+        if "severity" in kwargs and "severity_rank" not in kwargs:
+            severity = kwargs["severity"]
+            if hasattr(severity, "resolve_expression"):
+                kwargs["severity_rank"] = rank_expression(severity)
+            else:
+                kwargs["severity_rank"] = rank_for(severity)
+        # Literal values move counts between counters; expressions are left
+        # to the reconcile command
+        tracked = [
+            f
+            for f in COUNTED_FIELDS
+            if f in kwargs and not hasattr(kwargs[f], "resolve_expression")
+        ]
+        if not tracked:
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            before = group_counts(self, tracked)
+            rows = super().update(**kwargs)
+            count_updated(before, {f: kwargs[f] for f in tracked})
+        return rows
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        fields = list(fields)
+        if "severity" in fields:
+            for obj in objs:
+                obj.severity_rank = rank_for(obj.severity)
+            if "severity_rank" not in fields:
+                fields.append("severity_rank")
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .counters import count_created
+
+        objs = list(objs)
+        for obj in objs:
+            obj.severity_rank = rank_for(obj.severity)
+        if kwargs.get("ignore_conflicts") or kwargs.get("update_conflicts"):
+            # Which rows were inserted is unknown; reconcile will count them
+            return super().bulk_create(objs, *args, **kwargs)
+        with transaction.atomic(using=self.db):
+            users = {obj.user_id for obj in objs}
+            known = set(
+                self.model.objects.filter(user_id__in=users)
+                .order_by()
+                .values_list("user_id", flat=True)
+                .distinct()
+            )
+            created = super().bulk_create(objs, *args, **kwargs)
+            count_created(created, new_patients=len(users - known))
+        return created
+
+    bulk_create.alters_data = True
+
+    def by_severity(self):
+        return self.order_by(*SEVERITY_ORDERING)
+
+    def after(self, rank: int, updated_at, pk: int):
+        """Rows that come after ``(rank, updated_at, pk)`` in ``SEVERITY_ORDERING``."""
+        return self.filter(
+            models.Q(severity_rank__lt=rank)
+            | models.Q(severity_rank=rank, updated_at__lt=updated_at)
+            | models.Q(severity_rank=rank, updated_at=updated_at, id__lt=pk)
+        )
 
 
 class TriageInteraction(models.Model):
@@ -8,8 +103,11 @@ class TriageInteraction(models.Model):
     session_id = models.CharField(
         max_length=255, blank=True, null=True, help_text="Unique identifier for chat session"
     )
+    # First complaint of the session; follow-ups live in TriageMessage
     symptoms_text = models.TextField()
     severity = models.CharField(max_length=20, blank=True, null=True)
+    # Derived from severity on every write, so dashboards can sort by an index
+    severity_rank = models.PositiveSmallIntegerField(default=0, editable=False)
     result = models.JSONField(blank=True, null=True)
     assigned_doctor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -43,7 +141,7 @@ class TriageInteraction(models.Model):
         default="pending_review",
         help_text="Current status of the triage review process",
     )
-    
+
     # Data Integrity Verification Fields
     data_integrity_status = models.CharField(
         max_length=20,
@@ -53,19 +151,35 @@ class TriageInteraction(models.Model):
             ("discrepancy", "Discrepancy Found"),
         ],
         default="pending",
-        help_text="Status of symptom verification against medical records"
+        help_text="Status of symptom verification against medical records",
     )
     data_integrity_notes = models.TextField(
-        blank=True, 
-        null=True, 
-        help_text="Notes regarding data integrity or discrepancies found"
+        blank=True, null=True, help_text="Notes regarding data integrity or discrepancies found"
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TriageInteractionQuerySet.as_manager()
+
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            # Dashboards: everything, or one severity, most urgent first
+            models.Index(
+                fields=["severity_rank", "updated_at", "id"], name="triage_severity_rank_idx"
+            ),
+            # The doctors' priority queue (unassigned) and per-doctor queues
+            models.Index(
+                fields=["assigned_doctor", "severity_rank", "updated_at", "id"],
+                name="triage_assignee_rank_idx",
+            ),
+            # chat_api continues a session; history groups a patient's sessions
+            models.Index(fields=["user", "session_id"], name="triage_user_session_idx"),
+            models.Index(fields=["review_status"], name="triage_review_status_idx"),
+            # Counts per day, week and month
+            models.Index(fields=["created_at"], name="triage_created_at_idx"),
+        ]
 
     def __str__(self) -> str:
         return (
@@ -74,16 +188,53 @@ class TriageInteraction(models.Model):
             f"at={self.created_at:%Y-%m-%d %H:%M})"
         )
 
-    def severity_rank(self):
-        """Return numeric rank for severity ordering (higher = more urgent)."""
-        levels = {"Critical": 4, "Severe": 3, "Moderate": 2, "Mild": 1}
-        return levels.get(self.severity, 0)
+    def save(self, *args, **kwargs):
+        self.severity_rank = rank_for(self.severity)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "severity" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "severity_rank"}
+        # The save signals update TriageCounter; keep both in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def has_doctor_notes(self):
         """Check if doctor notes exist and are not empty."""
         return bool(self.doctor_notes and self.doctor_notes.strip())
 
 
+class TriageMessage(models.Model):
+    """
+    One turn of a triage chat. Rows are only ever inserted; the interaction
+    itself keeps just the latest severity/result for listings.
+    """
+
+    ROLE_CHOICES = [("user", "Patient"), ("assistant", "Assistant")]
+
+    interaction = models.ForeignKey(
+        TriageInteraction,
+        on_delete=models.CASCADE,
+        related_name="messages",
+        help_text="Triage interaction this turn belongs to",
+    )
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    text = models.TextField(blank=True)
+    result = models.JSONField(
+        blank=True, null=True, help_text="Assessment returned for this turn (assistant only)"
+    )
+    # Not auto_now_add so backfilled turns can keep their original time
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["interaction", "created_at"])]
+
+    def __str__(self) -> str:
+        return (
+            f"TriageMessage({self.role} on {self.interaction_id} "
+            f"at {self.created_at:%Y-%m-%d %H:%M})"
+        )
+
+
 class TriageDoctorNote(models.Model):
     interaction = models.ForeignKey(
         TriageInteraction,
@@ -110,3 +261,119 @@ class TriageDoctorNote(models.Model):
             f"Note by {self.doctor.username} on {self.interaction.id} "
             f"at {self.created_at:%Y-%m-%d %H:%M}"
         )
+
+
+class TriageJob(models.Model):
+    """
+    A chat message waiting for (or done with) its assessment. Jobs are
+    claimed by ``manage.py triage_worker``; a running job whose lock has
+    expired is picked up again, and one that keeps failing is dead-lettered.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (DEAD, "Dead-lettered"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="triage_jobs")
+    session_id = models.CharField(max_length=255, blank=True, null=True)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    available_at = models.DateTimeField(
+        default=timezone.now, help_text="Earliest time the job may be (re)tried"
+    )
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(
+        null=True, blank=True, help_text="Visibility timeout of the current attempt"
+    )
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+    interaction = models.ForeignKey(
+        TriageInteraction,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [models.Index(fields=["status", "available_at"])]
+
+    def __str__(self) -> str:
+        return f"TriageJob({self.pk}, {self.status}, attempts={self.attempts})"
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.SUCCEEDED, self.DEAD)
+
+
+class TriageRescore(models.Model):
+    """
+    Re-scored severity for a historical interaction, written by
+    ``manage.py retriage`` so prompt or model changes can be compared with
+    what patients were originally told. The interaction itself is untouched.
+    """
+
+    run = models.CharField(max_length=64, help_text="Label of the retriage run")
+    interaction = models.ForeignKey(
+        TriageInteraction, on_delete=models.CASCADE, related_name="rescores"
+    )
+    model = models.CharField(max_length=64, blank=True)
+    prompt_version = models.CharField(max_length=16, blank=True)
+    old_severity = models.CharField(max_length=20, blank=True, null=True)
+    new_severity = models.CharField(max_length=20, blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["run", "interaction_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["run", "interaction"], name="unique_rescore_per_run")
+        ]
+
+    def __str__(self) -> str:
+        return f"TriageRescore({self.run}: {self.old_severity} -> {self.new_severity})"
+
+
+class TriageCounter(models.Model):
+    """A materialized count of triage interactions; see ``triage.counters``."""
+
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return f"TriageCounter({self.name}={self.value})"
+
+
+class DailyMetrics(models.Model):
+    """One platform metric for one day, rolled up by ``triage.rollups``."""
+
+    day = models.DateField()
+    metric = models.CharField(max_length=64)
+    value = models.BigIntegerField(default=0)
+    computed_at = models.DateTimeField(help_text="When the value was last recomputed")
+
+    class Meta:
+        ordering = ["day", "metric"]
+        verbose_name_plural = "daily metrics"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "metric"], name="unique_daily_metric")
+        ]
+
+    def __str__(self) -> str:
+        return f"DailyMetrics({self.day} {self.metric}={self.value})"
@@ -0,0 +1,62 @@
+"""
+Keyset (seek) pagination for the triage dashboards.
+
+Rows are listed in ``SEVERITY_ORDERING`` (rank, then recency, then id,
+all descending), which ``triage_severity_rank_idx`` serves directly.
+Instead of an offset, each page starts right after the last row of the
+previous one, so a deep page costs the same as the first and rows added in
+the meantime do not shift what the next page shows. The cursor is the
+last row's sort key, base64-encoded for the query string.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(interaction) -> str:
+    key = f"{interaction.severity_rank}|{interaction.updated_at.isoformat()}|{interaction.pk}"
+    return base64.urlsafe_b64encode(key.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[int, datetime, int]]:
+    """``(rank, updated_at, pk)`` from a cursor; None if it is malformed."""
+    try:
+        rank, updated_at, pk = base64.urlsafe_b64decode(cursor.encode("ascii")).decode().split("|")
+        return int(rank), datetime.fromisoformat(updated_at), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    items: List
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def keyset_page(queryset, after: Optional[str] = None, size: Optional[int] = None) -> KeysetPage:
+    """
+    One page of ``queryset`` (a ``TriageInteraction`` queryset) in dashboard
+    order, starting after the ``after`` cursor. A malformed cursor gives the
+    first page.
+    """
+    size = max(1, min(size or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    queryset = queryset.by_severity()
+    key = decode_cursor(after) if after else None
+    if key is not None:
+        queryset = queryset.after(*key)
+    # One extra row tells whether there is a next page
+    items = list(queryset[: size + 1])
+    next_cursor = encode_cursor(items[size - 1]) if len(items) > size else None
+    return KeysetPage(items=items[:size], next_cursor=next_cursor)
@@ -0,0 +1,170 @@
+"""
+Daily platform metrics for long-range dashboard trends.
+
+``DailyMetrics`` holds one row per local day and metric:
+
+    new_users                    patient profiles created
+    triages                      interactions created
+    triages_<severity>           ...of each severity ("triages_unknown" when unset)
+    reviews_finished             finished reviews, on the day of the last review
+    appointments                 appointments booked
+    appointments_<status>        ...by their status at rollup time
+    cancellations                appointments cancelled (last changed) that day
+
+``manage.py rollup_metrics`` fills it. A day is complete once it has been
+rolled up after it ended; later runs skip complete days and recompute the
+rest, including today's partial row. Values of complete days are frozen:
+an appointment booked last month and cancelled today stays under its old
+status for that month, and counts as today's cancellation.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Count, Min, Q
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from appointments.models import Appointment
+from carelink.common.dates import day_bounds
+from profiles.models import PatientProfile
+
+from .models import SEVERITY_RANKS, DailyMetrics, TriageInteraction
+
+NEW_USERS = "new_users"
+TRIAGES = "triages"
+REVIEWS_FINISHED = "reviews_finished"
+APPOINTMENTS = "appointments"
+CANCELLATIONS = "cancellations"
+
+SEVERITY_METRICS = {f"triages_{s.lower()}": Q(severity=s) for s in SEVERITY_RANKS}
+UNKNOWN_SEVERITY = "triages_unknown"
+STATUS_METRICS = {f"appointments_{s}": Q(status=s) for s, _label in Appointment.STATUS_CHOICES}
+
+METRICS = [
+    NEW_USERS,
+    TRIAGES,
+    *SEVERITY_METRICS,
+    UNKNOWN_SEVERITY,
+    REVIEWS_FINISHED,
+    APPOINTMENTS,
+    *STATUS_METRICS,
+    CANCELLATIONS,
+]
+
+BATCH_SIZE = 500
+
+
+def daily_counts(queryset, day_of="created_at", counts: Optional[Dict[str, Q]] = None):
+    """
+    ``{day: {"total": n, name: n, ...}}`` for ``queryset``, grouped on the
+    local day of ``day_of`` (a field name or expression), with a conditional
+    count per entry of ``counts``.
+    """
+    counts = counts or {}
+    rows = (
+        queryset.order_by()
+        .annotate(day=TruncDate(day_of))
+        .values("day")
+        .annotate(total=Count("pk"), **{name: Count("pk", filter=q) for name, q in counts.items()})
+    )
+    return {row.pop("day"): row for row in rows}
+
+
+def compute_days(first: date, last: date) -> Dict[date, Dict[str, int]]:
+    """Every metric for the days ``first`` to ``last``, one GROUP BY per source."""
+    start, end = day_bounds(first)[0], day_bounds(last)[1]
+    created = Q(created_at__gte=start, created_at__lt=end)
+    metrics: Dict[date, Dict[str, int]] = {}
+
+    def add(days, total):
+        # Columns other than "total" are already named after their metric
+        for day, row in days.items():
+            values = metrics.setdefault(day, dict.fromkeys(METRICS, 0))
+            values[total] = row.pop("total")
+            values.update(row)
+
+    add(daily_counts(PatientProfile.objects.filter(created)), NEW_USERS)
+
+    triages = daily_counts(TriageInteraction.objects.filter(created), counts=SEVERITY_METRICS)
+    for row in triages.values():
+        row[UNKNOWN_SEVERITY] = row["total"] - sum(row[m] for m in SEVERITY_METRICS)
+    add(triages, TRIAGES)
+
+    # reviewed_at is only set when notes are written; fall back to the last change
+    reviewed = TriageInteraction.objects.filter(review_status="finished_review").filter(
+        Q(reviewed_at__gte=start, reviewed_at__lt=end)
+        | Q(reviewed_at__isnull=True, updated_at__gte=start, updated_at__lt=end)
+    )
+    add(daily_counts(reviewed, Coalesce("reviewed_at", "updated_at")), REVIEWS_FINISHED)
+
+    add(daily_counts(Appointment.objects.filter(created), counts=STATUS_METRICS), APPOINTMENTS)
+
+    cancelled = Appointment.objects.filter(
+        status="cancelled", updated_at__gte=start, updated_at__lt=end
+    )
+    add(daily_counts(cancelled, "updated_at"), CANCELLATIONS)
+    return metrics
+
+
+def first_day() -> Optional[date]:
+    """The earliest local day with any rolled-up activity."""
+    earliest = [
+        model.objects.aggregate(first=Min("created_at"))["first"]
+        for model in (PatientProfile, TriageInteraction, Appointment)
+    ]
+    earliest = [value for value in earliest if value is not None]
+    return timezone.localdate(min(earliest)) if earliest else None
+
+
+def pending_days(since: date, today: date) -> List[date]:
+    """Days from ``since`` to ``today`` without a complete rollup; today is never complete."""
+    # All metrics of a day are written together, so one of them tells
+    rolled_up = DailyMetrics.objects.filter(metric=TRIAGES, day__gte=since, day__lt=today)
+    complete = {
+        day
+        for day, computed_at in rolled_up.values_list("day", "computed_at")
+        if computed_at >= day_bounds(day)[1]
+    }
+    days = [since + timedelta(days=n) for n in range((today - since).days + 1)]
+    return [day for day in days if day not in complete]
+
+
+def rollup(since: Optional[date] = None, today: Optional[date] = None) -> List[date]:
+    """
+    Roll up the days from ``since`` (default: the first day with activity)
+    to ``today`` that are not complete yet. Returns the days written.
+    """
+    today = today or timezone.localdate()
+    since = since or first_day() or today
+    days = pending_days(since, today) if since <= today else []
+    if not days:
+        return []
+    computed = compute_days(days[0], days[-1])
+    now = timezone.now()
+    rows = [
+        DailyMetrics(
+            day=day, metric=metric, value=computed.get(day, {}).get(metric, 0), computed_at=now
+        )
+        for day in days
+        for metric in METRICS
+    ]
+    DailyMetrics.objects.bulk_create(
+        rows,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["day", "metric"],
+        update_fields=["value", "computed_at"],
+    )
+    return days
+
+
+def read_days(first: date, last: date, metrics: Iterable[str]) -> Dict[date, Dict[str, int]]:
+    """Rolled-up ``metrics`` for the days ``first`` to ``last``, in one query."""
+    days: Dict[date, Dict[str, int]] = {}
+    rows = DailyMetrics.objects.filter(day__gte=first, day__lte=last, metric__in=list(metrics))
+    for day, metric, value in rows.values_list("day", "metric", "value"):
+        days.setdefault(day, {})[metric] = value
+    return days
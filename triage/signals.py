@@ -0,0 +1,30 @@
+"""Signals for triage app."""
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters
+from .models import TriageInteraction
+
+
+@receiver(post_init, sender=TriageInteraction)
+def remember_counted_values(sender, instance, **kwargs):
+    counters.remember_loaded(instance)
+
+
+@receiver(pre_save, sender=TriageInteraction)
+def find_counter_changes(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        counters.before_save(instance, update_fields)
+
+
+@receiver(post_save, sender=TriageInteraction)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Keep the dashboard counters in step; runs inside the save's transaction."""
+    if not raw:
+        counters.after_save(instance, created)
+
+
+@receiver(post_delete, sender=TriageInteraction)
+def update_counters_on_delete(sender, instance, origin=None, **kwargs):
+    counters.after_delete(instance, origin)
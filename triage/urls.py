@@ -8,9 +8,13 @@ urlpatterns = [
     path("", views.index, name="index"),
     path("chat/", views.chat, name="chat"),
     path("chat/api/", views.chat_api, name="chat_api"),
+    path("chat/api/async/", views.achat_api, name="chat_api_async"),
+    path("chat/stream/", views.chat_stream, name="chat_stream"),
+    path("chat/jobs/<int:job_id>/", views.job_status, name="job_status"),
     path("history/", views.history, name="history"),
     path("history/<int:interaction_id>/", views.detail, name="detail"),
     path("admin/dashboard/", views.admin_dashboard, name="admin_dashboard"),
+    path("admin/metrics/", views.llm_metrics, name="llm_metrics"),
     path(
         "admin/notes/<int:interaction_id>/update/",
         views.update_doctor_notes,
@@ -1,18 +1,37 @@
 import json
+import time
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db import models
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from accounts.views import patient_required
-from carelink.common.services.gemini_client import GeminiClient
-
-from .models import TriageInteraction
+from carelink.common.services.conversation_store import Conversation, get_conversation_store
+from carelink.common.services.gemini_client import FALLBACK_MODELS, get_gemini_client
+from carelink.common.services.hedging import get_hedge_stats
+from carelink.common.services.json_repair import get_repair_stats
+from carelink.common.services.llm_metrics import get_llm_metrics
+from carelink.common.services.model_health import get_model_health
+from carelink.common.services.rate_limit import get_rate_limiter, rate_limited
+from carelink.common.services.retry_policy import Deadline
+from carelink.common.services.singleflight import get_singleflight
+from carelink.common.services.triage_cache import get_triage_cache
+from carelink.common.services.triage_rules import assess, escalate, prescreen, rules_config
+
+from .jobs import enqueue, job_payload, jobs_config
+from .models import SEVERITY_RANKS, TriageInteraction, TriageJob, TriageMessage
+from .pagination import keyset_page
+
+# How often and for how long job_status?stream=1 checks a queued job
+JOB_POLL_SECONDS = 0.5
+JOB_STREAM_SECONDS = 120
 
 try:
     from profiles.models import PatientProfile
@@ -91,6 +110,7 @@ def detail(request, interaction_id):
 
     context = {
         "interaction": interaction,
+        "patient_messages": interaction.messages.filter(role="user"),
         "patient_profile": patient_profile,
         "patient_history": patient_history,
         "is_doctor_view": can_view_all,
@@ -192,20 +212,24 @@ def verify_integrity(request, interaction_id):
     )
 
 
+def profile_context(prof):
+    """The parts of a ``PatientProfile`` that are sent to the model."""
+    weight_val = getattr(prof, "weight", None)
+    weight = float(weight_val) if weight_val is not None else None
+    return {
+        "age": getattr(prof, "age", None),
+        "weight": weight,
+        "medical_history": ((getattr(prof, "medical_history", None) or "")[:300] or None),
+        "allergies": ((getattr(prof, "allergies", None) or "")[:200] or None),
+    }
+
+
 def get_patient_context(user):
     """Helper to get patient context for triage."""
     patient_ctx = {}
     if PatientProfile is not None:
         try:
-            prof = PatientProfile.objects.get(user=user)
-            weight_val = getattr(prof, "weight", None)
-            weight = float(weight_val) if weight_val is not None else None
-            patient_ctx = {
-                "age": getattr(prof, "age", None),
-                "weight": weight,
-                "medical_history": ((getattr(prof, "medical_history", None) or "")[:300] or None),
-                "allergies": ((getattr(prof, "allergies", None) or "")[:200] or None),
-            }
+            patient_ctx = profile_context(PatientProfile.objects.get(user=user))
         except Exception:
             patient_ctx = {}
     return patient_ctx
@@ -215,94 +239,341 @@ def get_patient_context(user):
 def chat(request):
     """Main chat view - renders the chat page. Patients only."""
     patient_ctx = get_patient_context(request.user)
-    return render(request, "triage/chat.html", {"patient_ctx": patient_ctx})
+    use_async = getattr(settings, "TRIAGE_ASYNC_CHAT_API", False)
+    api_view = "triage:chat_api_async" if use_async else "triage:chat_api"
+    return render(
+        request,
+        "triage/chat.html",
+        {
+            "patient_ctx": patient_ctx,
+            "chat_api_url": reverse(api_view),
+            "chat_stream_url": reverse("triage:chat_stream"),
+            # Queued messages are answered by the worker, not streamed
+            "stream_enabled": not jobs_config()["ENABLED"],
+        },
+    )
 
 
-@patient_required
-def chat_api(request):
-    """API endpoint for submitting symptoms and getting AI response (AJAX)."""
+def _parse_chat_request(request):
+    """
+    Validate a chat POST. Returns ``(payload, None)`` on success or
+    ``(None, JsonResponse)`` describing the problem.
+    """
     if request.method != "POST":
-        return JsonResponse({"error": "Method not allowed"}, status=405)
+        return None, JsonResponse({"error": "Method not allowed"}, status=405)
 
     # Parse JSON body
     try:
         body = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse({"error": "Invalid JSON"}, status=400)
+        return None, JsonResponse({"error": "Invalid JSON"}, status=400)
 
     symptoms = (body.get("symptoms") or "").strip()
-    conversation_history = body.get("conversation_history", [])
-    session_id = body.get("session_id")
-
     if not symptoms:
-        return JsonResponse({"error": "Please describe your symptoms."}, status=400)
+        return None, JsonResponse({"error": "Please describe your symptoms."}, status=400)
+
+    return {
+        "symptoms": symptoms,
+        # Only read to rebuild server-side state that has expired
+        "conversation_history": body.get("conversation_history") or [],
+        "session_id": body.get("session_id"),
+    }, None
+
+
+def _load_conversation(user, payload):
+    """Server-side state for this chat session (a throwaway one without session_id)."""
+    if not payload["session_id"]:
+        return Conversation(user.pk, "")
+    return get_conversation_store().load(
+        user.pk, payload["session_id"], seed_history=payload["conversation_history"]
+    )
 
-    api_key = getattr(settings, "GEMINI_API_KEY", None)
-    client = GeminiClient(api_key=api_key)
-    patient_ctx = get_patient_context(request.user)
 
-    try:
-        # Build full conversation context by combining history with current symptoms
-        all_symptoms = []
-        for item in conversation_history:
-            if item.get("role") == "user":
-                all_symptoms.append(item.get("content", ""))
-        all_symptoms.append(symptoms)
+async def _aload_conversation(user, payload):
+    if not payload["session_id"]:
+        return Conversation(user.pk, "")
+    return await get_conversation_store().aload(
+        user.pk, payload["session_id"], seed_history=payload["conversation_history"]
+    )
 
-        # Combine all symptoms for comprehensive assessment
-        combined_symptoms = "\n\nAdditional information: ".join(all_symptoms)
 
-        try:
-            result = client.generate_triage(combined_symptoms, patient_context=patient_ctx)
-        except RuntimeError as e:
-            # RuntimeError indicates configuration issues - return error but with 200 status
-            return JsonResponse({"success": False, "error": str(e)}, status=200)
-        except Exception as e:
-            # Other exceptions - return error with 200 status for graceful handling
-            return JsonResponse(
-                {
-                    "success": False,
-                    "error": f"Sorry — something went wrong generating your preliminary assessment: {e}",
-                },
-                status=200,
-            )
+def _save_conversation(conversation, message, result):
+    conversation.add_turn(message, result)
+    if conversation.session_id:
+        get_conversation_store().save(conversation)
 
-        # Persist or update interaction with full context based on session_id
-        try:
+
+def _generation_error_payload(exc):
+    if isinstance(exc, RuntimeError):
+        # RuntimeError indicates configuration issues
+        return {"success": False, "error": str(exc)}
+    return {
+        "success": False,
+        "error": f"Sorry — something went wrong generating your preliminary assessment: {exc}",
+    }
+
+
+def _generation_error_response(exc):
+    # Errors use a 200 status so the chat UI can show them gracefully
+    return JsonResponse(_generation_error_payload(exc), status=200)
+
+
+def _persist_interaction(user, session_id, message, result):
+    """
+    Save one chat turn. The first message of a session creates the
+    interaction; every turn appends a patient and an assistant TriageMessage
+    and only the interaction's latest severity/result columns are rewritten.
+    Returns the interaction, or None if it could not be saved.
+    """
+    try:
+        with transaction.atomic():
+            interaction = None
             if session_id:
-                # Try to find existing interaction for this session
-                interaction, created = TriageInteraction.objects.get_or_create(
-                    user=request.user,
-                    session_id=session_id,
-                    defaults={
-                        "symptoms_text": combined_symptoms,
-                        "severity": result.get("severity"),
-                        "result": result,
-                        "review_status": "pending_review",
-                    },
+                interaction = (
+                    TriageInteraction.objects.filter(user=user, session_id=session_id)
+                    .only("id", "severity", "result", "updated_at")
+                    .first()
                 )
-                # If interaction already exists, update it with latest information
-                if not created:
-                    interaction.symptoms_text = combined_symptoms
-                    interaction.severity = result.get("severity")
-                    interaction.result = result
-                    interaction.save()
-            else:
-                # Fallback if no session_id provided
-                TriageInteraction.objects.create(
-                    user=request.user,
-                    symptoms_text=combined_symptoms,
+            if interaction is None:
+                interaction = TriageInteraction.objects.create(
+                    user=user,
+                    session_id=session_id or None,
+                    symptoms_text=message,
                     severity=result.get("severity"),
                     result=result,
                     review_status="pending_review",
                 )
-        except Exception:
-            # non-fatal; do not block UI if persistence fails
-            pass
+            else:
+                interaction.severity = result.get("severity")
+                interaction.result = result
+                interaction.save(update_fields=["severity", "result", "updated_at"])
+
+            TriageMessage.objects.bulk_create(
+                [
+                    TriageMessage(interaction=interaction, role="user", text=message),
+                    TriageMessage(
+                        interaction=interaction,
+                        role="assistant",
+                        text=result.get("summary") or "",
+                        result=result,
+                    ),
+                ]
+            )
+        return interaction
+    except Exception:
+        # non-fatal; do not block UI if persistence fails
+        return None
+
+
+def _prescreen(conversation, message, patient_ctx):
+    """Rule assessment if the patient's text is an obvious Critical case, else None."""
+    if not rules_config()["PRESCREEN"]:
+        return None
+    return prescreen(conversation.patient_text(message), patient_ctx)
+
+
+def _rules_fallback(conversation, message, patient_ctx):
+    """Offline rule assessment used when Gemini is unconfigured or failing."""
+    return assess(conversation.patient_text(message), patient_ctx)
+
+
+def run_chat_turn(user, payload, deadline, fallback=True):
+    """
+    Generate the assessment for one chat message and save it. Used by
+    ``chat_api`` and the background job worker. If Gemini fails, the offline
+    rules answer instead (``fallback`` and ``TRIAGE_RULES["FALLBACK"]``);
+    otherwise the error propagates. Returns ``(result, interaction)``.
+    """
+    api_key = getattr(settings, "GEMINI_API_KEY", None)
+    client = get_gemini_client(api_key)
+    patient_ctx = get_patient_context(user)
+    conversation = _load_conversation(user, payload)
+    prompt_text = conversation.prompt_text(
+        payload["symptoms"], max_chars=client.symptoms_budget(patient_ctx)
+    )
+    screen = _prescreen(conversation, payload["symptoms"], patient_ctx)
+    try:
+        result = client.generate_triage(
+            prompt_text,
+            patient_context=patient_ctx,
+            deadline=deadline,
+            # Race a second model for emergencies rather than wait on a slow one
+            hedge=True if screen else None,
+        )
+    except Exception:
+        if not (fallback and rules_config()["FALLBACK"]):
+            raise
+        result = _rules_fallback(conversation, payload["symptoms"], patient_ctx)
+    result = escalate(result, screen)
+    _save_conversation(conversation, payload["symptoms"], result)
+    interaction = _persist_interaction(user, payload["session_id"], payload["symptoms"], result)
+    return result, interaction
+
+
+@patient_required
+@rate_limited("chat_api")
+def chat_api(request):
+    """API endpoint for submitting symptoms and getting AI response (AJAX)."""
+    deadline = Deadline.for_endpoint("chat_api")
+    payload, error = _parse_chat_request(request)
+    if error is not None:
+        return error
+
+    if jobs_config()["ENABLED"]:
+        # Answered by manage.py triage_worker; the page polls the job
+        job = enqueue(request.user, payload["symptoms"], payload["session_id"])
+        return JsonResponse(
+            {
+                "success": True,
+                "job_id": job.pk,
+                "status": job.status,
+                "status_url": reverse("triage:job_status", args=[job.pk]),
+            },
+            status=202,
+        )
+
+    try:
+        result, _interaction = run_chat_turn(request.user, payload, deadline)
+    except Exception as e:
+        return _generation_error_response(e)
+    return JsonResponse({"success": True, "result": result})
+
 
+def _sse(event, data):
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@patient_required
+@rate_limited("chat_api")
+def chat_stream(request):
+    """
+    Streaming variant of ``chat_api``. Summary/advice text is pushed as SSE
+    ``token`` events while the model writes it; the final validated result is
+    sent as a terminal ``result`` event once the interaction has been saved.
+    """
+    deadline = Deadline.for_endpoint("chat_stream")
+    payload, error = _parse_chat_request(request)
+    if error is not None:
+        return error
+
+    api_key = getattr(settings, "GEMINI_API_KEY", None)
+    client = get_gemini_client(api_key)
+    patient_ctx = get_patient_context(request.user)
+    user = request.user
+    conversation = _load_conversation(user, payload)
+    prompt_text = conversation.prompt_text(
+        payload["symptoms"], max_chars=client.symptoms_budget(patient_ctx)
+    )
+
+    screen = _prescreen(conversation, payload["symptoms"], patient_ctx)
+
+    def event_stream():
+        result = None
+        if screen:
+            # Warn about an emergency before the model has said anything
+            yield _sse("prescreen", {k: screen[k] for k in ("severity", "red_flags", "advice")})
+        try:
+            stream = client.stream_triage(
+                prompt_text, patient_context=patient_ctx, deadline=deadline
+            )
+            for kind, data in stream:
+                if kind == "result":
+                    result = data
+                else:
+                    yield _sse(kind, data)
+        except Exception as e:
+            if not rules_config()["FALLBACK"]:
+                yield _sse("error", _generation_error_payload(e))
+                return
+            result = _rules_fallback(conversation, payload["symptoms"], patient_ctx)
+        result = escalate(result, screen)
+
+        # Persist exactly once, after the model has finished
+        _save_conversation(conversation, payload["symptoms"], result)
+        _persist_interaction(user, payload["session_id"], payload["symptoms"], result)
+        yield _sse("result", {"success": True, "result": result})
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx and friends from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@patient_required
+def job_status(request, job_id):
+    """
+    State of a queued chat message. With ``?stream=1`` the state is pushed as
+    SSE ``status`` events until a terminal ``result`` event.
+    """
+    job = get_object_or_404(TriageJob, pk=job_id, user=request.user)
+    if request.GET.get("stream") != "1":
+        return JsonResponse(job_payload(job))
+
+    def event_stream():
+        current = job
+        give_up_at = time.monotonic() + JOB_STREAM_SECONDS
+        last_status = None
+        while not current.finished and time.monotonic() < give_up_at:
+            if current.status != last_status:
+                last_status = current.status
+                yield _sse("status", job_payload(current))
+            time.sleep(JOB_POLL_SECONDS)
+            current = TriageJob.objects.get(pk=job.pk)
+        yield _sse("result" if current.finished else "status", job_payload(current))
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@patient_required
+@rate_limited("chat_api")
+async def achat_api(request):
+    """
+    Async variant of ``chat_api`` for ASGI deployments. The Gemini round trip
+    is awaited, so the worker is free to serve other requests meanwhile.
+    """
+    deadline = Deadline.for_endpoint("chat_api_async")
+    payload, error = _parse_chat_request(request)
+    if error is not None:
+        return error
+
+    user = await request.auser()
+    api_key = getattr(settings, "GEMINI_API_KEY", None)
+    client = get_gemini_client(api_key)
+    patient_ctx = await sync_to_async(get_patient_context)(user)
+
+    try:
+        conversation = await _aload_conversation(user, payload)
+        prompt_text = conversation.prompt_text(
+            payload["symptoms"], max_chars=client.symptoms_budget(patient_ctx)
+        )
+
+        screen = _prescreen(conversation, payload["symptoms"], patient_ctx)
+        try:
+            result = await client.agenerate_triage(
+                prompt_text,
+                patient_context=patient_ctx,
+                deadline=deadline,
+                hedge=True if screen else None,
+            )
+        except Exception as e:
+            if not rules_config()["FALLBACK"]:
+                return _generation_error_response(e)
+            result = _rules_fallback(conversation, payload["symptoms"], patient_ctx)
+        result = escalate(result, screen)
+
+        conversation.add_turn(payload["symptoms"], result)
+        if conversation.session_id:
+            await get_conversation_store().asave(conversation)
+        await sync_to_async(_persist_interaction)(
+            user, payload["session_id"], payload["symptoms"], result
+        )
         return JsonResponse({"success": True, "result": result})
     except Exception as e:
-        # Catch-all for any unexpected errors
         return JsonResponse(
             {
                 "success": False,
@@ -356,30 +627,41 @@ def mark_review_completed(request, interaction_id):
 @staff_member_required
 def admin_dashboard(request):
     """Doctor/Admin dashboard to view and prioritize incoming triage reports."""
-    # Order by severity rank (Critical → Severe → Moderate → Mild) then by recency
-    severity_order = models.Case(
-        models.When(severity="Critical", then=4),
-        models.When(severity="Severe", then=3),
-        models.When(severity="Moderate", then=2),
-        models.When(severity="Mild", then=1),
-        default=0,
-        output_field=models.IntegerField(),
-    )
-
-    interactions = (
-        TriageInteraction.objects.select_related("user")
-        .annotate(severity_rank=severity_order)
-        .order_by("-severity_rank", "-updated_at")
-    )
+    # Most severe first (Critical → Severe → Moderate → Mild), then by recency
+    interactions = TriageInteraction.objects.select_related("user")
 
     # Optional filter by severity level
     filter_level = request.GET.get("severity")
-    if filter_level:
+    if filter_level in SEVERITY_RANKS:
+        # Equivalent to filtering on severity, but seeks in the rank index
+        interactions = interactions.filter(severity_rank=SEVERITY_RANKS[filter_level])
+    elif filter_level:
         interactions = interactions.filter(severity=filter_level)
 
+    page = keyset_page(interactions, after=request.GET.get("after"))
     context = {
-        "interactions": interactions,
+        "interactions": page.items,
+        "page": page,
+        "after": request.GET.get("after"),
         "filter_level": filter_level,
         "severity_levels": ["Critical", "Severe", "Moderate", "Mild"],
     }
     return render(request, "triage/admin_dashboard.html", context)
+
+
+@staff_member_required
+def llm_metrics(request):
+    """This process's Gemini call metrics and the counters of the layers around them."""
+    client = get_gemini_client(getattr(settings, "GEMINI_API_KEY", None))
+    scopes = (getattr(settings, "RATE_LIMITS", None) or {}).get("SCOPES") or {}
+    return JsonResponse(
+        {
+            "llm": get_llm_metrics().snapshot(),
+            "model_health": get_model_health().snapshot([client.model] + FALLBACK_MODELS),
+            "hedging": get_hedge_stats().snapshot(),
+            "json_repair": get_repair_stats().snapshot(),
+            "singleflight": get_singleflight().stats.snapshot(),
+            "triage_cache": get_triage_cache().stats(),
+            "rate_limits": {scope: get_rate_limiter(scope).stats() for scope in scopes},
+        }
+    )